@@ -0,0 +1,421 @@
+#!/usr/bin/env python3
+"""
+Precompute walkability, connectivity and distance tables for Zargon's world.
+
+All 16 maps are stitched into one 80x40 grid of tiles (render_maps.py's
+world_values). Walking off a map edge lands on the facing tile of the next
+map, as MapViewModel.handleMapTransition does, so one 4-connected grid is
+the walkability graph of the whole world. It is analyzed once per
+movement mode, following TileType.isWalkable and MapViewModel.movePlayer:
+- foot: grass, sand, floor, huts, shops, healers and the castle
+- ship: also shallow water ("4", and "a", which the game reads as "4")
+
+Points of interest are the start and warp spawns of the app
+(GameState, WorldSpell.Warp) and every hut, weapon shop, healer and
+castle tile; touching tiles of one kind form one point, so the castle's
+12 tiles are a single target. Each is named kind@map:col,row with the
+0-based column and row of its first tile, e.g. healer@map24:10,7.
+
+For each mode the tool labels connected components and runs a BFS
+distance field from every point of interest. The BFS expands whole
+frontiers as NumPy boolean shifts, all fields of a mode together, so the
+whole analysis takes about 15 ms.
+
+Packed table format (little-endian):
+- 4 bytes: Magic "ZNAV"
+- 2 bytes: Version (1)
+- 1 byte each: World width (80), world height (40), mode count
+- 2 bytes: Point of interest count
+- 1 byte each: Label bytes, distance bytes (1 or 2, the smallest that fits)
+- Per mode: 8 bytes ASCII name (NUL padded), 2 bytes component count
+- Per point of interest: 1 byte kind (index into POI_KIND_ORDER), 1 byte
+  each world x and y of its first tile
+- Per mode, in order:
+  - width * height labels, row-major: 0 = not walkable, 1..count = component
+  - Per point of interest: width * height steps, row-major; the largest
+    value (0xFF or 0xFFFF) means unreachable
+
+--validate fails (exit status 1) when a spawn is not walkable or a point
+of interest cannot be reached from the start spawn in any mode. The points
+the game's own maps seal off (SEALED_POIS) are allowed by default.
+
+The app ships the tables as assets/zargon.nav and reads them with
+NavigationTables (domain/map/NavigationTables.kt).
+
+Usage:
+    python3 analyze_maps.py zargon -o zargon.nav --check
+    python3 analyze_maps.py app/app/src/main/assets --validate
+"""
+
+import os
+import struct
+import time
+from collections import namedtuple
+
+import numpy as np
+
+from compile_maps import MAP_HEIGHT, MAP_WIDTH, TILE_CODES, TILE_VALUES, load_maps, map_name
+from connected_regions import label_regions
+from render_maps import world_values
+
+NAV_MAGIC = b'ZNAV'
+NAV_VERSION = 1
+NAV_HEADER = struct.Struct('<4sHBBBHBB')
+MODE_ENTRY = struct.Struct('<8sH')
+POI_ENTRY = struct.Struct('<BBB')
+
+# Tile codes each movement mode can enter, in order of increasing reach
+MOVE_MODES = {
+    'foot': '102DhWHC',
+    'ship': '102DhWHC4a',
+}
+
+# Tile codes that are points of interest and their kinds
+POI_TILES = {
+    'h': 'hut',
+    'W': 'shop',
+    'H': 'healer',
+    'C': 'castle',
+}
+POI_KIND_ORDER = ['spawn', 'hut', 'shop', 'healer', 'castle']
+
+# App spawn points as (label, map x, map y, col, row), 0-based col and row:
+# the new game position (GameState) and the Warp spell target
+SPAWNS = [
+    ('start', 2, 4, 6, 7),
+    ('warp', 2, 4, 10, 8),
+]
+
+# Points of interest the game's maps seal off, allowed to be unreachable
+SEALED_POIS = (
+    'hut@map44:18,6',      # the "old game" hut, walled in by rock (zargon/ and the app)
+    'hut@map42:2,2',       # zargon/ only; the app's map42 opens it up
+    'castle@map32:13,4',   # zargon/ only; the castle island, reached through the app's map34 and map41
+)
+
+# 4-connected moves as (dy, dx)
+MOVES = [(-1, 0), (1, 0), (0, -1), (0, 1)]
+
+PointOfInterest = namedtuple('PointOfInterest', ['name', 'kind', 'cells'])
+PointOfInterest.__doc__ = """A spawn or a group of touching POI tiles; cells lists the world
+(x, y) tiles, first tile first."""
+
+ModeTables = namedtuple('ModeTables', ['walkable', 'labels', 'count', 'fields'])
+ModeTables.__doc__ = """One movement mode's tables: walkable and labels are world-sized
+arrays, count the number of components and fields one distance array
+per point of interest (-1 where unreachable)."""
+
+WorldAnalysis = namedtuple('WorldAnalysis', ['values', 'pois', 'modes'])
+
+def walkable_mask(values, mode):
+    """Tiles of a tile value array that the movement mode can enter."""
+    table = np.array([code in MOVE_MODES[mode] for code in TILE_CODES])
+    return table[values]
+
+def poi_name(label, x, y):
+    """Name a point of interest by the map and map position of world tile (x, y)."""
+    return f'{label}@{map_name(x // MAP_WIDTH + 1, y // MAP_HEIGHT + 1)}:{x % MAP_WIDTH},{y % MAP_HEIGHT}'
+
+def points_of_interest(values):
+    """
+    Find the spawns and POI tiles of the world.
+
+    Args:
+        values: World tile value array from world_values
+
+    Returns:
+        List of PointOfInterest, spawns first, then each tile kind in
+        POI_TILES order with its groups in reading order
+    """
+    pois = []
+    for label, map_x, map_y, col, row in SPAWNS:
+        x = (map_x - 1) * MAP_WIDTH + col
+        y = (map_y - 1) * MAP_HEIGHT + row
+        pois.append(PointOfInterest(poi_name(label, x, y), 'spawn', [(x, y)]))
+
+    for code, kind in POI_TILES.items():
+        labels, count = label_regions(values == TILE_VALUES[code], MOVES)
+        for group in range(1, count + 1):
+            cells = [(int(x), int(y)) for y, x in np.argwhere(labels == group)]
+            pois.append(PointOfInterest(poi_name(kind, *cells[0]), kind, cells))
+    return pois
+
+def distance_fields(walkable, sources):
+    """
+    BFS step counts from several sets of start tiles at once.
+
+    All fields are expanded together as one (sources, height, width)
+    stack, so each BFS step is a handful of array operations however
+    many fields there are.
+
+    Args:
+        walkable: Boolean array of enterable tiles
+        sources: List of start tile lists, each tile as (x, y); tiles that
+            are not walkable are ignored
+
+    Returns:
+        (sources, height, width) int32 array of steps to the nearest start
+        tile of each set, -1 where unreachable
+    """
+    distance = np.full((len(sources),) + walkable.shape, -1, dtype=np.int32)
+    frontier = np.zeros(distance.shape, dtype=bool)
+    for index, cells in enumerate(sources):
+        for x, y in cells:
+            frontier[index, y, x] = True
+    frontier &= walkable
+    unvisited = walkable & ~frontier
+
+    steps = 0
+    while frontier.any():
+        np.copyto(distance, steps, where=frontier)
+        steps += 1
+        grown = frontier.copy()
+        grown[:, 1:] |= frontier[:, :-1]
+        grown[:, :-1] |= frontier[:, 1:]
+        grown[:, :, 1:] |= frontier[:, :, :-1]
+        grown[:, :, :-1] |= frontier[:, :, 1:]
+        grown &= unvisited
+        unvisited ^= grown
+        frontier = grown
+    return distance
+
+def analyze_world(maps):
+    """
+    Build the walkability, component and distance tables for every mode.
+
+    Args:
+        maps: Dict of (x, y) -> LevelMap from compile_maps.load_maps
+
+    Returns:
+        WorldAnalysis with the world tile values, the points of interest
+        and a dict of mode name -> ModeTables
+    """
+    values = world_values(maps)
+    pois = points_of_interest(values)
+    modes = {}
+    for mode in MOVE_MODES:
+        walkable = walkable_mask(values, mode)
+        labels, count = label_regions(walkable, MOVES)
+        fields = distance_fields(walkable, [poi.cells for poi in pois])
+        modes[mode] = ModeTables(walkable, labels, count, fields)
+    return WorldAnalysis(values, pois, modes)
+
+def validate_reachability(analysis, allow=SEALED_POIS):
+    """
+    Check that every spawn is walkable and every point of interest can be
+    reached from the start spawn in the most permissive mode.
+
+    Args:
+        analysis: WorldAnalysis from analyze_world
+        allow: Names of points of interest that may be unreachable
+
+    Returns:
+        List of failure descriptions (empty on success)
+    """
+    failures = []
+    start = analysis.pois[0]
+    foot = analysis.modes['foot']
+    for poi, field in zip(analysis.pois, foot.fields):
+        if poi.kind == 'spawn' and field[poi.cells[0][1], poi.cells[0][0]] < 0:
+            failures.append(f"{poi.name}: spawn is not on a walkable tile")
+
+    widest = list(MOVE_MODES)[-1]
+    reach = analysis.modes[widest].fields[0]
+    for poi in analysis.pois[1:]:
+        if poi.name in allow:
+            continue
+        if all(reach[y, x] < 0 for x, y in poi.cells):
+            failures.append(f"{poi.name}: not reachable from {start.name}, even by {widest}")
+    return failures
+
+def field_bytes(largest):
+    """Smallest of 1 or 2 bytes per entry that holds largest plus a sentinel."""
+    if largest < 0xFF:
+        return 1
+    if largest < 0xFFFF:
+        return 2
+    raise ValueError(f"value {largest} does not fit in a 2-byte table")
+
+def pack_nav(analysis):
+    """Pack a WorldAnalysis into the table format described above."""
+    height, width = analysis.values.shape
+    modes = analysis.modes
+    label_bytes = field_bytes(max(tables.count for tables in modes.values()))
+    distance_bytes = field_bytes(max(int(field.max()) for tables in modes.values()
+                                     for field in tables.fields))
+    label_type = f'<u{label_bytes}'
+    distance_type = f'<u{distance_bytes}'
+    unreachable = (1 << (8 * distance_bytes)) - 1
+
+    parts = [NAV_HEADER.pack(NAV_MAGIC, NAV_VERSION, width, height, len(modes),
+                             len(analysis.pois), label_bytes, distance_bytes)]
+    parts += [MODE_ENTRY.pack(name.encode('ascii'), tables.count) for name, tables in modes.items()]
+    parts += [POI_ENTRY.pack(POI_KIND_ORDER.index(poi.kind), *poi.cells[0]) for poi in analysis.pois]
+    for tables in modes.values():
+        parts.append(tables.labels.astype(label_type).tobytes())
+        for field in tables.fields:
+            parts.append(np.where(field < 0, unreachable, field).astype(distance_type).tobytes())
+    return b''.join(parts)
+
+def write_nav(analysis, nav_path):
+    """Write the packed tables; returns the file size in bytes."""
+    data = pack_nav(analysis)
+    with open(nav_path, 'wb') as f:
+        f.write(data)
+    return len(data)
+
+def read_nav(nav_path):
+    """
+    Read a packed table file.
+
+    Returns:
+        (pois, modes) where pois lists (kind, x, y) and modes maps mode name
+        -> (count, labels, fields) with fields as int32 arrays, -1 where
+        unreachable
+
+    Raises:
+        ValueError: If the file is not a version 1 table file or is truncated
+    """
+    with open(nav_path, 'rb') as f:
+        data = f.read()
+    if len(data) < NAV_HEADER.size:
+        raise ValueError(f"{nav_path}: truncated header")
+    (magic, version, width, height, mode_count, poi_count,
+     label_bytes, distance_bytes) = NAV_HEADER.unpack_from(data)
+    if magic != NAV_MAGIC or version != NAV_VERSION:
+        raise ValueError(f"{nav_path}: not a version {NAV_VERSION} table file")
+
+    offset = NAV_HEADER.size
+    entries = []
+    for _ in range(mode_count):
+        name, count = MODE_ENTRY.unpack_from(data, offset)
+        entries.append((name.rstrip(b'\0').decode('ascii'), count))
+        offset += MODE_ENTRY.size
+    pois = []
+    for _ in range(poi_count):
+        kind, x, y = POI_ENTRY.unpack_from(data, offset)
+        pois.append((POI_KIND_ORDER[kind], x, y))
+        offset += POI_ENTRY.size
+
+    cells = width * height
+    unreachable = (1 << (8 * distance_bytes)) - 1
+    expected = offset + mode_count * cells * (label_bytes + poi_count * distance_bytes)
+    if len(data) != expected:
+        raise ValueError(f"{nav_path}: expected {expected} bytes, got {len(data)}")
+
+    modes = {}
+    for name, count in entries:
+        labels = np.frombuffer(data, f'<u{label_bytes}', cells, offset).reshape(height, width)
+        offset += cells * label_bytes
+        fields = []
+        for _ in range(poi_count):
+            raw = np.frombuffer(data, f'<u{distance_bytes}', cells, offset).astype(np.int32)
+            fields.append(np.where(raw == unreachable, -1, raw).reshape(height, width))
+            offset += cells * distance_bytes
+        modes[name] = (count, labels, fields)
+    return pois, modes
+
+def check_nav(analysis, nav_path):
+    """
+    Read a table file back and compare it with the analysis it was written from.
+
+    Returns:
+        List of mismatch descriptions (empty on success)
+    """
+    pois, modes = read_nav(nav_path)
+    failures = []
+    if pois != [(poi.kind, *poi.cells[0]) for poi in analysis.pois]:
+        failures.append("points of interest differ")
+    if list(modes) != list(analysis.modes):
+        return failures + ["movement modes differ"]
+    for name, tables in analysis.modes.items():
+        count, labels, fields = modes[name]
+        if count != tables.count or not np.array_equal(labels, tables.labels):
+            failures.append(f"{name}: components differ")
+        if any(not np.array_equal(a, b) for a, b in zip(fields, tables.fields)):
+            failures.append(f"{name}: distance fields differ")
+    return failures
+
+def print_analysis(analysis):
+    """Report reachability per mode and the steps from the start spawn to each point."""
+    start = analysis.pois[0]
+    for name, tables in analysis.modes.items():
+        reach = tables.fields[0] >= 0
+        sealed = tables.count - len(np.unique(tables.labels[reach]))
+        print(f"{name}: {int(tables.walkable.sum())} walkable tiles, {int(reach.sum())} reachable "
+              f"from {start.name}; components: {tables.count}, sealed off: {sealed}")
+    first, *rest = analysis.modes.values()
+    for name, tables in zip(list(analysis.modes)[1:], rest):
+        extra = (tables.fields[0] >= 0) & ~(first.fields[0] >= 0)
+        print(f"  {int(extra.sum())} tiles need the {name} to reach")
+
+    names = list(analysis.modes)
+    print(f"Steps from {start.name} ({', '.join(names)}):")
+    for index, poi in enumerate(analysis.pois[1:], 1):
+        steps = []
+        for tables in analysis.modes.values():
+            best = min((tables.fields[0][y, x] for x, y in poi.cells if tables.fields[0][y, x] >= 0),
+                       default=None)
+            steps.append('-' if best is None else str(best))
+        print(f"  {poi.name:24s} {' / '.join(steps)}")
+
+def main():
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description='Precompute walkability, connectivity and distance '
+                                                 'tables for the Zargon world')
+    parser.add_argument('source_dir', nargs='?', default='zargon', help='Directory with map11.lvl .. map44.lvl')
+    parser.add_argument('-o', '--output', default='zargon.nav', help='Output table file')
+    parser.add_argument('--check', action='store_true',
+                        help='Read the table file back and compare it with the analysis')
+    parser.add_argument('--validate', action='store_true',
+                        help='Only check that every point of interest is reachable, do not write tables')
+    parser.add_argument('--allow', action='append', default=[], metavar='NAME',
+                        help='Point of interest that may be unreachable, besides SEALED_POIS '
+                             '(repeatable)')
+    parser.add_argument('--strict', action='store_true',
+                        help='Do not allow the known sealed points of interest (SEALED_POIS)')
+
+    args = parser.parse_args()
+
+    try:
+        maps = load_maps(args.source_dir)
+    except ValueError as e:
+        print(f"Invalid map: {e}")
+        sys.exit(1)
+
+    start = time.perf_counter()
+    analysis = analyze_world(maps)
+    elapsed = time.perf_counter() - start
+    fields = sum(len(tables.fields) for tables in analysis.modes.values())
+    print(f"Analyzed {len(maps)} maps: {len(analysis.pois)} points of interest, {fields} distance fields "
+          f"in {elapsed * 1000:.1f} ms")
+    print_analysis(analysis)
+
+    allow = tuple(args.allow) + (() if args.strict else SEALED_POIS)
+    failures = validate_reachability(analysis, allow)
+    for failure in failures:
+        print(f"Reachability FAILED: {failure}")
+    if not failures:
+        allowed = sum(poi.name in allow for poi in analysis.pois)
+        print(f"Reachability OK: all {len(analysis.pois) - 1 - allowed} points of interest reachable "
+              f"from {analysis.pois[0].name}, besides {allowed} allowed to be sealed off")
+    if args.validate:
+        if failures:
+            sys.exit(1)
+        return
+
+    size = write_nav(analysis, args.output)
+    print(f"Wrote {args.output} ({size} bytes)")
+    if args.check:
+        mismatches = check_nav(analysis, args.output)
+        if mismatches:
+            print(f"Table check FAILED: {'; '.join(mismatches)}")
+            sys.exit(1)
+        print(f"Table check OK: {args.output} reads back identical")
+    if failures:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,164 @@
+package com.greenopal.zargon.domain.graphics
+
+import android.content.Context
+import android.graphics.Rect
+import dagger.hilt.android.qualifiers.ApplicationContext
+import java.io.IOException
+import java.nio.ByteBuffer
+import java.nio.ByteOrder
+import javax.inject.Inject
+import javax.inject.Singleton
+
+/**
+ * Collision masks, opaque bounds and row spans built by sprite_masks.py
+ * Hit tests and draw bounds become table lookups instead of bitmap pixel
+ * reads. If the mask index is not in assets, every lookup returns null
+ * (or false for hit tests).
+ */
+@Singleton
+class SpriteMasks @Inject constructor(
+    @ApplicationContext private val context: Context
+) {
+    private var masks: MaskData? = null
+    private var loaded = false
+
+    /**
+     * Tight box around the opaque pixels of a sprite by drawable name (e.g. "joe"),
+     * empty if nothing is opaque
+     */
+    fun getBounds(name: String): Rect? {
+        return ensureLoaded()?.entries?.get(name)?.bounds
+    }
+
+    /**
+     * Whether pixel (x, y) of a sprite is opaque; false outside the sprite
+     */
+    fun hit(name: String, x: Int, y: Int): Boolean {
+        val data = ensureLoaded() ?: return false
+        val entry = data.entries[name] ?: return false
+        return data.hit(entry, x, y)
+    }
+
+    /**
+     * Opaque column runs of one sprite row, as start until end ranges
+     */
+    fun getSpans(name: String, row: Int): List<IntRange>? {
+        val data = ensureLoaded() ?: return null
+        val entry = data.entries[name] ?: return null
+        if (row !in 0 until entry.height) return emptyList()
+        return data.spans(entry, row)
+    }
+
+    private fun ensureLoaded(): MaskData? {
+        if (!loaded) {
+            loaded = true
+            masks = try {
+                parseIndex(context.assets.open(MASK_FILE).use { it.readBytes() }).also {
+                    android.util.Log.d("SpriteMasks", "Loaded masks of ${it.entries.size} sprites from $MASK_FILE")
+                }
+            } catch (e: IOException) {
+                android.util.Log.d("SpriteMasks", "No sprite masks in assets")
+                null
+            } catch (e: IllegalArgumentException) {
+                android.util.Log.e("SpriteMasks", "Invalid mask index $MASK_FILE", e)
+                null
+            }
+        }
+        return masks
+    }
+
+    /**
+     * One sprite's entry in the mask index
+     */
+    data class MaskEntry(
+        val width: Int,
+        val height: Int,
+        val bounds: Rect,
+        val opaqueCount: Int,
+        val maskOffset: Int,
+        val spansOffset: Int
+    )
+
+    /**
+     * Parsed mask index; masks and spans are read in place from the file bytes
+     */
+    class MaskData(val entries: Map<String, MaskEntry>, private val data: ByteArray) {
+
+        fun hit(entry: MaskEntry, x: Int, y: Int): Boolean {
+            if (x !in 0 until entry.width || y !in 0 until entry.height) return false
+            val byte = data[entry.maskOffset + y * ((entry.width + 7) / 8) + x / 8].toInt()
+            return (byte and (0x80 ushr (x % 8))) != 0
+        }
+
+        fun spans(entry: MaskEntry, row: Int): List<IntRange> {
+            val first = readShort(entry.spansOffset + 2 * row)
+            val last = readShort(entry.spansOffset + 2 * (row + 1))
+            val spanStart = entry.spansOffset + 2 * (entry.height + 1)
+            return (first until last).map { span ->
+                readShort(spanStart + 4 * span) until readShort(spanStart + 4 * span + 2)
+            }
+        }
+
+        private fun readShort(offset: Int): Int {
+            return (data[offset].toInt() and 0xFF) or ((data[offset + 1].toInt() and 0xFF) shl 8)
+        }
+    }
+
+    companion object {
+        const val MASK_FILE = "sprite_masks.bin"
+        private const val VERSION = 1
+        private const val NAME_LENGTH = 16
+
+        /**
+         * Parse the binary mask index
+         *
+         * Format (little-endian):
+         * - 4 bytes: Magic "ZMSK"
+         * - 2 bytes: Version
+         * - 2 bytes: Number of entries
+         * - For each entry:
+         *   - 16 bytes: Name (ASCII, NUL padded)
+         *   - 2 bytes each: Width, height
+         *   - 2 bytes each: Bounds x, y, width, height
+         *   - 4 bytes: Opaque pixel count
+         *   - 4 bytes each: Mask offset, spans offset
+         * - At each mask offset: height rows of (width + 7) / 8 bytes,
+         *   leftmost pixel in the high bit
+         * - At each spans offset: height + 1 2-byte cumulative span counts,
+         *   then 2-byte start, end per span
+         */
+        fun parseIndex(data: ByteArray): MaskData {
+            val buffer = ByteBuffer.wrap(data).order(ByteOrder.LITTLE_ENDIAN)
+
+            val magic = ByteArray(4)
+            buffer.get(magic)
+            val version = buffer.short.toInt() and 0xFFFF
+            require(String(magic, Charsets.US_ASCII) == "ZMSK" && version == VERSION) {
+                "Not a version $VERSION mask index"
+            }
+            val count = buffer.short.toInt() and 0xFFFF
+
+            val entries = mutableMapOf<String, MaskEntry>()
+            repeat(count) {
+                val nameBytes = ByteArray(NAME_LENGTH)
+                buffer.get(nameBytes)
+                val width = buffer.short.toInt() and 0xFFFF
+                val height = buffer.short.toInt() and 0xFFFF
+                val x = buffer.short.toInt() and 0xFFFF
+                val y = buffer.short.toInt() and 0xFFFF
+                val w = buffer.short.toInt() and 0xFFFF
+                val h = buffer.short.toInt() and 0xFFFF
+                val opaque = buffer.int
+                val maskOffset = buffer.int
+                val spansOffset = buffer.int
+                require(maskOffset + height * ((width + 7) / 8) <= data.size &&
+                    spansOffset + 2 * (height + 1) <= data.size) {
+                    "Mask data out of range"
+                }
+                val name = String(nameBytes, Charsets.US_ASCII).trimEnd('\u0000')
+                entries[name] = MaskEntry(width, height, Rect(x, y, x + w, y + h), opaque, maskOffset, spansOffset)
+            }
+            return MaskData(entries, data)
+        }
+    }
+}
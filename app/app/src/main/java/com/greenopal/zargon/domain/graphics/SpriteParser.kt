@@ -4,12 +4,16 @@ import android.content.Context
 import androidx.compose.ui.graphics.Color
 import dagger.hilt.android.qualifiers.ApplicationContext
 import java.io.BufferedReader
+import java.io.IOException
 import java.io.InputStreamReader
+import java.nio.ByteBuffer
+import java.nio.ByteOrder
 import javax.inject.Inject
 import javax.inject.Singleton
 
 /**
- * Parses sprites from bomb.sht ASCII format.
+ * Parses sprites from bomb.sht ASCII format, or from the packed sprite
+ * bundle (pack_sprites.py) when it is present in assets.
  *
  * Format:
  * - Line 1: width (integer)
@@ -26,11 +30,19 @@ class SpriteParser @Inject constructor(
     /**
      * Parse all sprites from bomb.sht file in assets
      */
-    fun parseAllSprites(filename: String = "bomb.sht"): Map<String, Sprite> {
+    fun parseAllSprites(filename: String = SHT_FILE): Map<String, Sprite> {
         if (spriteCache.isNotEmpty()) {
             return spriteCache
         }
 
+        // Prefer the packed bundle, which needs no text tokenizing
+        if (filename == SHT_FILE) {
+            readBundle()?.let { sprites ->
+                spriteCache.putAll(sprites)
+                return sprites
+            }
+        }
+
         try {
             val inputStream = context.assets.open(filename)
             val reader = BufferedReader(InputStreamReader(inputStream))
@@ -73,6 +85,24 @@ class SpriteParser @Inject constructor(
         }
     }
 
+    /**
+     * Read every sprite from the packed bundle, or null if it is not in assets
+     */
+    private fun readBundle(): Map<String, Sprite>? {
+        val data = try {
+            context.assets.open(BUNDLE_FILE).use { it.readBytes() }
+        } catch (e: IOException) {
+            return null
+        }
+
+        return try {
+            parseBundle(data)
+        } catch (e: Exception) {
+            android.util.Log.e("SpriteParser", "Invalid sprite bundle $BUNDLE_FILE, using $SHT_FILE", e)
+            null
+        }
+    }
+
     /**
      * Get a specific sprite by name
      */
@@ -252,4 +282,87 @@ class SpriteParser @Inject constructor(
     fun clearCache() {
         spriteCache.clear()
     }
+
+    companion object {
+        const val SHT_FILE = "bomb.sht"
+        const val BUNDLE_FILE = "bomb.spb"
+        private const val BUNDLE_VERSION = 1
+        private const val NAME_LENGTH = 16
+        private const val ENCODING_4BPP = 0
+        private const val ENCODING_RLE = 1
+
+        /**
+         * Decode every sprite of a packed sprite bundle
+         *
+         * Format (little-endian):
+         * - 4 bytes: Magic "ZSPB"
+         * - 2 bytes each: Version, sprite count
+         * - Per sprite: 16 bytes NUL-padded name, 2 bytes each width and
+         *   height, 1 byte encoding, 4 bytes each data offset and length
+         * - Pixel data: 4bpp rows (high nibble first, padded to a byte) or
+         *   RLE bytes of (run length - 1) shl 4 or color
+         */
+        fun parseBundle(data: ByteArray): Map<String, Sprite> {
+            val buffer = ByteBuffer.wrap(data).order(ByteOrder.LITTLE_ENDIAN)
+
+            val magic = ByteArray(4)
+            buffer.get(magic)
+            val version = buffer.short.toInt() and 0xFFFF
+            require(String(magic, Charsets.US_ASCII) == "ZSPB" && version == BUNDLE_VERSION) {
+                "Not a version $BUNDLE_VERSION sprite bundle"
+            }
+            val count = buffer.short.toInt() and 0xFFFF
+
+            val sprites = LinkedHashMap<String, Sprite>()
+            repeat(count) {
+                val nameBytes = ByteArray(NAME_LENGTH)
+                buffer.get(nameBytes)
+                val name = String(nameBytes, Charsets.US_ASCII).trimEnd('\u0000')
+                val width = buffer.short.toInt() and 0xFFFF
+                val height = buffer.short.toInt() and 0xFFFF
+                val encoding = buffer.get().toInt() and 0xFF
+                val offset = buffer.int
+                val length = buffer.int
+
+                val indices = decodePixels(data, offset, length, width, height, encoding)
+                val pixels = List(height) { y ->
+                    List(width) { x -> EGAPalette.getColor(indices[y * width + x].toInt()) }
+                }
+                sprites[name] = Sprite(name, width, height, pixels)
+            }
+            return sprites
+        }
+
+        private fun decodePixels(
+            data: ByteArray, offset: Int, length: Int, width: Int, height: Int, encoding: Int
+        ): ByteArray {
+            val indices = ByteArray(width * height)
+            when (encoding) {
+                ENCODING_4BPP -> {
+                    val rowBytes = (width + 1) / 2
+                    require(length == rowBytes * height) { "4bpp data has the wrong length" }
+                    for (y in 0 until height) {
+                        for (x in 0 until width) {
+                            val packed = data[offset + y * rowBytes + x / 2].toInt() and 0xFF
+                            val value = if (x % 2 == 0) packed shr 4 else packed and 0x0F
+                            indices[y * width + x] = value.toByte()
+                        }
+                    }
+                }
+                ENCODING_RLE -> {
+                    var pos = 0
+                    for (i in offset until offset + length) {
+                        val run = data[i].toInt() and 0xFF
+                        val end = pos + (run shr 4) + 1
+                        require(end <= indices.size) { "RLE data overruns the sprite" }
+                        indices.fill((run and 0x0F).toByte(), pos, end)
+                        pos = end
+                    }
+                    require(pos == indices.size) { "RLE data ends early" }
+                }
+                else -> throw IllegalArgumentException("Unknown sprite encoding $encoding")
+            }
+            return indices
+        }
+    }
 }
@@ -0,0 +1,117 @@
+package com.greenopal.zargon.domain.graphics
+
+import android.content.Context
+import android.graphics.Bitmap
+import android.graphics.BitmapFactory
+import android.graphics.Rect
+import dagger.hilt.android.qualifiers.ApplicationContext
+import java.io.IOException
+import java.nio.ByteBuffer
+import java.nio.ByteOrder
+import javax.inject.Inject
+import javax.inject.Singleton
+
+/**
+ * Packed sprite atlas built by pack_atlas.py
+ * Holds one atlas bitmap and cuts individual sprites out of it by name,
+ * so the app decodes a single image instead of dozens of drawables.
+ * If the atlas files are not in assets, every lookup returns null and
+ * callers fall back to drawable resources.
+ */
+@Singleton
+class TextureAtlas @Inject constructor(
+    @ApplicationContext private val context: Context
+) {
+    private var atlasBitmap: Bitmap? = null
+    private var rects: Map<String, Rect> = emptyMap()
+    private var loaded = false
+
+    /**
+     * Get the atlas rectangle of a sprite by drawable name (e.g. "grass")
+     */
+    fun getRect(name: String): Rect? {
+        ensureLoaded()
+        return rects[name]
+    }
+
+    /**
+     * Cut a sprite out of the atlas at its native size
+     */
+    fun getBitmap(name: String): Bitmap? {
+        ensureLoaded()
+        val atlas = atlasBitmap ?: return null
+        val rect = rects[name] ?: return null
+        return Bitmap.createBitmap(atlas, rect.left, rect.top, rect.width(), rect.height())
+    }
+
+    private fun ensureLoaded() {
+        if (loaded) return
+        loaded = true
+
+        try {
+            val index = context.assets.open(INDEX_FILE).use { it.readBytes() }
+            val parsed = parseIndex(index)
+
+            val options = BitmapFactory.Options().apply {
+                inPreferredConfig = Bitmap.Config.ARGB_8888
+            }
+            val bitmap = context.assets.open(ATLAS_FILE).use {
+                BitmapFactory.decodeStream(it, null, options)
+            } ?: return
+
+            atlasBitmap = bitmap
+            rects = parsed
+            android.util.Log.d("TextureAtlas", "Loaded ${parsed.size} sprites from $ATLAS_FILE (${bitmap.width}x${bitmap.height})")
+        } catch (e: IOException) {
+            android.util.Log.d("TextureAtlas", "No texture atlas in assets, using drawables")
+        } catch (e: IllegalArgumentException) {
+            android.util.Log.e("TextureAtlas", "Invalid atlas index $INDEX_FILE", e)
+        }
+    }
+
+    companion object {
+        const val ATLAS_FILE = "atlas.png"
+        const val INDEX_FILE = "atlas.idx"
+        private const val VERSION = 1
+
+        /**
+         * Parse the binary atlas index
+         *
+         * Format (little-endian):
+         * - 4 bytes: Magic "ZATL"
+         * - 2 bytes: Version
+         * - 2 bytes: Atlas width
+         * - 2 bytes: Atlas height
+         * - 2 bytes: Number of entries
+         * - For each entry:
+         *   - 1 byte: Name length N
+         *   - N bytes: Name (ASCII)
+         *   - 2 bytes each: x, y, width, height
+         */
+        fun parseIndex(data: ByteArray): Map<String, Rect> {
+            val buffer = ByteBuffer.wrap(data).order(ByteOrder.LITTLE_ENDIAN)
+
+            val magic = ByteArray(4)
+            buffer.get(magic)
+            val version = buffer.short.toInt() and 0xFFFF
+            require(String(magic, Charsets.US_ASCII) == "ZATL" && version == VERSION) {
+                "Not a version $VERSION atlas index"
+            }
+            buffer.short  // atlas width
+            buffer.short  // atlas height
+            val count = buffer.short.toInt() and 0xFFFF
+
+            val rects = mutableMapOf<String, Rect>()
+            repeat(count) {
+                val nameBytes = ByteArray(buffer.get().toInt() and 0xFF)
+                buffer.get(nameBytes)
+                val x = buffer.short.toInt() and 0xFFFF
+                val y = buffer.short.toInt() and 0xFFFF
+                val w = buffer.short.toInt() and 0xFFFF
+                val h = buffer.short.toInt() and 0xFFFF
+                rects[String(nameBytes, Charsets.US_ASCII)] = Rect(x, y, x + w, y + h)
+            }
+            return rects
+        }
+    }
+}
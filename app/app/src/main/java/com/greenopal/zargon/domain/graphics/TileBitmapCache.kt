@@ -12,11 +12,13 @@ import javax.inject.Singleton
 
 /**
  * Optimized bitmap cache for tile rendering
- * Loads tiles from drawable resources and caches them for fast display
+ * Loads tiles from the packed texture atlas when one is bundled, otherwise
+ * from drawable resources, and caches them for fast display
  */
 @Singleton
 class TileBitmapCache @Inject constructor(
-    @ApplicationContext private val context: Context
+    @ApplicationContext private val context: Context,
+    private val textureAtlas: TextureAtlas
 ) {
     private val bitmapCache = mutableMapOf<String, Bitmap>()
     private val defaultTileSize = 32  // pixels
@@ -110,8 +112,10 @@ class TileBitmapCache @Inject constructor(
 
         android.util.Log.d("TileBitmapCache", "Loading tile '$tileId' from resource $resourceId")
 
-        // Load bitmap from drawable resources
-        val bitmap = loadBitmapFromResource(resourceId, size)
+        // Prefer the atlas entry with the drawable's name, then the drawable itself
+        val atlasName = context.resources.getResourceEntryName(resourceId)
+        val bitmap = textureAtlas.getBitmap(atlasName)?.let { scaleBitmap(it, size) }
+            ?: loadBitmapFromResource(resourceId, size)
         if (bitmap != null) {
             bitmapCache[cacheKey] = bitmap
             android.util.Log.d("TileBitmapCache", "Successfully loaded tile '$tileId' (${bitmap.width}x${bitmap.height})")
@@ -133,22 +137,27 @@ class TileBitmapCache @Inject constructor(
             }
             val originalBitmap = BitmapFactory.decodeResource(context.resources, resourceId, options)
 
-            // Scale to target size
-            if (originalBitmap != null && (originalBitmap.width != targetSize || originalBitmap.height != targetSize)) {
-                val scaledBitmap = Bitmap.createScaledBitmap(originalBitmap, targetSize, targetSize, false)
-                if (scaledBitmap != originalBitmap) {
-                    originalBitmap.recycle()
-                }
-                scaledBitmap
-            } else {
-                originalBitmap
-            }
+            originalBitmap?.let { scaleBitmap(it, targetSize) }
         } catch (e: Exception) {
             android.util.Log.e("TileBitmapCache", "Failed to load tile resource $resourceId", e)
             null
         }
     }
 
+    /**
+     * Scale a bitmap to the target size, recycling the original if a copy was made
+     */
+    private fun scaleBitmap(originalBitmap: Bitmap, targetSize: Int): Bitmap {
+        if (originalBitmap.width == targetSize && originalBitmap.height == targetSize) {
+            return originalBitmap
+        }
+        val scaledBitmap = Bitmap.createScaledBitmap(originalBitmap, targetSize, targetSize, false)
+        if (scaledBitmap != originalBitmap) {
+            originalBitmap.recycle()
+        }
+        return scaledBitmap
+    }
+
     /**
      * Pre-load common tiles for better performance
      */
@@ -3,12 +3,18 @@ package com.greenopal.zargon.domain.map
 import android.content.Context
 import dagger.hilt.android.qualifiers.ApplicationContext
 import java.io.BufferedReader
+import java.io.IOException
 import java.io.InputStreamReader
+import java.nio.ByteBuffer
+import java.nio.ByteOrder
 import javax.inject.Inject
 import javax.inject.Singleton
 
 /**
- * Parses map files from .lvl format
+ * Parses map files from .lvl format, or from the compiled world file
+ * (compile_maps.py) when it is present in assets
+ * The world file wins over the .lvl files, so after editing a map rebuild
+ * it with build_assets.py, which checks it against assets/ map*.lvl
  * Based on crossroad procedure (ZARGON.BAS:890)
  */
 @Singleton
@@ -16,6 +22,8 @@ class MapParser @Inject constructor(
     @ApplicationContext private val context: Context
 ) {
     private val mapCache = mutableMapOf<String, GameMap>()
+    private var worldData: ByteArray? = null
+    private var worldLoaded = false
 
     /**
      * Parse a map file
@@ -29,6 +37,12 @@ class MapParser @Inject constructor(
         // Check cache
         mapCache[cacheKey]?.let { return it }
 
+        // Prefer the compiled world file, one seek per map
+        readWorldMap(worldX, worldY)?.let { map ->
+            mapCache[cacheKey] = map
+            return map
+        }
+
         val filename = "map$worldX$worldY.lvl"
 
         try {
@@ -90,6 +104,29 @@ class MapParser @Inject constructor(
         }
     }
 
+    /**
+     * Read a map from the compiled world file, or null if it is not in assets
+     */
+    private fun readWorldMap(worldX: Int, worldY: Int): GameMap? {
+        if (!worldLoaded) {
+            worldLoaded = true
+            worldData = try {
+                context.assets.open(WORLD_FILE).use { it.readBytes() }
+            } catch (e: IOException) {
+                null
+            }
+        }
+        val data = worldData ?: return null
+
+        return try {
+            parseWorldMap(data, worldX, worldY)
+        } catch (e: Exception) {
+            android.util.Log.e("MapParser", "Invalid world file $WORLD_FILE, using .lvl files", e)
+            worldData = null
+            null
+        }
+    }
+
     /**
      * Create a default map (all grass) for testing
      */
@@ -107,4 +144,63 @@ class MapParser @Inject constructor(
     fun clearCache() {
         mapCache.clear()
     }
+
+    companion object {
+        const val WORLD_FILE = "zargon.wld"
+        private const val WORLD_VERSION = 1
+
+        /**
+         * Decode one map from a compiled world file
+         *
+         * Format (little-endian):
+         * - 4 bytes: Magic "ZWLD"
+         * - 2 bytes: Version
+         * - 1 byte each: Maps across, maps down, map width, map height
+         * - 16 bytes: ASCII tile code for each 4-bit tile value
+         * - 4 bytes per map: Record offset, index (y - 1) * across + (x - 1)
+         * - At each offset: width * height / 2 bytes of tiles (high nibble
+         *   first), then hut x, hut y, spot x, spot y and a flags byte
+         */
+        fun parseWorldMap(data: ByteArray, worldX: Int, worldY: Int): GameMap {
+            val buffer = ByteBuffer.wrap(data).order(ByteOrder.LITTLE_ENDIAN)
+
+            val magic = ByteArray(4)
+            buffer.get(magic)
+            val version = buffer.short.toInt() and 0xFFFF
+            require(String(magic, Charsets.US_ASCII) == "ZWLD" && version == WORLD_VERSION) {
+                "Not a version $WORLD_VERSION world file"
+            }
+            val across = buffer.get().toInt() and 0xFF
+            val down = buffer.get().toInt() and 0xFF
+            val width = buffer.get().toInt() and 0xFF
+            val height = buffer.get().toInt() and 0xFF
+            val codes = ByteArray(16)
+            buffer.get(codes)
+            require(worldX in 1..across && worldY in 1..down) {
+                "No map at ($worldX, $worldY)"
+            }
+
+            val offset = buffer.getInt(buffer.position() + 4 * ((worldY - 1) * across + (worldX - 1)))
+            val tiles = List(height) { y ->
+                List(width) { x ->
+                    val i = y * width + x
+                    val packed = data[offset + i / 2].toInt() and 0xFF
+                    val value = if (i % 2 == 0) packed shr 4 else packed and 0x0F
+                    TileType.fromCode(codes[value].toInt().toChar().toString())
+                }
+            }
+
+            buffer.position(offset + width * height / 2)
+            val hutX = buffer.get().toInt() and 0xFF
+            val hutY = buffer.get().toInt() and 0xFF
+            val spawnX = buffer.get().toInt() and 0xFF
+            val spawnY = buffer.get().toInt() and 0xFF
+
+            return GameMap(
+                tiles = tiles,
+                hutPosition = if (hutX > 0 && hutY > 0) Pair(hutX, hutY) else null,
+                spawnPosition = Pair(spawnX, spawnY)
+            )
+        }
+    }
 }
@@ -0,0 +1,184 @@
+package com.greenopal.zargon.domain.map
+
+import android.content.Context
+import dagger.hilt.android.qualifiers.ApplicationContext
+import java.io.IOException
+import java.nio.ByteBuffer
+import java.nio.ByteOrder
+import javax.inject.Inject
+import javax.inject.Singleton
+
+/**
+ * A point of interest in the navigation tables
+ * @param kind "spawn", "hut", "shop", "healer" or "castle"
+ * @param x World column (0-79) of its first tile
+ * @param y World row (0-39) of its first tile
+ */
+data class NavPoint(val kind: String, val x: Int, val y: Int)
+
+/**
+ * Decoded navigation tables; lookups read the packed arrays in place
+ */
+class NavData(
+    val width: Int,
+    val height: Int,
+    val modes: List<String>,
+    val componentCounts: List<Int>,
+    val points: List<NavPoint>,
+    private val data: ByteArray,
+    private val labelBytes: Int,
+    private val distanceBytes: Int,
+    private val tablesOffset: Int
+) {
+    private val cells = width * height
+    private val modeSize = cells * (labelBytes + points.size * distanceBytes)
+    private val unreachable = (1 shl (8 * distanceBytes)) - 1
+
+    /**
+     * Connected component of a world tile in a movement mode, 0 if the tile is not walkable
+     */
+    fun component(mode: Int, x: Int, y: Int): Int {
+        return read(tablesOffset + mode * modeSize + (y * width + x) * labelBytes, labelBytes)
+    }
+
+    /**
+     * Steps from point of interest [point] to a world tile, or null if unreachable
+     */
+    fun steps(mode: Int, point: Int, x: Int, y: Int): Int? {
+        val offset = tablesOffset + mode * modeSize + cells * labelBytes +
+            (point * cells + y * width + x) * distanceBytes
+        return read(offset, distanceBytes).takeIf { it != unreachable }
+    }
+
+    private fun read(offset: Int, bytes: Int): Int {
+        val low = data[offset].toInt() and 0xFF
+        return if (bytes == 1) low else low or ((data[offset + 1].toInt() and 0xFF) shl 8)
+    }
+}
+
+/**
+ * Walkability, connectivity and distance tables for the stitched 4x4 world,
+ * precomputed by analyze_maps.py into assets/zargon.nav
+ * Every lookup is a single read at a computed offset. If the file is not
+ * in assets, lookups return null.
+ */
+@Singleton
+class NavigationTables @Inject constructor(
+    @ApplicationContext private val context: Context
+) {
+    private var tables: NavData? = null
+    private var loaded = false
+
+    /**
+     * Spawns first (start, warp), then huts, shops, healers and castles
+     */
+    val pointsOfInterest: List<NavPoint>
+        get() = ensureLoaded()?.points ?: emptyList()
+
+    /**
+     * Connected component of a tile, 0 if it cannot be entered
+     * @param mode Movement mode, "foot" or "ship"
+     * @param worldX Map X coordinate (1-4)
+     * @param worldY Map Y coordinate (1-4)
+     * @param x Column on the map (0-19)
+     * @param y Row on the map (0-9)
+     */
+    fun component(mode: String, worldX: Int, worldY: Int, x: Int, y: Int): Int? {
+        val nav = ensureLoaded() ?: return null
+        val modeIndex = nav.modes.indexOf(mode).takeIf { it >= 0 } ?: return null
+        return nav.component(modeIndex, worldColumn(worldX, x), worldRow(worldY, y))
+    }
+
+    /**
+     * Steps from a point of interest (index into [pointsOfInterest]) to a
+     * tile, or null if it cannot be reached in the mode
+     */
+    fun steps(mode: String, point: Int, worldX: Int, worldY: Int, x: Int, y: Int): Int? {
+        val nav = ensureLoaded() ?: return null
+        val modeIndex = nav.modes.indexOf(mode).takeIf { it >= 0 } ?: return null
+        if (point !in nav.points.indices) return null
+        return nav.steps(modeIndex, point, worldColumn(worldX, x), worldRow(worldY, y))
+    }
+
+    private fun worldColumn(worldX: Int, x: Int) = (worldX - 1) * MAP_WIDTH + x
+
+    private fun worldRow(worldY: Int, y: Int) = (worldY - 1) * MAP_HEIGHT + y
+
+    private fun ensureLoaded(): NavData? {
+        if (!loaded) {
+            loaded = true
+            tables = try {
+                parseNav(context.assets.open(NAV_FILE).use { it.readBytes() })
+            } catch (e: IOException) {
+                android.util.Log.d("NavigationTables", "No navigation tables in assets")
+                null
+            } catch (e: IllegalArgumentException) {
+                android.util.Log.e("NavigationTables", "Invalid navigation tables $NAV_FILE", e)
+                null
+            }
+        }
+        return tables
+    }
+
+    companion object {
+        const val NAV_FILE = "zargon.nav"
+        private const val VERSION = 1
+        private const val MAP_WIDTH = 20
+        private const val MAP_HEIGHT = 10
+        private val KINDS = listOf("spawn", "hut", "shop", "healer", "castle")
+
+        /**
+         * Parse a navigation table file
+         *
+         * Format (little-endian):
+         * - 4 bytes: Magic "ZNAV"
+         * - 2 bytes: Version
+         * - 1 byte each: World width, world height, mode count
+         * - 2 bytes: Point of interest count
+         * - 1 byte each: Label bytes, distance bytes (1 or 2)
+         * - Per mode: 8 bytes ASCII name (NUL padded), 2 bytes component count
+         * - Per point of interest: 1 byte kind, 1 byte each world x and y
+         * - Per mode: width * height labels, then width * height steps per
+         *   point of interest; the largest value means unreachable
+         */
+        fun parseNav(data: ByteArray): NavData {
+            val buffer = ByteBuffer.wrap(data).order(ByteOrder.LITTLE_ENDIAN)
+
+            val magic = ByteArray(4)
+            buffer.get(magic)
+            val version = buffer.short.toInt() and 0xFFFF
+            require(String(magic, Charsets.US_ASCII) == "ZNAV" && version == VERSION) {
+                "Not a version $VERSION navigation table file"
+            }
+            val width = buffer.get().toInt() and 0xFF
+            val height = buffer.get().toInt() and 0xFF
+            val modeCount = buffer.get().toInt() and 0xFF
+            val pointCount = buffer.short.toInt() and 0xFFFF
+            val labelBytes = buffer.get().toInt() and 0xFF
+            val distanceBytes = buffer.get().toInt() and 0xFF
+            require(labelBytes in 1..2 && distanceBytes in 1..2) {
+                "Unsupported table entry sizes $labelBytes/$distanceBytes"
+            }
+
+            val modes = mutableListOf<String>()
+            val counts = mutableListOf<Int>()
+            repeat(modeCount) {
+                val name = ByteArray(8)
+                buffer.get(name)
+                modes.add(String(name, Charsets.US_ASCII).trimEnd('\u0000'))
+                counts.add(buffer.short.toInt() and 0xFFFF)
+            }
+            val points = List(pointCount) {
+                val kind = buffer.get().toInt() and 0xFF
+                require(kind in KINDS.indices) { "Unknown point of interest kind $kind" }
+                NavPoint(KINDS[kind], buffer.get().toInt() and 0xFF, buffer.get().toInt() and 0xFF)
+            }
+
+            val tablesOffset = buffer.position()
+            val expected = tablesOffset + modeCount * width * height * (labelBytes + pointCount * distanceBytes)
+            require(data.size == expected) { "Expected $expected bytes, got ${data.size}" }
+
+            return NavData(width, height, modes, counts, points, data, labelBytes, distanceBytes, tablesOffset)
+        }
+    }
+}
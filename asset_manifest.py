@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Content-addressed build manifest for the Zargon asset extractors.
+
+Each extracted PNG is recorded in a small JSON manifest next to it together
+with a SHA-256 digest of the source record it came from (a WAD record, a
+.sht sprite block, a range of DATA statements) and the decode parameters
+(scale, palette, transparency). On the next run an output is only decoded
+and rewritten when its digest changed or the file is missing.
+
+Manifest format (one file per extractor per output directory):
+{
+  "version": 1,
+  "outputs": {"grass.png": "<sha256 hex>", ...}
+}
+
+The manifest file name starts with a dot so the Android resource compiler
+ignores it when the output directory is a res/drawable-* folder.
+"""
+
+import hashlib
+import json
+import os
+
+MANIFEST_VERSION = 1
+
+def record_digest(source, **params):
+    """
+    Hash a source record together with its decode parameters.
+
+    Args:
+        source: bytes-like object (or str) holding the raw source record
+        **params: Decode parameters; values must be JSON serializable
+
+    Returns:
+        Hex SHA-256 digest
+    """
+    h = hashlib.sha256()
+    if isinstance(source, str):
+        source = source.encode('utf-8')
+    h.update(source)
+    h.update(json.dumps(params, sort_keys=True).encode('utf-8'))
+    return h.hexdigest()
+
+class AssetManifest:
+    """
+    Tracks which outputs in a directory are up to date.
+
+    Usage:
+        manifest = AssetManifest(output_dir, 'tiles')
+        digest = record_digest(data, scale=2)
+        if not manifest.is_fresh('grass.png', digest):
+            ...decode and save...
+            manifest.update('grass.png', digest)
+        manifest.save()
+        print(manifest.summary())
+    """
+
+    def __init__(self, output_dir, tool):
+        self.output_dir = output_dir
+        self.path = os.path.join(output_dir, f'.{tool}.manifest.json')
+        self.outputs = {}
+        self.hits = 0
+        self.rebuilt = 0
+
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+            if data.get('version') == MANIFEST_VERSION:
+                self.outputs = dict(data.get('outputs', {}))
+        except (OSError, ValueError):
+            # Missing or corrupt manifest means a full rebuild
+            self.outputs = {}
+
+    def is_fresh(self, filename, digest):
+        """Return True (and count a hit) if filename exists and matches digest."""
+        fresh = (self.outputs.get(filename) == digest
+                 and os.path.exists(os.path.join(self.output_dir, filename)))
+        if fresh:
+            self.hits += 1
+        return fresh
+
+    def update(self, filename, digest):
+        """Record that filename was rebuilt from a source with the given digest."""
+        self.outputs[filename] = digest
+        self.rebuilt += 1
+
+    def save(self):
+        """Write the manifest atomically."""
+        os.makedirs(self.output_dir, exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'version': MANIFEST_VERSION, 'outputs': self.outputs}, f,
+                      indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    def summary(self):
+        """One-line hit/rebuild report."""
+        return f"Incremental build: {self.hits} up to date, {self.rebuilt} rebuilt"
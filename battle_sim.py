@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+"""
+Vectorized Monte Carlo battle simulator mirroring the app's BattleEngine.
+
+Reproduces the damage rules in
+app/app/src/main/java/com/greenopal/zargon/domain/battle/BattleEngine.kt:
+- Player damage: max(1, baseAP + weaponBonus + roll), where roll is a
+  uniform integer in [-spread, spread] and spread = weaponBonus / 5
+  (no roll when spread <= 0, e.g. weapon bonuses of -5 or less)
+- Monster damage: max(1, int(AP * K / (totalDefense + K) * multiplier)),
+  where multiplier is uniform in [1 - spread, 1 + spread) and
+  spread = min(0.05 + AP / 1000, 0.30)
+
+and the turn order of BattleSimulator.kt in the test simulations: the
+player attacks first, and the monster only counterattacks if it survived.
+
+Every fight is one row of NumPy arrays. All fights advance one turn in
+lockstep and finished fights drop out of the active index, so millions
+of fights run in a few vectorized passes instead of a loop per fight.
+The older simulation files use a fixed +/-16% monster spread and no
+weapon spread; --fixed-spread 0.16 --no-weapon-spread reproduces those.
+
+Usage:
+    python3 battle_sim.py --level 5 --monster BELETH --scaling 3 -n 1000000
+    python3 battle_sim.py --level 5 --monster BELETH --scaling 3 --verify
+"""
+
+import random
+import time
+from collections import namedtuple
+
+import numpy as np
+
+# BattleEngine.DAMAGE_K
+DAMAGE_K = 20.0
+
+# MonsterType.kt: name -> (baseAP, baseDP)
+MONSTER_TYPES = {
+    'SLIME': (1, 5),
+    'BAT': (2, 10),
+    'BABBLE': (5, 12),
+    'SPOOK': (7, 14),
+    'BELETH': (8, 16),
+    'SKANDER_SNAKE': (12, 20),
+    'NECRO': (13, 30),
+    'KRAKEN': (40, 200),
+    'ZARGON': (100, 400),
+}
+
+Loadout = namedtuple('Loadout', ['level', 'base_ap', 'weapon_bonus', 'armor_bonus',
+                                 'base_dp', 'max_hp', 'label'])
+Loadout.__doc__ = """A player build; totals are base_ap + weapon_bonus and
+base_dp + armor_bonus, as in CharacterStats."""
+
+# Canonical loadouts by level (HpExponentSimulation.LOADOUTS)
+LOADOUTS = [
+    Loadout(1, 5, 5, 5, 20, 20, 'Dagger/Cloth'),
+    Loadout(3, 9, 8, 8, 28, 30, 'Short Sword/Leather'),
+    Loadout(5, 13, 13, 15, 36, 40, 'Long Sword/Plated Leather'),
+    Loadout(7, 17, 18, 20, 44, 50, 'Sword of Thorns/Spiked Leather'),
+    Loadout(9, 21, 23, 30, 52, 60, 'Broad Sword/Chain Mail'),
+    Loadout(11, 25, 35, 42, 60, 70, 'Atlantean Sword/Platemail'),
+]
+
+BattleResults = namedtuple('BattleResults', ['won', 'turns', 'damage_dealt', 'damage_taken',
+                                             'player_hp_left', 'monster_hp_left'])
+BattleResults.__doc__ = """Per-fight outcome arrays, one entry per fight, matching the
+fields of BattleSimulator.BattleLog."""
+
+def loadout_for_level(level):
+    """Canonical loadout for a level: the highest one at or below it."""
+    candidates = [l for l in LOADOUTS if l.level <= level]
+    return candidates[-1] if candidates else LOADOUTS[0]
+
+def scaled_monster(name, scaling_factor, hp_exponent=1.0):
+    """
+    Monster AP and HP at a scaling factor.
+
+    AP is linear in the scaling factor (MonsterStats.create); HP uses
+    baseDP * scaling^hp_exponent as in HpExponentSimulation, which is the
+    game's linear rule at hp_exponent = 1.
+
+    Returns:
+        (attack_power, hp)
+    """
+    base_ap, base_dp = MONSTER_TYPES[name]
+    hp = max(1, int(base_dp * float(scaling_factor) ** hp_exponent))
+    return base_ap * scaling_factor, hp
+
+def _column(value, fights, dtype):
+    return np.broadcast_to(np.asarray(value, dtype=dtype), (fights,)).copy()
+
+def weapon_spread(weapon_bonus):
+    """BattleEngine's weaponBonus / 5, truncated toward zero like Kotlin Int division."""
+    weapon_bonus = np.asarray(weapon_bonus, dtype=np.int64)
+    return np.sign(weapon_bonus) * (np.abs(weapon_bonus) // 5)
+
+def monster_spread(attack_power):
+    """BattleEngine's monster multiplier spread: 0.05 + AP / 1000, capped at 0.30."""
+    return np.minimum(0.05 + np.asarray(attack_power, dtype=np.float64) / 1000.0, 0.30)
+
+def simulate(fights, player_ap, weapon_bonus, total_defense, player_hp, monster_ap, monster_hp,
+             k=DAMAGE_K, fixed_spread=None, use_weapon_spread=True, seed=None):
+    """
+    Simulate many independent fights at once.
+
+    Every stat may be a scalar or an array of length fights, so one call
+    can cover a whole grid of scenarios.
+
+    Args:
+        fights: Number of fights (rows)
+        player_ap: Character baseAP
+        weapon_bonus: Effective weapon bonus
+        total_defense: baseDP + effective armor bonus
+        player_hp: Starting player HP
+        monster_ap: Monster attackPower
+        monster_hp: Monster starting HP
+        k: Hyperbolic damage constant (BattleEngine.DAMAGE_K)
+        fixed_spread: Use a fixed monster multiplier spread (e.g. 0.16)
+            instead of BattleEngine's AP-driven one
+        use_weapon_spread: Apply BattleEngine's weapon damage roll; False
+            hits for exactly baseAP + weaponBonus like the older simulations
+        seed: Seed for numpy.random.default_rng
+
+    Returns:
+        BattleResults
+    """
+    rng = np.random.default_rng(seed)
+
+    player_damage = _column(player_ap, fights, np.int64) + _column(weapon_bonus, fights, np.int64)
+    # BattleEngine rolls 0 when spread <= 0; a negative spread would be an empty range
+    roll_spread = np.maximum(_column(weapon_spread(weapon_bonus), fights, np.int64), 0)
+    attack = _column(monster_ap, fights, np.float64)
+    defense = _column(total_defense, fights, np.float64)
+    # Same operation order as the Kotlin expression: AP * K / (def + K) * multiplier
+    base_hit = attack * k / (defense + k)
+    if fixed_spread is None:
+        spread = monster_spread(attack)
+    else:
+        spread = _column(fixed_spread, fights, np.float64)
+
+    php = _column(player_hp, fights, np.int64)
+    mhp = _column(monster_hp, fights, np.int64)
+    turns = np.zeros(fights, dtype=np.int32)
+    dealt = np.zeros(fights, dtype=np.int64)
+    taken = np.zeros(fights, dtype=np.int64)
+    won = np.zeros(fights, dtype=bool)
+
+    active = np.arange(fights)
+    turn = 0
+    while active.size:
+        turn += 1
+        turns[active] = turn
+
+        # Player attack
+        damage = player_damage[active]
+        if use_weapon_spread:
+            s = roll_spread[active]
+            damage = damage + rng.integers(-s, s + 1)
+        damage = np.maximum(1, damage)
+        before = mhp[active]
+        after = np.maximum(0, before - damage)
+        dealt[active] += before - after
+        mhp[active] = after
+        killed = after == 0
+        won[active[killed]] = True
+        active = active[~killed]
+        if not active.size:
+            break
+
+        # Monster counterattack
+        s = spread[active]
+        multiplier = (1.0 - s) + rng.random(active.size) * (2.0 * s)
+        damage = np.maximum(1, (base_hit[active] * multiplier).astype(np.int64))
+        before = php[active]
+        after = np.maximum(0, before - damage)
+        taken[active] += before - after
+        php[active] = after
+        active = active[after > 0]
+
+    return BattleResults(won, turns, dealt, taken, php, mhp)
+
+def simulate_reference(fights, player_ap, weapon_bonus, total_defense, player_hp, monster_ap,
+                       monster_hp, k=DAMAGE_K, fixed_spread=None, use_weapon_spread=True, seed=None):
+    """
+    Fight-by-fight port of BattleSimulator.simulateBattle for scalar stats.
+
+    Slow; used by --verify as an independent check of simulate().
+
+    Returns:
+        BattleResults
+    """
+    rng = random.Random(seed)
+    spread_w = max(int(weapon_spread(weapon_bonus)), 0)
+    spread_m = monster_spread(monster_ap).item() if fixed_spread is None else fixed_spread
+    columns = [[] for _ in BattleResults._fields]
+
+    for _ in range(fights):
+        php, mhp = player_hp, monster_hp
+        turns = dealt = taken = 0
+        while True:
+            turns += 1
+            roll = rng.randint(-spread_w, spread_w) if use_weapon_spread and spread_w > 0 else 0
+            damage = max(1, player_ap + weapon_bonus + roll)
+            dealt += mhp - max(0, mhp - damage)
+            mhp = max(0, mhp - damage)
+            if mhp == 0:
+                break
+            multiplier = (1.0 - spread_m) + rng.random() * (2.0 * spread_m)
+            damage = max(1, int(monster_ap * k / (total_defense + k) * multiplier))
+            taken += php - max(0, php - damage)
+            php = max(0, php - damage)
+            if php == 0:
+                break
+        for column, value in zip(columns, (php > 0, turns, dealt, taken, php, mhp)):
+            column.append(value)
+
+    return BattleResults(*(np.array(column) for column in columns))
+
+def summarize(results):
+    """
+    Reduce per-fight arrays to report statistics.
+
+    Returns:
+        Dict with fights, win_rate, win_rate_se and, for turns,
+        damage_dealt, damage_taken and player_hp_left (wins only), a dict
+        of mean/std/p5/p50/p95/max
+    """
+    def dist(values):
+        if not values.size:
+            return None
+        p5, p50, p95 = np.percentile(values, [5, 50, 95])
+        return {'mean': float(values.mean()), 'std': float(values.std()),
+                'p5': float(p5), 'p50': float(p50), 'p95': float(p95), 'max': int(values.max())}
+
+    fights = results.won.size
+    win_rate = float(results.won.mean()) if fights else 0.0
+    return {
+        'fights': fights,
+        'win_rate': win_rate,
+        'win_rate_se': (win_rate * (1 - win_rate) / fights) ** 0.5 if fights else 0.0,
+        'turns': dist(results.turns),
+        'damage_dealt': dist(results.damage_dealt),
+        'damage_taken': dist(results.damage_taken),
+        'player_hp_left': dist(results.player_hp_left[results.won]),
+    }
+
+def print_summary(summary):
+    print(f"Fights:   {summary['fights']}")
+    print(f"Win rate: {summary['win_rate']:.2%} (+/- {1.96 * summary['win_rate_se']:.2%} at 95%)")
+    print(f"{'':16s} {'mean':>8s} {'std':>8s} {'p5':>6s} {'p50':>6s} {'p95':>6s} {'max':>6s}")
+    for key in ('turns', 'damage_dealt', 'damage_taken', 'player_hp_left'):
+        d = summary[key]
+        if d is None:
+            print(f"{key:16s} {'-':>8s}")
+            continue
+        print(f"{key:16s} {d['mean']:8.2f} {d['std']:8.2f} {d['p5']:6.0f} {d['p50']:6.0f} "
+              f"{d['p95']:6.0f} {d['max']:6d}")
+
+def compare(fast, reference, tolerance=4.0):
+    """
+    Check two summaries agree within tolerance standard errors.
+
+    Compares the win rate and the means of turns and damage taken.
+
+    Returns:
+        List of (statistic, fast value, reference value, z-score, ok)
+    """
+    rows = []
+    se = (fast['win_rate_se'] ** 2 + reference['win_rate_se'] ** 2) ** 0.5
+    diff = fast['win_rate'] - reference['win_rate']
+    z = diff / se if se else (0.0 if diff == 0 else float('inf'))
+    rows.append(('win_rate', fast['win_rate'], reference['win_rate'], z, abs(z) <= tolerance))
+    for key in ('turns', 'damage_taken'):
+        a, b = fast[key], reference[key]
+        se = ((a['std'] ** 2) / fast['fights'] + (b['std'] ** 2) / reference['fights']) ** 0.5
+        diff = a['mean'] - b['mean']
+        z = diff / se if se else (0.0 if diff == 0 else float('inf'))
+        rows.append((f'{key} mean', a['mean'], b['mean'], z, abs(z) <= tolerance))
+    return rows
+
+def main():
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description='Monte Carlo battle simulation mirroring BattleEngine')
+    parser.add_argument('--level', type=int, default=1, help='Player level; picks the canonical loadout')
+    parser.add_argument('--monster', default='SLIME', choices=sorted(MONSTER_TYPES), help='Monster type')
+    parser.add_argument('--scaling', type=int, default=1, help='Monster scaling factor (default: 1)')
+    parser.add_argument('--hp-exponent', type=float, default=1.0,
+                        help='Monster HP = baseDP * scaling^exponent (default: 1.0, the game rule)')
+    parser.add_argument('-k', type=float, default=DAMAGE_K, help=f'Damage constant (default: {DAMAGE_K:g})')
+    parser.add_argument('--fixed-spread', type=float, default=None,
+                        help='Fixed monster damage spread, e.g. 0.16 for the older simulations')
+    parser.add_argument('--no-weapon-spread', action='store_true',
+                        help='Player always hits for baseAP + weaponBonus')
+    parser.add_argument('--ap', type=int, help='Override player baseAP')
+    parser.add_argument('--weapon', type=int, help='Override weapon bonus')
+    parser.add_argument('--armor', type=int, help='Override armor bonus')
+    parser.add_argument('--dp', type=int, help='Override player baseDP')
+    parser.add_argument('--hp', type=int, help='Override player max HP')
+    parser.add_argument('-n', '--fights', type=int, default=1000000, help='Fights to simulate')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed (default: 42)')
+    parser.add_argument('--verify', action='store_true',
+                        help='Also run the fight-by-fight reference and compare statistically')
+
+    args = parser.parse_args()
+
+    loadout = loadout_for_level(args.level)
+    base_ap = args.ap if args.ap is not None else loadout.base_ap
+    weapon = args.weapon if args.weapon is not None else loadout.weapon_bonus
+    armor = args.armor if args.armor is not None else loadout.armor_bonus
+    base_dp = args.dp if args.dp is not None else loadout.base_dp
+    max_hp = args.hp if args.hp is not None else loadout.max_hp
+    monster_ap, monster_hp = scaled_monster(args.monster, args.scaling, args.hp_exponent)
+
+    print(f"Player: level {args.level} {loadout.label}, AP {base_ap}+{weapon}, "
+          f"defense {base_dp}+{armor}, HP {max_hp}")
+    print(f"Monster: {args.monster} x{args.scaling}, AP {monster_ap}, HP {monster_hp}, K {args.k:g}")
+
+    params = dict(player_ap=base_ap, weapon_bonus=weapon, total_defense=base_dp + armor,
+                  player_hp=max_hp, monster_ap=monster_ap, monster_hp=monster_hp, k=args.k,
+                  fixed_spread=args.fixed_spread, use_weapon_spread=not args.no_weapon_spread)
+
+    start = time.perf_counter()
+    summary = summarize(simulate(args.fights, seed=args.seed, **params))
+    elapsed = time.perf_counter() - start
+    print_summary(summary)
+    print(f"Simulated {args.fights} fights in {elapsed * 1000:.0f} ms "
+          f"({args.fights / elapsed:,.0f} fights/s)")
+
+    if args.verify:
+        ref_fights = min(args.fights, 200000)
+        start = time.perf_counter()
+        reference = summarize(simulate_reference(ref_fights, seed=args.seed + 1, **params))
+        elapsed = time.perf_counter() - start
+        print(f"\nReference: {ref_fights} fights fight by fight in {elapsed * 1000:.0f} ms "
+              f"({ref_fights / elapsed:,.0f} fights/s)")
+        rows = compare(summary, reference)
+        for name, fast, ref, z, ok in rows:
+            print(f"  {name:18s} {fast:10.4f} {ref:10.4f}  z={z:+6.2f}  {'OK' if ok else 'MISMATCH'}")
+        if not all(ok for *_, ok in rows):
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
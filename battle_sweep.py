@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+Parallel parameter sweeps over battle_sim.py with an on-disk cell cache.
+
+A sweep is a declarative JSON grid. Every combination of the axis values
+is one cell; each cell simulates `fights` battles with battle_sim.simulate.
+
+Grid file format:
+{
+  "k": [15, 20, 30, 40],          damage constant
+  "hp_exponent": [0.6, 1.0],      monster HP = baseDP * scaling^exponent
+  "scaling": [1, 2, 3, 4],        monster scaling factor
+  "level": [1, 5, 10],            player level (base stats below)
+  "loadout": ["canonical", "Broad Sword/Chain Mail", {"name": "No Armor", "weapon": 5, "armor": 0}],
+  "monster": ["SLIME", "NECRO"],
+  "fights": 100000,               per cell (default 100000)
+  "seed": 42,                     base seed (default 42)
+  "fixed_spread": null,           see battle_sim.py --fixed-spread
+  "weapon_spread": true           see battle_sim.py --no-weapon-spread
+}
+Missing axes use one default value (k 20, hp_exponent 1.0, scaling 1,
+level 1, loadout canonical, monster SLIME).
+
+Player base stats (baseAP, baseDP, maxHP) come from the canonical
+battle_sim.LOADOUTS entry for the level, exactly as battle_sim.py --level
+picks them, so a cell and the matching battle_sim run fight with the same
+player. A loadout sets the weapon and armor bonuses: "canonical" takes
+them from that same entry, a label picks another loadout's bonuses, and
+an object gives them explicitly.
+
+Each cell's random seed is derived from its own parameters and the base
+seed, so a cell's result does not depend on which other cells are in the
+grid. Results are cached in one small JSON file per cell, named by a hash
+of the cell parameters, seed, fight count and SIM_VERSION; re-running a
+sweep with one extra K value only simulates the new cells. The combined
+result is written as one columnar .npz file (one array per column).
+
+Usage:
+    python3 battle_sweep.py grid.json -o sweep.npz -j 8
+    python3 battle_sweep.py --show sweep.npz --where k=30 --where monster=NECRO
+"""
+
+import hashlib
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from battle_sim import LOADOUTS, DAMAGE_K, loadout_for_level, scaled_monster, simulate, summarize
+
+# Bump when battle_sim's rules or the player stats change so cached cells are recomputed
+SIM_VERSION = 2
+
+AXES = ['k', 'hp_exponent', 'scaling', 'level', 'loadout', 'monster']
+AXIS_DEFAULTS = {'k': DAMAGE_K, 'hp_exponent': 1.0, 'scaling': 1, 'level': 1,
+                 'loadout': 'canonical', 'monster': 'SLIME'}
+
+def player_stats(level):
+    """Base (ap, dp, max_hp) for a level, from its canonical battle_sim loadout."""
+    loadout = loadout_for_level(level)
+    return loadout.base_ap, loadout.base_dp, loadout.max_hp
+
+def resolve_loadout(loadout, level):
+    """
+    Turn a grid loadout value into (name, weapon_bonus, armor_bonus).
+
+    Raises:
+        ValueError: For an unknown label or malformed object
+    """
+    if loadout == 'canonical':
+        canonical = loadout_for_level(level)
+        return 'canonical', canonical.weapon_bonus, canonical.armor_bonus
+    if isinstance(loadout, dict):
+        try:
+            weapon, armor = int(loadout['weapon']), int(loadout['armor'])
+        except (KeyError, TypeError, ValueError):
+            raise ValueError(f"loadout object needs integer weapon and armor: {loadout!r}")
+        return loadout.get('name', f'w{weapon}/a{armor}'), weapon, armor
+    for candidate in LOADOUTS:
+        if candidate.label == loadout:
+            return candidate.label, candidate.weapon_bonus, candidate.armor_bonus
+    raise ValueError(f"unknown loadout {loadout!r}")
+
+def load_grid(grid_path):
+    """
+    Read a grid file and expand it into cells.
+
+    Returns:
+        (cells, settings) where each cell is a dict with the AXES keys and
+        settings holds fights, seed, fixed_spread and weapon_spread
+    """
+    with open(grid_path, 'r') as f:
+        grid = json.load(f)
+
+    unknown = set(grid) - set(AXES) - {'fights', 'seed', 'fixed_spread', 'weapon_spread'}
+    if unknown:
+        raise ValueError(f"{grid_path}: unknown keys {', '.join(sorted(unknown))}")
+
+    values = []
+    for axis in AXES:
+        axis_values = grid.get(axis, [AXIS_DEFAULTS[axis]])
+        if not isinstance(axis_values, list) or not axis_values:
+            raise ValueError(f"{grid_path}: {axis} must be a non-empty list")
+        values.append(axis_values)
+
+    cells = [dict(zip(AXES, combo)) for combo in itertools.product(*values)]
+    for cell in cells:
+        resolve_loadout(cell['loadout'], cell['level'])
+        scaled_monster(cell['monster'], cell['scaling'], cell['hp_exponent'])
+
+    settings = {
+        'fights': int(grid.get('fights', 100000)),
+        'seed': int(grid.get('seed', 42)),
+        'fixed_spread': grid.get('fixed_spread'),
+        'weapon_spread': bool(grid.get('weapon_spread', True)),
+    }
+    return cells, settings
+
+def cell_key(cell, settings):
+    """Cache key: hash of the cell, the simulation settings and SIM_VERSION."""
+    payload = json.dumps({'cell': cell, 'settings': settings, 'version': SIM_VERSION},
+                         sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def cell_seed(cell, base_seed):
+    """Per-cell seed derived from the cell parameters, independent of the grid."""
+    payload = json.dumps({'cell': cell, 'seed': base_seed}, sort_keys=True)
+    return int(hashlib.sha256(payload.encode('utf-8')).hexdigest()[:15], 16)
+
+def run_cell(task):
+    """Simulate one cell in a worker and return (key, row)."""
+    key, cell, settings = task
+    start = time.perf_counter()
+
+    name, weapon, armor = resolve_loadout(cell['loadout'], cell['level'])
+    base_ap, base_dp, max_hp = player_stats(cell['level'])
+    monster_ap, monster_hp = scaled_monster(cell['monster'], cell['scaling'], cell['hp_exponent'])
+    seed = cell_seed(cell, settings['seed'])
+
+    summary = summarize(simulate(
+        settings['fights'], base_ap, weapon, base_dp + armor, max_hp, monster_ap, monster_hp,
+        k=cell['k'], fixed_spread=settings['fixed_spread'],
+        use_weapon_spread=settings['weapon_spread'], seed=seed))
+
+    def stat(key, field):
+        return summary[key][field] if summary[key] is not None else float('nan')
+
+    row = dict(cell)
+    row.update({
+        # Loadout objects are stored by name in the result file
+        'loadout': name,
+        'player_ap': base_ap, 'weapon': weapon, 'armor': armor,
+        'defense': base_dp + armor, 'player_hp': max_hp,
+        'monster_ap': monster_ap, 'monster_hp': monster_hp,
+        'fights': settings['fights'], 'seed': seed,
+        'win_rate': summary['win_rate'], 'win_rate_se': summary['win_rate_se'],
+        'turns_mean': stat('turns', 'mean'), 'turns_p50': stat('turns', 'p50'),
+        'turns_p95': stat('turns', 'p95'),
+        'damage_dealt_mean': stat('damage_dealt', 'mean'),
+        'damage_taken_mean': stat('damage_taken', 'mean'),
+        'damage_taken_p95': stat('damage_taken', 'p95'),
+        'hp_left_mean': stat('player_hp_left', 'mean'),
+        'seconds': time.perf_counter() - start,
+    })
+    return key, row
+
+def write_columns(rows, output_path):
+    """Write rows as one compressed .npz with an array per column."""
+    columns = {}
+    for name in rows[0]:
+        values = [row[name] for row in rows]
+        if all(isinstance(v, str) for v in values):
+            columns[name] = np.array(values, dtype=str)
+        elif all(isinstance(v, (int, np.integer)) and not isinstance(v, bool) for v in values):
+            columns[name] = np.array(values, dtype=np.int64)
+        else:
+            columns[name] = np.array(values, dtype=np.float64)
+    tmp_path = output_path + '.tmp.npz'
+    np.savez_compressed(tmp_path, **columns)
+    os.replace(tmp_path, output_path)
+
+def load_sweep(path):
+    """Load a sweep result file as a dict of column name -> array."""
+    with np.load(path) as data:
+        return {name: data[name] for name in data.files}
+
+def run_sweep(grid_path, output_path, cache_dir='.sweep_cache', jobs=None):
+    """
+    Run every cell of a grid, reusing cached cells.
+
+    Args:
+        grid_path: JSON grid file
+        output_path: Columnar .npz result file
+        cache_dir: Directory of per-cell JSON results
+        jobs: Worker processes (default: CPU count; 1 runs in-process)
+
+    Returns:
+        (cells, computed) counts
+    """
+    wall_start = time.perf_counter()
+    cells, settings = load_grid(grid_path)
+    os.makedirs(cache_dir, exist_ok=True)
+
+    rows = {}
+    tasks = []
+    for cell in cells:
+        key = cell_key(cell, settings)
+        cache_path = os.path.join(cache_dir, f'{key}.json')
+        try:
+            with open(cache_path, 'r') as f:
+                rows[key] = json.load(f)
+        except (OSError, ValueError):
+            tasks.append((key, cell, settings))
+
+    jobs = jobs or os.cpu_count() or 1
+    if tasks:
+        if jobs == 1:
+            results = map(run_cell, tasks)
+        else:
+            pool = ProcessPoolExecutor(max_workers=jobs)
+            results = pool.map(run_cell, tasks, chunksize=max(1, len(tasks) // (jobs * 4)))
+        try:
+            for key, row in results:
+                rows[key] = row
+                tmp_path = os.path.join(cache_dir, f'{key}.json.tmp')
+                with open(tmp_path, 'w') as f:
+                    json.dump(row, f, sort_keys=True)
+                os.replace(tmp_path, os.path.join(cache_dir, f'{key}.json'))
+        finally:
+            if jobs != 1:
+                pool.shutdown()
+
+    ordered = [rows[cell_key(cell, settings)] for cell in cells]
+    write_columns(ordered, output_path)
+
+    wall = time.perf_counter() - wall_start
+    work = sum(rows[key]['seconds'] for key, _, _ in tasks)
+    print(f"Sweep: {len(cells)} cells x {settings['fights']} fights, "
+          f"{len(cells) - len(tasks)} cached, {len(tasks)} computed with {jobs} worker(s)")
+    print(f"  Simulation {work:.1f} s, wall {wall:.1f} s -> {output_path}")
+    return len(cells), len(tasks)
+
+def parse_where(clauses):
+    """Parse column=value filters; numeric values compare as numbers."""
+    filters = []
+    for clause in clauses:
+        name, sep, value = clause.partition('=')
+        if not sep:
+            raise ValueError(f"filter must be column=value: {clause!r}")
+        filters.append((name, value))
+    return filters
+
+def show_sweep(path, where=(), columns=None, sort=None):
+    """Print a slice of a sweep result file as a table."""
+    data = load_sweep(path)
+    mask = np.ones(len(next(iter(data.values()))), dtype=bool)
+    for name, value in parse_where(where):
+        if name not in data:
+            raise ValueError(f"unknown column {name!r}")
+        column = data[name]
+        if column.dtype.kind in 'if':
+            mask &= np.isclose(column, float(value))
+        else:
+            mask &= column == value
+
+    columns = columns or AXES + ['win_rate', 'turns_mean', 'damage_taken_mean']
+    order = np.flatnonzero(mask)
+    if sort:
+        order = order[np.argsort(data[sort][order], kind='stable')]
+
+    print('  '.join(f'{c:>12s}' for c in columns))
+    for i in order:
+        cells = []
+        for c in columns:
+            v = data[c][i]
+            cells.append(f'{v:12.4f}' if data[c].dtype.kind == 'f' else f'{str(v):>12s}')
+        print('  '.join(cells))
+    print(f"{order.size} of {mask.size} cells")
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Run cached, parallel battle simulation sweeps')
+    parser.add_argument('grid', nargs='?', help='JSON grid file')
+    parser.add_argument('-o', '--output', default='sweep.npz', help='Columnar result file (default: sweep.npz)')
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help='Worker processes (default: CPU count, 1 = no pool)')
+    parser.add_argument('--cache', default='.sweep_cache', help='Per-cell cache directory')
+    parser.add_argument('--show', metavar='RESULTS', help='Print cells from a result file instead of running')
+    parser.add_argument('--where', action='append', default=[], metavar='COL=VALUE',
+                        help='Filter for --show (repeatable)')
+    parser.add_argument('--columns', help='Comma-separated columns for --show')
+    parser.add_argument('--sort', help='Sort --show output by a column')
+
+    args = parser.parse_args()
+
+    try:
+        if args.show:
+            show_sweep(args.show, args.where,
+                       args.columns.split(',') if args.columns else None, args.sort)
+        elif args.grid:
+            run_sweep(args.grid, args.output, args.cache, args.jobs)
+        else:
+            parser.error('a grid file or --show RESULTS is required')
+    except ValueError as e:
+        parser.error(str(e))
+
+if __name__ == '__main__':
+    main()
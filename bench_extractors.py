@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""
+Benchmark the asset extractors stage by stage and catch regressions.
+
+Every dataset runs the same pipeline the extractors use, timed per stage:
+- parse:  source file -> records (WadArchive, iter_sht_sprites, BasIndex)
+- decode: records -> color index arrays
+- scale:  index arrays -> scaled index arrays (scale_indices)
+- encode: palette expansion and PNG compression into memory
+- write:  encoded PNG bytes -> files
+- sheet:  the extractor's sheet builder, end to end
+
+Datasets are the shipped tiles.wad, bomb.sht and ZARGON.BAS plus synthetic
+scaled-up inputs generated from them: a WAD with 10000 records and a .sht
+of at least 1 MB (real records repeated under new names).
+
+Each stage runs --repeat times and the fastest run is kept. Baselines are
+stored in bench_baseline.json; a stage fails when it is more than
+--threshold slower than its baseline and the difference exceeds the
+--min-ms noise floor. Timings are machine-specific, so record a baseline
+with --update on the machine that runs the comparison.
+
+Usage:
+    python3 bench_extractors.py zargon              # compare with baseline
+    python3 bench_extractors.py zargon --update     # record a new baseline
+    python3 bench_extractors.py zargon --only tiles,tiles_10k --threshold 0.2
+"""
+
+import contextlib
+import gc
+import io
+import itertools
+import json
+import os
+import platform
+import tempfile
+import time
+from collections import namedtuple
+
+
+from ega_palette import DATA_RGBA, SHT_RGBA, TILE_RGBA, rgba_image
+from encode_assets import build_wad, format_sht_sprite
+from extract_data_sprites import BasIndex, create_monster_sheet, sprite_values
+from extract_sheets import create_sprite_sheet, iter_sht_sprites, sprite_indices
+from extract_tiles import WadArchive, create_tile_sheet, decode_ega_indices
+from indexed_png import scale_indices
+
+BASELINE_VERSION = 1
+BASELINE_PATH = 'bench_baseline.json'
+STAGES = ['parse', 'decode', 'scale', 'encode', 'write', 'sheet']
+
+SYNTHETIC_WAD_RECORDS = 10000
+SYNTHETIC_SHT_BYTES = 1 << 20
+
+Dataset = namedtuple('Dataset', ['name', 'kind', 'path'])
+Dataset.__doc__ = """A benchmark input: kind is 'wad', 'sht' or 'bas'."""
+
+def write_synthetic_wad(source_path, output_path, records):
+    """
+    Write a tiles.wad with `records` records by cycling the source records.
+
+    Returns:
+        Size of the written file in bytes
+    """
+    with WadArchive(source_path) as wad:
+        sources = [wad.indices(name) for name in wad.names]
+    data = build_wad([(f'T{i:05d}', indices)
+                      for i, indices in zip(range(records), itertools.cycle(sources))])
+    with open(output_path, 'wb') as f:
+        f.write(data)
+    return len(data)
+
+def write_synthetic_sht(source_path, output_path, min_bytes):
+    """
+    Write a .sht file of at least `min_bytes` by repeating the source
+    sprites under numbered names.
+
+    Returns:
+        Size of the written file in bytes
+    """
+    sprites = list(iter_sht_sprites(source_path))
+    size = 0
+    with open(output_path, 'w', newline='') as f:
+        for i, sprite in enumerate(itertools.cycle(sprites)):
+            if size >= min_bytes:
+                break
+            text = format_sht_sprite(f'{sprite.name}{i}', sprite_indices(sprite))
+            f.write(text)
+            size += len(text)
+    return size
+
+def time_stage(func, repeat):
+    """Run func `repeat` times and return (fastest seconds, last result)."""
+    best = None
+    result = None
+    for _ in range(repeat):
+        result = None
+        gc.collect()
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def encode_png(indices, lut):
+    """Expand an index array through an RGBA LUT and PNG-encode it in memory."""
+    buf = io.BytesIO()
+    rgba_image(indices, lut).save(buf, 'PNG')
+    return buf.getvalue()
+
+def parse_wad(path):
+    with WadArchive(path) as wad:
+        records = []
+        for name in wad.names:
+            _, width, height, _ = wad.index[name]
+            with wad.data(name) as buf:
+                records.append((bytes(buf), width, height))
+    return records
+
+def parse_sht(path):
+    return list(iter_sht_sprites(path))
+
+def parse_bas(path):
+    return BasIndex(path).sprites()
+
+# kind -> (parse, decode one record, RGBA LUT, sheet builder(path, records, output, scale))
+PIPELINES = {
+    'wad': (parse_wad, lambda record: decode_ega_indices(*record), TILE_RGBA,
+            lambda path, records, output, scale: create_tile_sheet(path, output, scale=scale)),
+    'sht': (parse_sht, sprite_indices, SHT_RGBA,
+            lambda path, records, output, scale: create_sprite_sheet(records, output, scale=scale)),
+    'bas': (parse_bas, sprite_values, DATA_RGBA,
+            lambda path, records, output, scale: create_monster_sheet(records, output, scale=scale)),
+}
+
+def bench_dataset(dataset, work_dir, scale=2, repeat=3):
+    """
+    Time every stage of one dataset's pipeline.
+
+    Args:
+        dataset: Dataset to run
+        work_dir: Scratch directory for written PNGs and sheets
+        scale: Scale factor for the scale, encode, write and sheet stages
+        repeat: Runs per stage; the fastest is reported
+
+    Returns:
+        Dict with 'records', 'bytes' and 'stages' (stage -> milliseconds)
+    """
+    parse, decode, lut, sheet = PIPELINES[dataset.kind]
+    out_dir = os.path.join(work_dir, dataset.name)
+    os.makedirs(out_dir, exist_ok=True)
+    sheet_path = os.path.join(work_dir, f'{dataset.name}_sheet.png')
+
+    def write(encoded):
+        for i, data in enumerate(encoded):
+            with open(os.path.join(out_dir, f'{i}.png'), 'wb') as f:
+                f.write(data)
+
+    stages = {}
+    # The extractors print per record; keep that out of the timings
+    with contextlib.redirect_stdout(io.StringIO()):
+        stages['parse'], records = time_stage(lambda: parse(dataset.path), repeat)
+        stages['decode'], arrays = time_stage(lambda: [decode(r) for r in records], repeat)
+        stages['scale'], scaled = time_stage(
+            lambda: [scale_indices(a, scale) for a in arrays], repeat)
+        stages['encode'], encoded = time_stage(lambda: [encode_png(a, lut) for a in scaled], repeat)
+        stages['write'], _ = time_stage(lambda: write(encoded), repeat)
+        stages['sheet'], _ = time_stage(lambda: sheet(dataset.path, records, sheet_path, scale),
+                                        repeat)
+
+    return {'records': len(records), 'bytes': os.path.getsize(dataset.path),
+            'stages': {stage: round(seconds * 1000, 3) for stage, seconds in stages.items()}}
+
+def make_datasets(source_dir, work_dir, synthetic=True):
+    """
+    Collect the real datasets in source_dir and generate the synthetic ones.
+
+    Returns:
+        List of Dataset, in a fixed order
+    """
+    wad_path = os.path.join(source_dir, 'tiles.wad')
+    sht_path = os.path.join(source_dir, 'bomb.sht')
+    bas_path = os.path.join(source_dir, 'ZARGON.BAS')
+
+    datasets = []
+    if os.path.exists(wad_path):
+        datasets.append(Dataset('tiles', 'wad', wad_path))
+    if os.path.exists(sht_path):
+        datasets.append(Dataset('sprites', 'sht', sht_path))
+    if os.path.exists(bas_path):
+        datasets.append(Dataset('monsters', 'bas', bas_path))
+
+    if synthetic and os.path.exists(wad_path):
+        path = os.path.join(work_dir, 'synthetic.wad')
+        write_synthetic_wad(wad_path, path, SYNTHETIC_WAD_RECORDS)
+        datasets.append(Dataset('tiles_10k', 'wad', path))
+    if synthetic and os.path.exists(sht_path):
+        path = os.path.join(work_dir, 'synthetic.sht')
+        write_synthetic_sht(sht_path, path, SYNTHETIC_SHT_BYTES)
+        datasets.append(Dataset('sprites_1mb', 'sht', path))
+    return datasets
+
+def load_baseline(path):
+    """Load a baseline file, or return None if it does not exist."""
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        baseline = json.load(f)
+    if baseline.get('version') != BASELINE_VERSION:
+        raise ValueError(f"{path}: unsupported baseline version {baseline.get('version')}")
+    return baseline
+
+def save_baseline(path, results, scale, repeat):
+    baseline = {
+        'version': BASELINE_VERSION,
+        'scale': scale,
+        'repeat': repeat,
+        'machine': f'{platform.machine()} {platform.system()}, Python {platform.python_version()}',
+        'datasets': results,
+    }
+    with open(path, 'w') as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+def compare(results, baseline, threshold=0.5, min_ms=2.0):
+    """
+    Print every stage next to its baseline and list the regressions.
+
+    A stage regresses when it is more than `threshold` (a fraction) slower
+    than its baseline and at least `min_ms` slower in absolute terms.
+
+    Returns:
+        List of 'dataset/stage' names that regressed
+    """
+    regressions = []
+    datasets = baseline['datasets'] if baseline else {}
+    print(f"{'dataset':12s} {'stage':7s} {'base ms':>10s} {'now ms':>10s} {'change':>8s}")
+    for name, result in results.items():
+        base_stages = datasets.get(name, {}).get('stages', {})
+        for stage in STAGES:
+            now = result['stages'][stage]
+            base = base_stages.get(stage)
+            if base is None:
+                print(f"{name:12s} {stage:7s} {'-':>10s} {now:10.2f} {'new':>8s}")
+                continue
+            change = (now - base) / base if base else 0.0
+            status = ''
+            if now > base * (1 + threshold) and now - base >= min_ms:
+                regressions.append(f'{name}/{stage}')
+                status = '  REGRESSED'
+            print(f"{name:12s} {stage:7s} {base:10.2f} {now:10.2f} {change:+7.0%}{status}")
+    return regressions
+
+def main():
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description='Benchmark the asset extractors against a stored baseline')
+    parser.add_argument('source_dir', nargs='?', default='zargon',
+                        help='Directory with tiles.wad, bomb.sht and ZARGON.BAS')
+    parser.add_argument('--baseline', default=BASELINE_PATH,
+                        help=f'Baseline file (default: {BASELINE_PATH})')
+    parser.add_argument('--update', action='store_true', help='Record the results as the new baseline')
+    parser.add_argument('--threshold', type=float, default=0.5,
+                        help='Allowed slowdown per stage as a fraction (default: 0.5)')
+    parser.add_argument('--min-ms', type=float, default=2.0,
+                        help='Ignore slowdowns smaller than this many milliseconds (default: 2.0)')
+    parser.add_argument('-s', '--scale', type=int, default=2, help='Scale factor (default: 2)')
+    parser.add_argument('-r', '--repeat', type=int, default=3,
+                        help='Runs per stage, fastest is kept (default: 3)')
+    parser.add_argument('--only', metavar='LIST', help='Comma-separated dataset names to run')
+    parser.add_argument('--no-synthetic', action='store_true',
+                        help='Skip the synthetic scaled-up datasets')
+
+    args = parser.parse_args()
+
+    try:
+        baseline = None if args.update else load_baseline(args.baseline)
+    except ValueError as e:
+        parser.error(str(e))
+    if baseline and (baseline['scale'], baseline['repeat']) != (args.scale, args.repeat):
+        parser.error(f"baseline was recorded with --scale {baseline['scale']} "
+                     f"--repeat {baseline['repeat']}")
+
+    results = {}
+    with tempfile.TemporaryDirectory() as work_dir:
+        datasets = make_datasets(args.source_dir, work_dir, synthetic=not args.no_synthetic)
+        if args.only:
+            wanted = args.only.split(',')
+            unknown = set(wanted) - {d.name for d in datasets}
+            if unknown:
+                parser.error(f"unknown dataset(s): {', '.join(sorted(unknown))}")
+            datasets = [d for d in datasets if d.name in wanted]
+
+        for dataset in datasets:
+            start = time.perf_counter()
+            results[dataset.name] = bench_dataset(dataset, work_dir, args.scale, args.repeat)
+            print(f"Benchmarked {dataset.name}: {results[dataset.name]['records']} records, "
+                  f"{results[dataset.name]['bytes']} bytes in {time.perf_counter() - start:.1f} s")
+    print()
+
+    if args.update:
+        if args.only and os.path.exists(args.baseline):
+            # Keep the datasets that were not re-run
+            kept = load_baseline(args.baseline)['datasets']
+            kept.update(results)
+            results = kept
+        save_baseline(args.baseline, results, args.scale, args.repeat)
+        print(f"Saved baseline for {len(results)} datasets to {args.baseline}")
+        return
+
+    if baseline is None:
+        print(f"No baseline at {args.baseline}; run with --update to record one")
+    regressions = compare(results, baseline, args.threshold, args.min_ms)
+    if regressions:
+        print(f"\n{len(regressions)} stage(s) regressed more than {args.threshold:.0%}: "
+              f"{', '.join(regressions)}")
+        sys.exit(1)
+    print(f"\nNo stage regressed more than {args.threshold:.0%}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,413 @@
+#!/usr/bin/env python3
+"""
+Build the complete Android asset set from the original Zargon game files.
+
+Runs every extractor in one step:
+- tiles from tiles.wad          -> res/drawable-nodpi/<tile>.png + tile_sheet.png
+- sprites from bomb.sht         -> res/drawable-nodpi/<sprite>.png + sprite_sheet.png
+- monster sprites from ZARGON.BAS -> res/drawable-nodpi/<monster>.png + monster_sheet.png
+- title screen slices (optional mockup images) -> res/drawable-nodpi/
+- map*.lvl, tiles.wad and bomb.sht -> assets/ (parsed by the app at runtime)
+- assets/bomb.sht               -> assets/bomb.spb (packed sprite bundle, see pack_sprites.py)
+- bomb.sht and ZARGON.BAS sprites -> assets/sprite_masks.bin (bounds and collision masks,
+  see sprite_masks.py)
+- map11.lvl .. map44.lvl        -> assets/zargon.wld (compiled world, see compile_maps.py)
+- map11.lvl .. map44.lvl        -> assets/zargon.nav (reachability tables, see analyze_maps.py)
+- res/drawable-nodpi/*.png      -> assets/atlas.png + atlas.idx (packed after the other jobs,
+  so it holds exactly the drawables, hand-edited ones included; see pack_atlas.py)
+
+Sources are parsed once in the main process; decoding, PNG encoding and
+writing are spread across a process pool, one job per output file. All
+jobs are planned before any run, and outputs that share a name are
+resolved in a fixed order (bomb.sht wins over tiles.wad for water.png),
+so the result does not depend on the number of workers.
+
+The app's files are the source of truth. Several shipped drawables were
+touched up by hand after extraction, so a drawable under res/ whose
+pixels differ from what the build renders is put back as it was, and the
+build lists it. An assets/ copy of map*.lvl, tiles.wad or bomb.sht that
+differs from the source file (the app's map edits) is likewise kept, and
+zargon.wld and zargon.nav are compiled from the maps as they stand in
+assets/. --force overwrites both kinds with the build's output. After
+the jobs, zargon.wld is read back and checked against the map*.lvl files
+in assets/, since the app reads the world file in their place.
+
+With --densities, every tile and sprite is decoded once and written to
+res/drawable-<density>/ for each requested density bucket instead of
+res/drawable-nodpi/ (sheets stay in drawable-nodpi).
+
+With --indexed, tile, sprite and monster drawables are written as 4-bit
+palette-indexed PNGs (see indexed_png.py); the sheets stay RGBA because
+their gray background is not a palette color. The build reports the size
+of the output set before and after.
+
+The maps are validated before any job runs: the build stops when a hut,
+shop, healer, castle or spawn cannot be reached from the start position.
+The points the game's maps seal off (analyze_maps.SEALED_POIS) are
+allowed, and --allow-unreachable lets further ones through.
+
+Usage:
+    python3 build_assets.py zargon/ -o app/app/src/main -j 8
+    python3 build_assets.py zargon/ -o app/app/src/main --force
+"""
+
+import filecmp
+import glob
+import io
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import numpy as np
+from PIL import Image
+
+from analyze_maps import SEALED_POIS, analyze_world, validate_reachability, write_nav
+from compile_maps import check_round_trip, compile_world, load_maps
+from extract_data_sprites import BasIndex, create_monster_sheet, data_masks, save_sprite_variants
+from ega_palette import SHT_RGBA, TILE_RGBA, ZARGON_PALETTE
+from extract_sheets import create_sprite_sheet, iter_sht_sprites, sht_masks, sprite_indices
+from extract_tiles import WadArchive, create_tile_sheet
+from extract_tiles import decode_ega_indices
+from indexed_png import density_outputs, parse_densities, save_variants
+from pack_atlas import build_atlas, collect_drawables
+from pack_sprites import write_bundle
+from sprite_masks import MASK_FILE, write_mask_index
+
+STAGES = ['tiles', 'sprites', 'monsters', 'masks', 'title', 'maps', 'atlas']
+
+# Each drawable job takes outputs as a list of (scale, output_path) and
+# decodes its source once for all of them
+
+def build_tile(data, width, height, outputs, indexed=False):
+    """Decode one tiles.wad record and save it as PNG."""
+    save_variants(decode_ega_indices(data, width, height), outputs,
+                  TILE_RGBA, ZARGON_PALETTE if indexed else None)
+
+def build_sprite(sprite, outputs, indexed=False):
+    """Render one bomb.sht sprite and save it as PNG."""
+    save_variants(sprite_indices(sprite), outputs,
+                  SHT_RGBA, ZARGON_PALETTE if indexed else None, transparent=0)
+
+def build_monster(sprite, outputs, indexed=False):
+    """Render one ZARGON.BAS DATA sprite and save it as PNG."""
+    save_sprite_variants(sprite, outputs, indexed)
+
+def build_tile_sheet(wad_path, scale, output_path):
+    create_tile_sheet(wad_path, output_path, scale=scale)
+
+def build_sprite_sheet(sprites, scale, output_path):
+    create_sprite_sheet(sprites, output_path, scale=scale)
+
+def build_monster_sheet(sprites, scale, output_path):
+    create_monster_sheet(sprites, output_path, scale=scale)
+
+def build_masks(sprites, monsters, output_path):
+    """Write bounding boxes, collision masks and row spans of every sprite."""
+    write_mask_index(sht_masks(sprites) + data_masks(monsters), output_path)
+
+def build_title(mockup_path, output_dir):
+    """Slice a title screen mockup into its component images."""
+    from slice_title_screen import slice_title_screen
+    slice_title_screen(mockup_path, output_dir)
+
+def copy_asset(source_path, output_path):
+    shutil.copyfile(source_path, output_path)
+
+def build_world(maps, output_path):
+    """Compile the 16 parsed maps into one world file."""
+    compile_world(maps, output_path)
+
+def same_pixels(data, path):
+    """Whether PNG bytes and a PNG file hold the same size and RGBA pixels."""
+    with Image.open(io.BytesIO(data)) as old, Image.open(path) as new:
+        return old.size == new.size and np.array_equal(np.asarray(old.convert('RGBA')),
+                                                       np.asarray(new.convert('RGBA')))
+
+def run_job(job, keep_dir=None):
+    """
+    Run one planned job in a worker and return (stage, outputs, seconds, kept).
+
+    Outputs under keep_dir that existed before the job are written back
+    when the job renders different pixels; kept lists those paths.
+    """
+    stage, outputs, func, args = job
+    previous = {}
+    if keep_dir:
+        for path in outputs:
+            if path.startswith(keep_dir + os.sep) and os.path.exists(path):
+                with open(path, 'rb') as f:
+                    previous[path] = f.read()
+
+    start = time.perf_counter()
+    func(*args)
+    seconds = time.perf_counter() - start
+
+    kept = []
+    for path, data in previous.items():
+        if not same_pixels(data, path):
+            with open(path, 'wb') as f:
+                f.write(data)
+            kept.append(path)
+    return stage, outputs, seconds, kept
+
+def plan_jobs(source_dir, output_root, scale=1, title_mockups=(), indexed=False, densities=None,
+              allow_unreachable=(), force=False):
+    """
+    Parse every source once and plan one job per output drawable.
+
+    Args:
+        source_dir: Directory with tiles.wad, bomb.sht, ZARGON.BAS and map*.lvl
+        output_root: Android source set root (containing res/ and assets/)
+        scale: Scale factor for drawables
+        title_mockups: Title screen mockup images to slice
+        indexed: Write drawables as 4-bit palette-indexed PNGs
+        densities: Optional density names; drawables then go to
+            res/drawable-<density>/ at each density scale
+        allow_unreachable: Points of interest that may be unreachable,
+            besides analyze_maps.SEALED_POIS
+        force: Overwrite assets/ copies that differ from the source files
+
+    Returns:
+        (jobs, parse_times) where jobs is a list of
+        (stage, output_paths, func, args) and parse_times maps stage -> seconds
+
+    Raises:
+        ValueError: If a map is malformed or a point of interest that is not
+            allowed is unreachable
+    """
+    res_dir = os.path.join(output_root, 'res')
+    drawable_dir = os.path.join(res_dir, 'drawable-nodpi')
+    assets_dir = os.path.join(output_root, 'assets')
+    os.makedirs(drawable_dir, exist_ok=True)
+    os.makedirs(assets_dir, exist_ok=True)
+
+    # Later stages win when two sources produce the same file name
+    planned = {}
+    parse_times = {}
+
+    def add(stage, outputs, func, *args):
+        outputs = tuple(outputs)
+        planned.pop(outputs[0], None)
+        planned[outputs[0]] = (stage, outputs, func, args)
+
+    def drawable(name):
+        safe_name = name.lower().replace('-', '_').replace(' ', '_')
+        return os.path.join(drawable_dir, f'{safe_name}.png')
+
+    def variants(name):
+        safe_name = name.lower().replace('-', '_').replace(' ', '_')
+        if not densities:
+            return [(scale, drawable(name))]
+        return [(out_scale, os.path.join(res_dir, rel_path))
+                for out_scale, rel_path in density_outputs(f'{safe_name}.png', densities, scale)]
+
+    def add_drawable(stage, name, func, source):
+        outputs = variants(name)
+        add(stage, [path for _, path in outputs], func, *source, outputs, indexed)
+
+    def shipped(source_path):
+        """The copy of a raw asset the app ships: the assets/ one when it is kept."""
+        output_path = os.path.join(assets_dir, os.path.basename(source_path))
+        if (not force and os.path.exists(output_path)
+                and not filecmp.cmp(source_path, output_path, shallow=False)):
+            return output_path
+        return source_path
+
+    wad_path = os.path.join(source_dir, 'tiles.wad')
+    if os.path.exists(wad_path):
+        start = time.perf_counter()
+        with WadArchive(wad_path) as wad:
+            for name in wad.names:
+                _, width, height, _ = wad.index[name]
+                with wad.data(name) as buf:
+                    data = bytes(buf)
+                add_drawable('tiles', name, build_tile, (data, width, height))
+        add('tiles', [drawable('tile_sheet')], build_tile_sheet, wad_path, scale,
+            drawable('tile_sheet'))
+        parse_times['tiles'] = time.perf_counter() - start
+
+    sprites = []
+    sht_path = os.path.join(source_dir, 'bomb.sht')
+    if os.path.exists(sht_path):
+        start = time.perf_counter()
+        sprites = list(iter_sht_sprites(sht_path))
+        for sprite in sprites:
+            add_drawable('sprites', sprite.name, build_sprite, (sprite,))
+        if sprites:
+            add('sprites', [drawable('sprite_sheet')], build_sprite_sheet, sprites, scale,
+                drawable('sprite_sheet'))
+            bundle_path = os.path.join(assets_dir, 'bomb.spb')
+            # Packed from the bomb.sht the app ships, which may be a kept, edited copy
+            add('sprites', [bundle_path], write_bundle, shipped(sht_path), bundle_path)
+        parse_times['sprites'] = time.perf_counter() - start
+
+    monsters = []
+    bas_path = os.path.join(source_dir, 'ZARGON.BAS')
+    if os.path.exists(bas_path):
+        start = time.perf_counter()
+        monsters = BasIndex(bas_path).sprites()
+        for sprite in monsters:
+            add_drawable('monsters', sprite.name, build_monster, (sprite,))
+        if monsters:
+            add('monsters', [drawable('monster_sheet')], build_monster_sheet, monsters, scale,
+                drawable('monster_sheet'))
+        parse_times['monsters'] = time.perf_counter() - start
+
+    if sprites or monsters:
+        mask_path = os.path.join(assets_dir, MASK_FILE)
+        add('masks', [mask_path], build_masks, sprites, monsters, mask_path)
+
+    for mockup in title_mockups:
+        add('title', [mockup], build_title, mockup, drawable_dir)
+
+    start = time.perf_counter()
+    raw_assets = sorted(glob.glob(os.path.join(source_dir, 'map[1-4][1-4].lvl')))
+    raw_assets += [p for p in (wad_path, sht_path) if os.path.exists(p)]
+    for source_path in raw_assets:
+        output_path = os.path.join(assets_dir, os.path.basename(source_path))
+        if shipped(source_path) == output_path:
+            print(f"Keeping {output_path}: it differs from {source_path}")
+            continue
+        add('maps', [output_path], copy_asset, source_path, output_path)
+    if len([p for p in raw_assets if p.endswith('.lvl')]) == 16:
+        # Kept copies are not rewritten, so compile each map from assets/ when it is there
+        maps = load_maps(source_dir, override_dir=None if force else assets_dir)
+        # Validated here so a sealed-off point stops the build before any job runs
+        analysis = analyze_world(maps)
+        failures = validate_reachability(analysis, SEALED_POIS + tuple(allow_unreachable))
+        if failures:
+            raise ValueError(f"unreachable points of interest: {'; '.join(failures)}")
+        world_path = os.path.join(assets_dir, 'zargon.wld')
+        add('maps', [world_path], build_world, maps, world_path)
+        nav_path = os.path.join(assets_dir, 'zargon.nav')
+        add('maps', [nav_path], write_nav, analysis, nav_path)
+    parse_times['maps'] = time.perf_counter() - start
+
+    return list(planned.values()), parse_times
+
+def output_bytes(planned):
+    """Total size of the planned output files that currently exist."""
+    # Title jobs are keyed by their mockup, not by the files they write
+    return sum(os.path.getsize(output) for stage, outputs, _, _ in planned if stage != 'title'
+               for output in outputs if os.path.exists(output))
+
+def build_assets(source_dir, output_root, scale=1, jobs=None, title_mockups=(), indexed=False,
+                 densities=None, allow_unreachable=(), force=False):
+    """
+    Build the whole Android asset set.
+
+    Args:
+        source_dir: Directory with the original game files (zargon/)
+        output_root: Android source set root, e.g. app/app/src/main
+        scale: Scale factor for drawables
+        jobs: Worker processes (default: CPU count; 1 runs in-process)
+        title_mockups: Title screen mockup images to slice
+        indexed: Write drawables as 4-bit palette-indexed PNGs
+        densities: Optional density names for res/drawable-<density>/ output
+        allow_unreachable: Points of interest that may be unreachable,
+            besides analyze_maps.SEALED_POIS
+        force: Overwrite drawables and assets/ copies that differ from the
+            build's output instead of keeping them
+
+    Returns:
+        Dict mapping stage -> {'jobs', 'parse', 'work'} timings in seconds
+
+    Raises:
+        ValueError: If a map is malformed, a point of interest unreachable or
+            the compiled world file does not match the maps in assets/
+    """
+    wall_start = time.perf_counter()
+    planned, parse_times = plan_jobs(source_dir, output_root, scale, title_mockups, indexed,
+                                     densities, allow_unreachable, force)
+    bytes_before = output_bytes(planned)
+
+    run = partial(run_job, keep_dir=None if force else os.path.join(output_root, 'res'))
+    jobs = jobs or os.cpu_count() or 1
+    if jobs == 1:
+        results = [run(job) for job in planned]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            results = list(pool.map(run, planned, chunksize=4))
+
+    if not densities:
+        # Packed last, from the drawables as the other jobs left them
+        start = time.perf_counter()
+        drawable_dir = os.path.join(output_root, 'res', 'drawable-nodpi')
+        atlas_outputs = (os.path.join(output_root, 'assets', 'atlas.png'),
+                         os.path.join(output_root, 'assets', 'atlas.idx'))
+        build_atlas(collect_drawables(drawable_dir), *atlas_outputs)
+        results.append(('atlas', atlas_outputs, time.perf_counter() - start, []))
+
+    assets_dir = os.path.join(output_root, 'assets')
+    world_path = os.path.join(assets_dir, 'zargon.wld')
+    if any(world_path in outputs for _, outputs, _, _ in results):
+        # MapParser prefers the world file, so it must match the .lvl files shipped next to it
+        failures = check_round_trip(assets_dir, world_path)
+        if failures:
+            raise ValueError(f"{world_path} does not match assets/ for {', '.join(failures)}")
+
+    report = {stage: {'jobs': 0, 'parse': parse_times.get(stage, 0.0), 'work': 0.0}
+              for stage in STAGES}
+    for stage, _, seconds, _ in results:
+        report[stage]['jobs'] += 1
+        report[stage]['work'] += seconds
+    kept = sorted(path for *_, paths in results for path in paths)
+
+    wall = time.perf_counter() - wall_start
+    files = sum(len(outputs) for _, outputs, _, _ in results)
+    print(f"\nBuilt {files} outputs in {len(results)} jobs into {output_root} with {jobs} worker(s)")
+    print(f"{'stage':10s} {'jobs':>5s} {'parse ms':>10s} {'work ms':>10s}")
+    for stage in STAGES:
+        r = report[stage]
+        if r['jobs']:
+            print(f"{stage:10s} {r['jobs']:5d} {r['parse'] * 1000:10.1f} {r['work'] * 1000:10.1f}")
+    print(f"{'total':10s} {len(results):5d} {'':10s} {wall * 1000:10.1f} (wall)")
+    print(f"Output size: {bytes_before} bytes before, {output_bytes(planned)} bytes after")
+    if kept:
+        print(f"Kept {len(kept)} drawables that differ from the build (--force overwrites them): "
+              f"{', '.join(os.path.splitext(os.path.basename(p))[0] for p in kept)}")
+    return report
+
+def main():
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description='Build all Android assets from the Zargon game files')
+    parser.add_argument('source_dir', nargs='?', default='zargon',
+                        help='Directory with tiles.wad, bomb.sht, ZARGON.BAS and map*.lvl')
+    parser.add_argument('-o', '--output', default=os.path.join('app', 'app', 'src', 'main'),
+                        help='Android source set root containing res/ and assets/')
+    parser.add_argument('-s', '--scale', type=int, default=1, help='Scale factor (default: 1)')
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help='Worker processes (default: CPU count, 1 = no pool)')
+    parser.add_argument('--title', action='append', default=[], metavar='MOCKUP',
+                        help='Title screen mockup to slice (repeatable)')
+    parser.add_argument('--indexed', action='store_true',
+                        help='Write drawables as 4-bit palette-indexed PNGs')
+    parser.add_argument('--densities', metavar='LIST',
+                        help='Write drawables to res/drawable-<density>/ instead of drawable-nodpi, '
+                             'e.g. "mdpi,xhdpi" or "all"')
+    parser.add_argument('--allow-unreachable', action='append', default=[], metavar='NAME',
+                        help='Point of interest that may be unreachable besides the known sealed '
+                             'ones, e.g. hut@map12:3,4 (repeatable, see analyze_maps.py)')
+    parser.add_argument('--force', action='store_true',
+                        help='Overwrite drawables and assets/ files that differ from the build '
+                             '(default: keep them, since some are edited by hand)')
+
+    args = parser.parse_args()
+    try:
+        densities = parse_densities(args.densities) if args.densities else None
+    except ValueError as e:
+        parser.error(str(e))
+
+    try:
+        build_assets(args.source_dir, args.output, args.scale, args.jobs, args.title, args.indexed,
+                     densities, args.allow_unreachable, args.force)
+    except ValueError as e:
+        print(f"Cannot build assets: {e}")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
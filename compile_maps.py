@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+Compile Zargon's 16 map*.lvl files into one binary world file.
+
+Each .lvl file (read by the crossroad SUB in ZARGON.BAS) is CRLF text:
+- 200 lines: Quoted tile codes ("T", "1", ...), 20 per row, 10 rows
+- 4 lines: hutspotx, hutspoty, s.spotx, s.spoty in the game's cx, cy
+  terms: x is the 1-based column and y the 0-based row; x = 0 (and y = 0)
+  when unused
+- Some files end with one extra empty line
+
+The 16 tile codes the game knows fit in 4 bits, so a map packs into 100
+bytes of tiles plus its coordinates. All maps share a fixed-size record
+behind an offset table, so any map is one seek.
+
+World file format (little-endian):
+- 4 bytes: Magic "ZWLD"
+- 2 bytes: Version (1)
+- 1 byte each: Maps across (4), maps down (4), map width (20), map height (10)
+- 16 bytes: Tile code table, ASCII code for each 4-bit tile value
+- 4 bytes per map: Record offsets, map (x, y) at index (y - 1) * across + (x - 1)
+- At each offset:
+  - width * height / 2 bytes: Tile values, row-major, high nibble first
+  - 1 byte each: Hut x, hut y, spot x, spot y
+  - 1 byte: Flags (bit 0 = .lvl ends with an extra empty line)
+
+Usage:
+    python3 compile_maps.py zargon -o zargon.wld --check
+"""
+
+import os
+import struct
+from collections import namedtuple
+
+WORLD_MAGIC = b'ZWLD'
+WORLD_VERSION = 1
+WORLD_HEADER = struct.Struct('<4sHBBBB16s')
+MAP_TRAILER = struct.Struct('<BBBBB')
+
+MAPS_ACROSS = 4
+MAPS_DOWN = 4
+MAP_WIDTH = 20
+MAP_HEIGHT = 10
+
+# Every code crossroad handles, indexed by 4-bit tile value. "a" is read
+# as walkable water "4" but kept distinct so .lvl files round-trip.
+TILE_CODES = '102rRtTwa4GhDCWH'
+TILE_VALUES = {code: value for value, code in enumerate(TILE_CODES)}
+
+FLAG_TRAILING_BLANK = 0x01
+
+LevelMap = namedtuple('LevelMap', ['name', 'tiles', 'hut', 'spot', 'trailing_blank'])
+LevelMap.__doc__ = """One parsed map; tiles holds width*height tile codes, row-major, as
+a str, and hut/spot are (x, y) pairs: x the 1-based column, y the 0-based
+row, and (0, 0) meaning unused."""
+
+MAP_RECORD_SIZE = MAP_WIDTH * MAP_HEIGHT // 2 + MAP_TRAILER.size
+
+def map_name(x, y):
+    """File stem of the map at world position (x, y), e.g. map24."""
+    return f'map{x}{y}'
+
+def parse_lvl(lvl_path):
+    """
+    Parse and strictly validate a .lvl map file.
+
+    Args:
+        lvl_path: Path to map*.lvl
+
+    Returns:
+        LevelMap
+
+    Raises:
+        ValueError: If the file does not follow the format crossroad reads
+    """
+    with open(lvl_path, 'rb') as f:
+        data = f.read()
+
+    def fail(line_no, message):
+        raise ValueError(f"{lvl_path}:{line_no}: {message}")
+
+    if not data.endswith(b'\r\n'):
+        fail(data.count(b'\n') + 1, "file must end with CRLF")
+    lines = data[:-2].split(b'\r\n')
+
+    tile_count = MAP_WIDTH * MAP_HEIGHT
+    trailing_blank = len(lines) == tile_count + 5 and lines[-1] == b''
+    if trailing_blank:
+        lines.pop()
+    if len(lines) != tile_count + 4:
+        fail(len(lines), f"expected {tile_count} tile lines and 4 coordinate lines, "
+                         f"got {len(lines)} lines")
+
+    tiles = []
+    for line_no, line in enumerate(lines[:tile_count], 1):
+        if b'\n' in line or b'\r' in line:
+            fail(line_no, "bare CR or LF inside the file")
+        if len(line) != 3 or line[0:1] != b'"' or line[2:3] != b'"':
+            fail(line_no, f"expected a quoted tile code, got {line!r}")
+        code = chr(line[1])
+        if code not in TILE_VALUES:
+            fail(line_no, f"unknown tile code {code!r}")
+        tiles.append(code)
+
+    coords = []
+    for line_no, line in enumerate(lines[tile_count:], tile_count + 1):
+        if not line.isdigit() or (len(line) > 1 and line[0:1] == b'0'):
+            fail(line_no, f"expected a coordinate, got {line!r}")
+        coords.append(int(line))
+
+    for (x, y), what, line_no in ((coords[0:2], 'hut', tile_count + 1),
+                                  (coords[2:4], 'spot', tile_count + 3)):
+        # cx runs 1..MAP_WIDTH and cy 0..MAP_HEIGHT - 1, as crossroad and movement use them
+        if (x == 0 and y != 0) or x > MAP_WIDTH or y >= MAP_HEIGHT:
+            fail(line_no, f"{what} position ({x}, {y}) is outside the "
+                          f"{MAP_WIDTH}x{MAP_HEIGHT} map")
+
+    name = os.path.splitext(os.path.basename(lvl_path))[0].lower()
+    return LevelMap(name, ''.join(tiles), tuple(coords[0:2]), tuple(coords[2:4]), trailing_blank)
+
+def format_lvl(level):
+    """Render a LevelMap back into the exact .lvl bytes it was parsed from."""
+    lines = [f'"{code}"' for code in level.tiles]
+    lines += [str(v) for v in level.hut + level.spot]
+    if level.trailing_blank:
+        lines.append('')
+    return ('\r\n'.join(lines) + '\r\n').encode('ascii')
+
+def pack_map(level):
+    """Pack a LevelMap into its fixed-size binary record."""
+    values = [TILE_VALUES[code] for code in level.tiles]
+    tiles = bytes((values[i] << 4) | values[i + 1] for i in range(0, len(values), 2))
+    flags = FLAG_TRAILING_BLANK if level.trailing_blank else 0
+    return tiles + MAP_TRAILER.pack(*level.hut, *level.spot, flags)
+
+def unpack_map(name, record):
+    """Unpack a binary map record into a LevelMap."""
+    tile_bytes = MAP_WIDTH * MAP_HEIGHT // 2
+    tiles = ''.join(TILE_CODES[b >> 4] + TILE_CODES[b & 0x0F] for b in record[:tile_bytes])
+    hut_x, hut_y, spot_x, spot_y, flags = MAP_TRAILER.unpack_from(record, tile_bytes)
+    return LevelMap(name, tiles, (hut_x, hut_y), (spot_x, spot_y),
+                    bool(flags & FLAG_TRAILING_BLANK))
+
+def load_maps(source_dir, override_dir=None):
+    """
+    Parse all 16 maps from a directory.
+
+    Args:
+        source_dir: Directory with map11.lvl .. map44.lvl
+        override_dir: Optional directory whose copy of a map, when present,
+            is used instead of the one in source_dir
+
+    Returns:
+        Dict of (x, y) -> LevelMap
+
+    Raises:
+        ValueError: If a map is missing or malformed
+    """
+    maps = {}
+    for y in range(1, MAPS_DOWN + 1):
+        for x in range(1, MAPS_ACROSS + 1):
+            lvl_path = os.path.join(source_dir, f'{map_name(x, y)}.lvl')
+            if override_dir is not None:
+                override_path = os.path.join(override_dir, f'{map_name(x, y)}.lvl')
+                if os.path.exists(override_path):
+                    lvl_path = override_path
+            if not os.path.exists(lvl_path):
+                raise ValueError(f"{lvl_path}: missing map")
+            maps[(x, y)] = parse_lvl(lvl_path)
+    return maps
+
+def compile_world(maps, world_path):
+    """
+    Write parsed maps into one binary world file.
+
+    Args:
+        maps: Dict of (x, y) -> LevelMap covering the whole 4x4 world
+        world_path: Output path
+
+    Returns:
+        Size of the world file in bytes
+    """
+    header = WORLD_HEADER.pack(WORLD_MAGIC, WORLD_VERSION, MAPS_ACROSS, MAPS_DOWN,
+                               MAP_WIDTH, MAP_HEIGHT, TILE_CODES.encode('ascii'))
+    count = MAPS_ACROSS * MAPS_DOWN
+    offset = WORLD_HEADER.size + 4 * count
+
+    offsets = []
+    records = []
+    for y in range(1, MAPS_DOWN + 1):
+        for x in range(1, MAPS_ACROSS + 1):
+            offsets.append(offset)
+            records.append(pack_map(maps[(x, y)]))
+            offset += MAP_RECORD_SIZE
+
+    with open(world_path, 'wb') as f:
+        f.write(header)
+        f.write(struct.pack(f'<{count}I', *offsets))
+        for record in records:
+            f.write(record)
+    return offset
+
+class WorldReader:
+    """
+    Random access to maps in a compiled world file.
+
+    Usage:
+        with WorldReader('zargon.wld') as world:
+            level = world.read_map(2, 4)
+    """
+
+    def __init__(self, world_path):
+        self.path = world_path
+        self._file = open(world_path, 'rb')
+        try:
+            self._read_header()
+        except (ValueError, struct.error):
+            self._file.close()
+            raise
+
+    def _read_header(self):
+        header = self._file.read(WORLD_HEADER.size)
+        if len(header) != WORLD_HEADER.size:
+            raise ValueError(f"{self.path}: truncated header")
+        (magic, version, self.across, self.down,
+         self.width, self.height, codes) = WORLD_HEADER.unpack(header)
+        if magic != WORLD_MAGIC or version != WORLD_VERSION:
+            raise ValueError(f"{self.path}: not a version {WORLD_VERSION} world file")
+        if codes != TILE_CODES.encode('ascii') or (self.width, self.height) != (MAP_WIDTH, MAP_HEIGHT):
+            raise ValueError(f"{self.path}: unsupported tile codes or map size")
+
+        count = self.across * self.down
+        self.offsets = struct.unpack(f'<{count}I', self._file.read(4 * count))
+
+    def read_map(self, x, y):
+        """Seek to and decode the map at world position (x, y), 1-based."""
+        if not (1 <= x <= self.across and 1 <= y <= self.down):
+            raise ValueError(f"no map at ({x}, {y}) in a {self.across}x{self.down} world")
+        self._file.seek(self.offsets[(y - 1) * self.across + (x - 1)])
+        record = self._file.read(MAP_RECORD_SIZE)
+        if len(record) != MAP_RECORD_SIZE:
+            raise ValueError(f"{self.path}: truncated record for {map_name(x, y)}")
+        return unpack_map(map_name(x, y), record)
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def check_round_trip(source_dir, world_path):
+    """
+    Verify that every map read back from the world file regenerates the
+    original .lvl file byte for byte.
+
+    Returns:
+        List of map names that did not round-trip (empty on success)
+    """
+    failures = []
+    with WorldReader(world_path) as world:
+        for y in range(1, world.down + 1):
+            for x in range(1, world.across + 1):
+                lvl_path = os.path.join(source_dir, f'{map_name(x, y)}.lvl')
+                with open(lvl_path, 'rb') as f:
+                    original = f.read()
+                if format_lvl(world.read_map(x, y)) != original:
+                    failures.append(map_name(x, y))
+    return failures
+
+def main():
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description='Compile Zargon map*.lvl files into one binary world file')
+    parser.add_argument('source_dir', nargs='?', default='zargon', help='Directory with map11.lvl .. map44.lvl')
+    parser.add_argument('-o', '--output', default='zargon.wld', help='Output world file')
+    parser.add_argument('--check', action='store_true',
+                        help='Read the world file back and compare every map with its .lvl file')
+    parser.add_argument('--validate', action='store_true',
+                        help='Only validate the .lvl files, do not write a world file')
+
+    args = parser.parse_args()
+
+    try:
+        maps = load_maps(args.source_dir)
+    except ValueError as e:
+        print(f"Invalid map: {e}")
+        sys.exit(1)
+
+    source_size = sum(os.path.getsize(os.path.join(args.source_dir, f'{m.name}.lvl'))
+                      for m in maps.values())
+    if args.validate:
+        print(f"{len(maps)} maps valid ({source_size} bytes)")
+        return
+
+    size = compile_world(maps, args.output)
+    print(f"Compiled {len(maps)} maps ({source_size} bytes of .lvl) into {args.output} ({size} bytes)")
+
+    if args.check:
+        failures = check_round_trip(args.source_dir, args.output)
+        if failures:
+            print(f"Round trip FAILED for {', '.join(failures)}")
+            sys.exit(1)
+        print(f"Round trip OK: all {len(maps)} maps regenerate their .lvl files byte for byte")
+
+if __name__ == '__main__':
+    main()
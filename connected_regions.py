@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Connected-component labelling of boolean masks with whole-array NumPy
+operations.
+
+Shared by slice_title_screen.py (8-connected regions of a mockup's
+foreground) and analyze_maps.py (4-connected walkable regions of the
+world grid).
+"""
+
+import numpy as np
+
+# Offsets of the 8 neighbours of a pixel, as (dy, dx)
+NEIGHBOURS = [(-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1)]
+
+def shift(array, dy, dx, fill):
+    """Shift a 2D array by (dy, dx), filling the uncovered edge with fill."""
+    height, width = array.shape
+    out = np.full_like(array, fill)
+    out[max(dy, 0):height + min(dy, 0), max(dx, 0):width + min(dx, 0)] = \
+        array[max(-dy, 0):height + min(-dy, 0), max(-dx, 0):width + min(-dx, 0)]
+    return out
+
+def label_regions(mask, neighbours=NEIGHBOURS):
+    """
+    Label the connected regions of a boolean mask, 8-connected unless
+    neighbours lists other (dy, dx) offsets.
+
+    Every foreground pixel starts as its own root (its flat index). Each
+    pass hooks every root to the smallest root next to any of its pixels
+    and then flattens the trees by pointer jumping, all as whole-array
+    operations; the number of roots per region at least halves each pass.
+
+    Returns:
+        (labels, count) where labels is an int array, 0 for background and
+        1..count for the regions in reading order of their first pixel
+    """
+    height, width = mask.shape
+    size = height * width
+    none = size  # past every pixel index, so never the smallest
+    parent = np.append(np.where(mask.ravel(), np.arange(size), none), none)
+    foreground = np.flatnonzero(mask)
+
+    while True:
+        roots = parent[:size].reshape(height, width)
+        lowest = roots
+        for dy, dx in neighbours:
+            lowest = np.minimum(lowest, shift(roots, dy, dx, none))
+        before = parent.copy()
+        np.minimum.at(parent, roots.ravel()[foreground], lowest.ravel()[foreground])
+        while True:
+            jumped = parent[parent]
+            if np.array_equal(jumped, parent):
+                break
+            parent = jumped
+        if np.array_equal(parent, before):
+            break
+
+    labels = np.zeros(size, dtype=np.int32)
+    _, labels[foreground] = np.unique(parent[foreground], return_inverse=True)
+    labels[foreground] += 1
+    return labels.reshape(height, width), int(labels.max())
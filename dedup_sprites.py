@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+Find duplicate sprites across tiles.wad, bomb.sht and the ZARGON.BAS DATA
+statements, and write each unique sprite once plus an alias table.
+
+Every sprite is first brought into one index space, the one DATA sprites
+already use: color indices 0-15 are opaque and TRANSPARENT (0xFF) marks
+transparent pixels, so bomb.sht color 0 becomes TRANSPARENT. Sprites are
+then hashed twice:
+- exactly, as width, height and index buffer
+- in canonical mirrored form: the smallest hash of the sprite, its
+  horizontal mirror, its vertical mirror and both, so Dude-SideL and a
+  mirrored Dude-SideR land in the same group
+The first sprite of each group, in build_assets.py source order, is kept;
+the others become aliases of it with the flips that reproduce them.
+
+The app's TileBitmapCache.tileResourceMap also maps several names to one
+drawable by hand ("huts", "HUT", "WEAPON_SHOP", ...). With --app-map those
+names are added to the alias table too.
+
+Alias table (sprite_aliases.json):
+{
+  "version": 1,
+  "images": {"dude_sidel": {"width": 30, "height": 30}, ...},
+  "aliases": {"dude_sider": {"image": "dude_sidel", "flip_x": true, "flip_y": false}, ...}
+}
+Every name, including each kept image's own, has an alias entry.
+
+The report gives the PNG bytes saved in the APK (the size of the dropped
+duplicate PNGs) and the bitmaps saved at runtime if every name is loaded
+through its alias: one ARGB_8888 bitmap per unique image instead of one
+per name.
+
+Usage:
+    python3 dedup_sprites.py zargon -o deduped \\
+        --app-map app/app/src/main/java/com/greenopal/zargon/domain/graphics/TileBitmapCache.kt
+"""
+
+import io
+import json
+import os
+import re
+
+import numpy as np
+
+from asset_manifest import record_digest
+from ega_palette import DATA_RGBA, TRANSPARENT, rgba_image
+from extract_data_sprites import BasIndex, sprite_values
+from extract_sheets import iter_sht_sprites, sprite_indices
+from extract_tiles import WadArchive
+from indexed_png import save_variants, scale_indices
+from pack_atlas import drawable_name
+
+ALIAS_VERSION = 1
+ALIAS_FILE = 'sprite_aliases.json'
+
+# Mirrored forms as (flip_x, flip_y)
+FLIPS = [(False, False), (True, False), (False, True), (True, True)]
+
+APP_ALIAS_RE = re.compile(r'"([^"]+)"\s+to\s+R\.drawable\.(\w+)')
+
+def flip(indices, flip_x, flip_y):
+    """Mirror an index array horizontally and/or vertically."""
+    return indices[::-1 if flip_y else 1, ::-1 if flip_x else 1]
+
+def indices_digest(indices):
+    """Exact hash of an index array's size and contents."""
+    height, width = indices.shape
+    return record_digest(np.ascontiguousarray(indices).tobytes(), width=width, height=height)
+
+def canonical_form(indices):
+    """
+    Hash a sprite in canonical mirrored form.
+
+    Returns:
+        (digest, (flip_x, flip_y)) where digest is the smallest hash over
+        the four mirrored forms and the flips produce that form
+    """
+    return min((indices_digest(flip(indices, *flips)), flips) for flips in FLIPS)
+
+def collect_sprites(source_dir):
+    """
+    Decode every sprite into the shared index space.
+
+    Sources are read in build_assets.py order (tiles.wad, bomb.sht, DATA).
+    When two sources share a drawable name (water), the later one
+    replaces the earlier, as it does in the built app.
+
+    Returns:
+        (sprites, shadowed) where sprites is a dict of drawable name ->
+        (source, indices) and shadowed lists the replaced "source:name"s
+    """
+    sprites = {}
+    shadowed = []
+
+    def add(source, name, indices):
+        key = drawable_name(name)
+        if key in sprites:
+            shadowed.append(f"{sprites[key][0]}:{key}")
+            del sprites[key]
+        sprites[key] = (source, indices)
+
+    wad_path = os.path.join(source_dir, 'tiles.wad')
+    if os.path.exists(wad_path):
+        with WadArchive(wad_path) as wad:
+            for name in wad.names:
+                add('tiles.wad', name, wad.indices(name))
+
+    sht_path = os.path.join(source_dir, 'bomb.sht')
+    if os.path.exists(sht_path):
+        for sprite in iter_sht_sprites(sht_path):
+            indices = sprite_indices(sprite)
+            add('bomb.sht', sprite.name, np.where(indices == 0, TRANSPARENT, indices).astype(np.uint8))
+
+    bas_path = os.path.join(source_dir, 'ZARGON.BAS')
+    if os.path.exists(bas_path):
+        for sprite in BasIndex(bas_path).sprites():
+            add('ZARGON.BAS', sprite.name, sprite_values(sprite))
+
+    return sprites, shadowed
+
+def dedup_sprites(sprites):
+    """
+    Group identical and mirrored sprites.
+
+    Args:
+        sprites: Dict of name -> (source, indices) from collect_sprites
+
+    Returns:
+        (images, aliases) where images is a dict of kept name -> indices
+        and aliases maps every name to (image name, flip_x, flip_y)
+    """
+    images = {}
+    aliases = {}
+    exact = {}
+    groups = {}
+    for name, (_, indices) in sprites.items():
+        digest = indices_digest(indices)
+        if digest in exact:
+            aliases[name] = exact[digest]
+            continue
+        canonical, flips = canonical_form(indices)
+        if canonical in groups:
+            image, image_flips = groups[canonical]
+            # Flips commute and undo themselves: image -> canonical -> this sprite
+            aliases[name] = (image, image_flips[0] != flips[0], image_flips[1] != flips[1])
+        else:
+            groups[canonical] = (name, flips)
+            images[name] = indices
+            aliases[name] = (name, False, False)
+        exact[digest] = aliases[name]
+    return images, aliases
+
+def app_aliases(kotlin_path):
+    """
+    Read the name -> drawable pairs of a Kotlin `"name" to R.drawable.x` map.
+
+    Returns:
+        Dict of app name -> drawable name
+    """
+    with open(kotlin_path, 'r', encoding='utf-8') as f:
+        return dict(APP_ALIAS_RE.findall(f.read()))
+
+def add_app_aliases(aliases, app_map):
+    """
+    Point app names at the images behind their drawables.
+
+    Returns:
+        List of app names whose drawable is not from the game sources
+    """
+    unknown = []
+    for app_name, drawable in app_map.items():
+        if drawable in aliases:
+            aliases.setdefault(app_name, aliases[drawable])
+        else:
+            unknown.append(app_name)
+    return unknown
+
+def png_size(indices, scale=1):
+    """Size in bytes of a sprite's RGBA PNG as the extractors write it."""
+    buf = io.BytesIO()
+    rgba_image(scale_indices(indices, scale), DATA_RGBA).save(buf, 'PNG')
+    return len(buf.getvalue())
+
+def dedup_report(sprites, images, aliases, scale=1):
+    """
+    Work out what deduplication saves.
+
+    Returns:
+        Dict with duplicates (name -> alias tuple), apk_bytes_before/after,
+        bitmaps_before/after and bitmap_bytes_before/after
+    """
+    sizes = {name: png_size(indices, scale) for name, (_, indices) in sprites.items()}
+
+    def bitmap_bytes(name):
+        height, width = sprites[name][1].shape
+        return int(width * scale) * int(height * scale) * 4
+
+    return {
+        'duplicates': {name: alias for name, alias in aliases.items()
+                       if name in sprites and alias[0] != name},
+        'apk_bytes_before': sum(sizes.values()),
+        'apk_bytes_after': sum(sizes[name] for name in images),
+        'bitmaps_before': len(aliases),
+        'bitmaps_after': len(images),
+        'bitmap_bytes_before': sum(bitmap_bytes(image) for image, _, _ in aliases.values()),
+        'bitmap_bytes_after': sum(bitmap_bytes(name) for name in images),
+    }
+
+def write_dedup(images, aliases, output_dir, scale=1):
+    """
+    Write one PNG per unique sprite and the alias table.
+
+    Returns:
+        Path of the alias table
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    for name, indices in images.items():
+        save_variants(indices, [(scale, os.path.join(output_dir, f'{name}.png'))], DATA_RGBA)
+
+    table = {
+        'version': ALIAS_VERSION,
+        'images': {name: {'width': int(indices.shape[1] * scale), 'height': int(indices.shape[0] * scale)}
+                   for name, indices in images.items()},
+        'aliases': {name: {'image': image, 'flip_x': flip_x, 'flip_y': flip_y}
+                    for name, (image, flip_x, flip_y) in sorted(aliases.items())},
+    }
+    alias_path = os.path.join(output_dir, ALIAS_FILE)
+    with open(alias_path, 'w') as f:
+        json.dump(table, f, indent=2)
+        f.write('\n')
+    return alias_path
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Deduplicate sprites across the Zargon sources')
+    parser.add_argument('source_dir', nargs='?', default='zargon',
+                        help='Directory with tiles.wad, bomb.sht and ZARGON.BAS')
+    parser.add_argument('-o', '--output', help='Write unique PNGs and the alias table here')
+    parser.add_argument('-s', '--scale', type=int, default=1, help='Scale factor (default: 1)')
+    parser.add_argument('--app-map', metavar='KOTLIN',
+                        help='Kotlin file with a "name" to R.drawable.x map (TileBitmapCache.kt) '
+                             'whose names are added as aliases')
+
+    args = parser.parse_args()
+
+    sprites, shadowed = collect_sprites(args.source_dir)
+    images, aliases = dedup_sprites(sprites)
+    report = dedup_report(sprites, images, aliases, args.scale)
+    print(f"{len(sprites)} sprites, {len(images)} unique")
+    for name in shadowed:
+        print(f"  {name} is replaced by a later source with the same drawable name")
+    for name, (image, flip_x, flip_y) in report['duplicates'].items():
+        flips = ' + '.join(f for f, on in (('flip x', flip_x), ('flip y', flip_y)) if on) or 'identical'
+        print(f"  {name} -> {image} ({flips})")
+
+    if args.app_map:
+        unknown = add_app_aliases(aliases, app_aliases(args.app_map))
+        app_names = len(aliases) - len(sprites)
+        print(f"{app_names} app names added from {args.app_map}; "
+              f"{len(unknown)} point at drawables outside the game sources")
+        report = dedup_report(sprites, images, aliases, args.scale)
+
+    apk_saved = report['apk_bytes_before'] - report['apk_bytes_after']
+    print(f"APK: {report['apk_bytes_before']} -> {report['apk_bytes_after']} PNG bytes "
+          f"({apk_saved} saved)")
+    print(f"Runtime: {report['bitmaps_before']} -> {report['bitmaps_after']} bitmaps, "
+          f"{report['bitmap_bytes_before']} -> {report['bitmap_bytes_after']} bytes ARGB_8888 "
+          f"({report['bitmap_bytes_before'] - report['bitmap_bytes_after']} saved)")
+
+    if args.output:
+        alias_path = write_dedup(images, aliases, args.output, args.scale)
+        print(f"Wrote {len(images)} PNGs and {alias_path}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Zargon's EGA palette as precomputed RGBA lookup tables.
+
+All three extractors (tiles.wad, bomb.sht and the ZARGON.BAS DATA
+statements) expand color indices through the tables here, so every asset
+comes out in the same colors. Each table is a packed array of uint32
+pixels whose bytes are R, G, B, A in memory order: expanding an index
+array is a single gather (rgba_pixels), four bytes per lookup, and
+per-asset transparency is baked into the table instead of being applied
+per pixel:
+- EGA_RGBA: all 64 colors of the EGA 6-bit color space, opaque
+- TILE_RGBA: the 16 Zargon colors, opaque (tiles.wad)
+- SHT_RGBA: color 0 is the transparent background (bomb.sht)
+- DATA_RGBA: 256 entries so any byte indexes it; colors 0-15 are opaque
+  and TRANSPARENT, the sentinel stored for "x" DATA values, is clear
+
+Usage:
+    python3 ega_palette.py            # print the Zargon palette
+    python3 ega_palette.py --check    # verify the tables against known EGA colors
+    python3 -m pytest -q              # test_ega_palette.py pins them in the test suite
+"""
+
+import numpy as np
+from PIL import Image
+
+def ega_palette_to_rgb(value):
+    """
+    Convert EGA 6-bit palette value to RGB.
+
+    EGA bit order is rgbRGB (from ModdingWiki):
+    - bit 5 = r (red low intensity 1/3)
+    - bit 4 = g (green low intensity 1/3)
+    - bit 3 = b (blue low intensity 1/3)
+    - bit 2 = R (red high intensity 2/3)
+    - bit 1 = G (green high intensity 2/3)
+    - bit 0 = B (blue high intensity 2/3)
+
+    Formula from https://moddingwiki.shikadi.net/wiki/EGA_Palette:
+    red = 85 * (((ega >> 1) & 2) | (ega >> 5) & 1)
+    green = 85 * ((ega & 2) | (ega >> 4) & 1)
+    blue = 85 * (((ega << 1) & 2) | (ega >> 3) & 1)
+    """
+    r = 85 * (((value >> 1) & 2) | ((value >> 5) & 1))
+    g = 85 * ((value & 2) | ((value >> 4) & 1))
+    b = 85 * (((value << 1) & 2) | ((value >> 3) & 1))
+    return (r, g, b)
+
+# EGA palette from ZARGON.BAS displayTile/pall subroutine:
+# PALETTE 0, 0: PALETTE 1, 4: PALETTE 2, 48: PALETTE 3, 2
+# PALETTE 4, 6: PALETTE 5, 54: PALETTE 6, 10: PALETTE 7, 38
+# PALETTE 8, 46: PALETTE 9, 5: PALETTE 10, 25: PALETTE 11, 7
+# PALETTE 12, 57: PALETTE 13, 63: PALETTE 14, 9: PALETTE 15, 59
+ZARGON_PALETTE_VALUES = [0, 4, 48, 2, 6, 54, 10, 38, 46, 5, 25, 7, 57, 63, 9, 59]
+ZARGON_PALETTE = [ega_palette_to_rgb(v) for v in ZARGON_PALETTE_VALUES]
+
+# Sentinel stored in DATA sprite buffers for the transparent "x" value
+TRANSPARENT = 0xFF
+
+# 6-bit values of the default EGA palette, as set at power-on
+DEFAULT_EGA_VALUES = [0, 1, 2, 3, 4, 5, 20, 7, 56, 57, 58, 59, 60, 61, 62, 63]
+
+# The 16 colors of the default EGA palette (the CGA colors), plus the three
+# low-intensity bits on their own, by 6-bit value
+CANONICAL_EGA_COLORS = {
+    32: (0x55, 0x00, 0x00), 16: (0x00, 0x55, 0x00), 8: (0x00, 0x00, 0x55),
+    0: (0x00, 0x00, 0x00), 1: (0x00, 0x00, 0xAA), 2: (0x00, 0xAA, 0x00), 3: (0x00, 0xAA, 0xAA),
+    4: (0xAA, 0x00, 0x00), 5: (0xAA, 0x00, 0xAA), 20: (0xAA, 0x55, 0x00), 7: (0xAA, 0xAA, 0xAA),
+    56: (0x55, 0x55, 0x55), 57: (0x55, 0x55, 0xFF), 58: (0x55, 0xFF, 0x55), 59: (0x55, 0xFF, 0xFF),
+    60: (0xFF, 0x55, 0x55), 61: (0xFF, 0x55, 0xFF), 62: (0xFF, 0xFF, 0x55), 63: (0xFF, 0xFF, 0xFF),
+}
+
+def pack_rgba(rgba):
+    """View an (n, 4) uint8 RGBA array as n packed little-endian uint32 pixels."""
+    return np.ascontiguousarray(rgba, dtype=np.uint8).view('<u4').reshape(-1)
+
+def unpack_rgba(packed):
+    """View packed uint32 pixels as RGBA bytes, adding a trailing axis of 4."""
+    return packed.view(np.uint8).reshape(*packed.shape, 4)
+
+def palette_lut(colors, size=None, transparent=()):
+    """
+    Build a packed RGBA lookup table.
+
+    Args:
+        colors: List of (r, g, b) tuples for the first entries
+        size: Number of entries (default: len(colors)); entries past the
+            colors are transparent black
+        transparent: Indices whose alpha is 0
+
+    Returns:
+        uint32 array of size entries
+    """
+    rgba = np.zeros((size or len(colors), 4), dtype=np.uint8)
+    rgba[:len(colors), :3] = colors
+    rgba[:len(colors), 3] = 255
+    rgba[list(transparent), 3] = 0
+    return pack_rgba(rgba)
+
+EGA_RGBA = palette_lut([ega_palette_to_rgb(v) for v in range(64)])
+TILE_RGBA = palette_lut(ZARGON_PALETTE)
+SHT_RGBA = palette_lut(ZARGON_PALETTE, transparent=[0])
+DATA_RGBA = palette_lut(ZARGON_PALETTE, size=256, transparent=[TRANSPARENT])
+
+def ega_lut(values, size=None, transparent=()):
+    """
+    Build a packed RGBA lookup table for any 16 EGA palette values, as
+    PALETTE statements would set them.
+
+    Args:
+        values: 6-bit EGA value for each color index
+        size, transparent: As for palette_lut
+
+    Raises:
+        ValueError: If a value is outside 0-63
+    """
+    if any(not 0 <= v < 64 for v in values):
+        raise ValueError(f"EGA palette values must be 0-63: {values}")
+    colors = unpack_rgba(EGA_RGBA)[list(values), :3]
+    return palette_lut(colors, size, transparent)
+
+def rgba_pixels(indices, lut):
+    """
+    Expand a color index array through a packed lookup table.
+
+    Returns:
+        (height, width, 4) uint8 RGBA array
+    """
+    return unpack_rgba(lut.take(indices))
+
+def rgba_image(indices, lut):
+    """Expand a (height, width) color index array into an RGBA image."""
+    return Image.fromarray(rgba_pixels(indices, lut), 'RGBA')
+
+def print_palette():
+    """Print the palette colors for debugging."""
+    for i, (r, g, b) in enumerate(ZARGON_PALETTE):
+        print(f"Color {i:2d}: palette value {ZARGON_PALETTE_VALUES[i]:2d} -> RGB({r:3d}, {g:3d}, {b:3d})")
+
+def check_palette():
+    """
+    Compare the lookup tables with the default EGA palette and the
+    per-asset transparency rules.
+
+    Returns:
+        List of failure descriptions (empty on success)
+    """
+    failures = []
+    ega = unpack_rgba(EGA_RGBA)
+    for value, rgb in CANONICAL_EGA_COLORS.items():
+        if tuple(ega[value]) != rgb + (255,):
+            failures.append(f"EGA {value}: {tuple(ega[value])} != {rgb + (255,)}")
+
+    zargon = ega[ZARGON_PALETTE_VALUES]
+    if len({tuple(c) for c in zargon}) != 16:
+        failures.append("Zargon palette colors are not all distinct")
+    for name, lut, clear in (('TILE_RGBA', TILE_RGBA, []), ('SHT_RGBA', SHT_RGBA, [0]),
+                             ('DATA_RGBA', DATA_RGBA, [TRANSPARENT])):
+        rgba = unpack_rgba(lut)
+        if not (rgba[:16, :3] == zargon[:, :3]).all():
+            failures.append(f"{name}: colors 0-15 differ from the Zargon palette")
+        alpha = np.where(np.isin(np.arange(16), clear), 0, 255)
+        if not (rgba[:16, 3] == alpha).all() or any(rgba[i, 3] for i in clear):
+            failures.append(f"{name}: wrong transparency")
+    return failures
+
+def main():
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description="Print or check Zargon's EGA palette")
+    parser.add_argument('--check', action='store_true',
+                        help='Verify the lookup tables against the default EGA colors')
+
+    args = parser.parse_args()
+
+    print("Zargon color palette:")
+    print_palette()
+    if args.check:
+        failures = check_palette()
+        for failure in failures:
+            print(f"Palette check FAILED: {failure}")
+        if failures:
+            sys.exit(1)
+        print("Palette check OK: EGA colors and per-asset transparency match")
+
+if __name__ == '__main__':
+    main()
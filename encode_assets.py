@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""
+Encode edited PNGs back into Zargon's tiles.wad and bomb.sht formats.
+
+This is the reverse of extract_tiles.py and extract_sheets.py, so tiles and
+sprites can be edited as PNGs and the DOS build (run_linux.sh) still runs:
+- wad: every PNG is mapped to palette indices and packed into the QBASIC
+  GET/PUT layout (4-byte width/height header, then for each row the 4 bit
+  planes, each padded to a 16-bit boundary), behind a tiles.wad directory
+- sht: every PNG is written as bomb.sht text (width, height, quoted name,
+  then one line of QBASIC-printed color indices per row)
+
+Pixels must use the 16 Zargon palette colors; fully transparent pixels
+become color 0. PNGs are matched to records by the drawable-style file name
+the extractors write (Dude-Back1 -> dude_back1.png). With --template, the
+template's record names and order are kept and records without a PNG keep
+their template pixels; without one, every PNG in the directory is encoded
+in name order.
+
+Two details of the shipped files are reproduced so that re-encoding them
+is byte-identical:
+- tiles.wad stores 4 zero bytes after each GET array (WAD_RECORD_PADDING)
+- the first seven bomb.sht sprites have no space after the last value of
+  each row; the row style is taken from the template per sprite
+
+Usage:
+    python3 encode_assets.py wad extracted_tiles -o tiles.wad --template zargon/tiles.wad
+    python3 encode_assets.py sht extracted_sprites -o bomb.sht --template zargon/bomb.sht
+    python3 encode_assets.py check zargon
+    python3 -m pytest -q test_encode_assets.py
+"""
+
+import os
+import struct
+import tempfile
+import time
+
+import numpy as np
+from PIL import Image
+
+from ega_palette import SHT_RGBA, TILE_RGBA, ZARGON_PALETTE
+from extract_sheets import iter_sht_sprites, sprite_indices
+from extract_tiles import WadArchive
+from indexed_png import save_variants
+from pack_atlas import drawable_name
+
+WAD_NAME_LENGTH = 15
+WAD_RECORD_PADDING = 4
+
+# Text for each color index as QBASIC's PRINT #1, g; writes it
+SHT_TOKENS = [f' {v} ' for v in range(16)]
+
+# Palette colors packed as 0xRRGGBB, sorted for np.searchsorted
+_PALETTE_KEYS = np.array([(r << 16) | (g << 8) | b for r, g, b in ZARGON_PALETTE])
+_KEY_ORDER = np.argsort(_PALETTE_KEYS)
+_SORTED_KEYS = _PALETTE_KEYS[_KEY_ORDER]
+
+def encode_ega_indices(indices):
+    """
+    Pack a (height, width) palette index array into a QBASIC GET/PUT array.
+
+    The inverse of extract_tiles.decode_ega_indices: bit n of each index
+    goes to plane n, planes are packed MSB first with np.packbits and each
+    plane row is padded with zero bits to a 16-bit boundary.
+
+    Returns:
+        bytes: 4-byte width/height header followed by the plane data
+    """
+    height, width = indices.shape
+    bytes_per_row = (width + 7) // 8
+    plane_stride = (bytes_per_row + 1) // 2 * 2
+
+    shifts = np.arange(4, dtype=np.uint8).reshape(1, 4, 1)
+    bits = (indices[:, None, :] >> shifts) & 1
+    planes = np.zeros((height, 4, plane_stride), dtype=np.uint8)
+    planes[:, :, :bytes_per_row] = np.packbits(bits, axis=2)
+    return struct.pack('<HH', width, height) + planes.tobytes()
+
+def build_wad(records):
+    """
+    Build a tiles.wad file image.
+
+    Args:
+        records: List of (name, indices) with indices a (height, width) array
+
+    Returns:
+        bytes of the complete WAD
+    """
+    directory = bytearray(struct.pack('<I', len(records)))
+    offset = 4 + len(records) * WadArchive.DIRECTORY_ENTRY.size
+    bodies = []
+    for name, indices in records:
+        if len(name) > WAD_NAME_LENGTH:
+            raise ValueError(f"tile name {name!r} is longer than {WAD_NAME_LENGTH} characters")
+        height, width = indices.shape
+        data = encode_ega_indices(indices) + bytes(WAD_RECORD_PADDING)
+        body = WadArchive.RECORD_HEADER.pack(width, height, len(data)) + data
+        directory += WadArchive.DIRECTORY_ENTRY.pack(
+            name.ljust(WAD_NAME_LENGTH).encode('ascii'), offset)
+        bodies.append(body)
+        offset += len(body)
+    return bytes(directory) + b''.join(bodies)
+
+def sht_row_styles(sht_path):
+    """
+    Read which sprites in a .sht file end their rows with a space.
+
+    Returns:
+        Dict of sprite name -> True if rows end with a trailing space
+    """
+    styles = {}
+    with open(sht_path, 'r') as f:
+        lines = iter(f.read().splitlines())
+    for line in lines:
+        try:
+            int(line)
+            height = int(next(lines))
+            name = next(lines).strip().strip('"')
+        except (ValueError, StopIteration):
+            continue
+        rows = [next(lines, '') for _ in range(height)]
+        styles[name] = bool(rows) and rows[0].endswith(' ')
+    return styles
+
+def format_sht_sprite(name, indices, trailing_space=True):
+    """
+    Render one sprite as bomb.sht text.
+
+    Args:
+        name: Sprite name
+        indices: (height, width) array of color indices 0-15
+        trailing_space: Keep the space QBASIC prints after the last value
+    """
+    height, width = indices.shape
+    lines = [str(width), str(height), f'"{name}"']
+    for row in indices.tolist():
+        text = ''.join([SHT_TOKENS[v] for v in row])
+        lines.append(text if trailing_space else text[:-1])
+    return ''.join(line + '\r\n' for line in lines)
+
+def build_sht(sprites, styles=None):
+    """
+    Build a .sht file image.
+
+    Args:
+        sprites: List of (name, indices)
+        styles: Optional name -> trailing_space dict from sht_row_styles
+
+    Returns:
+        bytes of the complete .sht file
+    """
+    styles = styles or {}
+    text = ''.join(format_sht_sprite(name, indices, styles.get(name, True))
+                   for name, indices in sprites)
+    return text.encode('ascii')
+
+def load_png_indices(png_path, scale=1):
+    """
+    Map a PNG's pixels back to Zargon palette indices.
+
+    Args:
+        png_path: PNG written by an extractor or edited by hand
+        scale: Scale the PNG was extracted at; every scale-th pixel is read
+
+    Returns:
+        (height, width) uint8 index array
+
+    Raises:
+        ValueError: If a pixel is not a palette color
+    """
+    rgba = np.asarray(Image.open(png_path).convert('RGBA'))[::scale, ::scale]
+    keys = ((rgba[..., 0].astype(np.int32) << 16) | (rgba[..., 1].astype(np.int32) << 8)
+            | rgba[..., 2])
+    # Transparent pixels (bomb.sht color 0) decode as black
+    keys = np.where(rgba[..., 3] == 0, 0, keys)
+
+    pos = np.minimum(np.searchsorted(_SORTED_KEYS, keys), len(_SORTED_KEYS) - 1)
+    bad = _SORTED_KEYS[pos] != keys
+    if bad.any():
+        y, x = (int(v[0]) for v in np.nonzero(bad))
+        raise ValueError(f"{png_path}: pixel ({x * scale}, {y * scale}) color #{int(keys[y, x]):06x} "
+                         f"is not a Zargon palette color")
+    return _KEY_ORDER[pos].astype(np.uint8)
+
+def collect_records(png_dir, template=None, scale=1):
+    """
+    Pair PNGs in a directory with record names.
+
+    Args:
+        png_dir: Directory of PNGs named like the extractors name them
+        template: Optional list of (name, indices) from the original file;
+            its names and order are kept, and records without a PNG keep
+            the template pixels
+        scale: Scale the PNGs were extracted at
+
+    Returns:
+        (records, replaced) where records is a list of (name, indices) and
+        replaced is the number of records read from PNGs
+    """
+    pngs = {os.path.splitext(f)[0]: os.path.join(png_dir, f) for f in sorted(os.listdir(png_dir))
+            if f.lower().endswith('.png') and not f.lower().endswith('_sheet.png')}
+
+    if template is None:
+        return [(name, load_png_indices(path, scale)) for name, path in pngs.items()], len(pngs)
+
+    records = []
+    replaced = 0
+    for name, indices in template:
+        png_path = pngs.get(drawable_name(name))
+        if png_path is not None:
+            indices = load_png_indices(png_path, scale)
+            replaced += 1
+        records.append((name, indices))
+    return records, replaced
+
+def wad_records(wad_path):
+    """Decode every record of a tiles.wad as (name, indices)."""
+    with WadArchive(wad_path) as wad:
+        return [(name, wad.indices(name)) for name in wad.names]
+
+def sht_records(sht_path):
+    """Decode every sprite of a .sht file as (name, indices)."""
+    return [(s.name, sprite_indices(s)) for s in iter_sht_sprites(sht_path)]
+
+def check_round_trip(source_dir):
+    """
+    Decode the shipped tiles.wad and bomb.sht, encode them again, directly
+    and through extracted PNGs, and compare with the originals.
+
+    Returns:
+        List of failure descriptions (empty on success)
+    """
+    failures = []
+    wad_path = os.path.join(source_dir, 'tiles.wad')
+    sht_path = os.path.join(source_dir, 'bomb.sht')
+
+    checks = []
+    if os.path.exists(wad_path):
+        checks.append((wad_path, wad_records, TILE_RGBA, lambda records: build_wad(records)))
+    if os.path.exists(sht_path):
+        styles = sht_row_styles(sht_path)
+        checks.append((sht_path, sht_records, SHT_RGBA,
+                       lambda records: build_sht(records, styles)))
+
+    for path, decode, lut, encode in checks:
+        with open(path, 'rb') as f:
+            original = f.read()
+        records = decode(path)
+
+        start = time.perf_counter()
+        direct = encode(records)
+        elapsed = time.perf_counter() - start
+
+        with tempfile.TemporaryDirectory() as png_dir:
+            for name, indices in records:
+                save_variants(indices, [(1, os.path.join(png_dir, f'{drawable_name(name)}.png'))], lut)
+            via_png = encode(collect_records(png_dir, records)[0])
+
+        name = os.path.basename(path)
+        for label, encoded in (('direct', direct), ('via PNG', via_png)):
+            if encoded != original:
+                at = next((i for i, (a, b) in enumerate(zip(encoded, original)) if a != b),
+                          min(len(encoded), len(original)))
+                failures.append(f"{name} ({label}): first difference at byte {at} "
+                                f"({len(encoded)} vs {len(original)} bytes)")
+        print(f"{name}: {len(records)} records re-encoded in {elapsed * 1000:.2f} ms "
+              f"({len(original)} bytes)")
+    return failures
+
+def main():
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description='Encode PNGs back into tiles.wad or bomb.sht')
+    parser.add_argument('format', choices=['wad', 'sht', 'check'],
+                        help='Output format, or check to round-trip the shipped files')
+    parser.add_argument('source', help='Directory of PNGs (or, for check, the game directory)')
+    parser.add_argument('-o', '--output', help='Output tiles.wad or .sht file')
+    parser.add_argument('--template', help='Original tiles.wad or .sht supplying record names, '
+                                           'order and unedited records')
+    parser.add_argument('-s', '--scale', type=int, default=1,
+                        help='Scale the PNGs were extracted at (default: 1)')
+
+    args = parser.parse_args()
+
+    if args.format == 'check':
+        failures = check_round_trip(args.source)
+        if failures:
+            for failure in failures:
+                print(f"Round trip FAILED: {failure}")
+            sys.exit(1)
+        print("Round trip OK: decode -> encode is byte-identical, directly and via PNG")
+        return
+
+    if not args.output:
+        parser.error('-o/--output is required')
+
+    try:
+        if args.format == 'wad':
+            template = wad_records(args.template) if args.template else None
+            records, replaced = collect_records(args.source, template, args.scale)
+            data = build_wad(records)
+        else:
+            template = sht_records(args.template) if args.template else None
+            records, replaced = collect_records(args.source, template, args.scale)
+            data = build_sht(records, sht_row_styles(args.template) if args.template else None)
+    except ValueError as e:
+        print(f"Cannot encode: {e}")
+        sys.exit(1)
+
+    with open(args.output, 'wb') as f:
+        f.write(data)
+    print(f"Wrote {args.output}: {len(records)} records ({replaced} from PNGs), {len(data)} bytes")
+
+if __name__ == '__main__':
+    main()
@@ -3,43 +3,51 @@
 Extract monster sprites from ZARGON.BAS DATA statements.
 
 These sprites are defined inline in the QBASIC code as DATA statements
-and read by the readjunk subroutine.
+and read by the readjunk subroutine. The file is scanned once: sprite
+names and sizes come from the GET statements in readjunk, and each
+sprite's position in the DATA stream from the READ loops of every reader
+SUB in the order the program calls them.
 """
 
 import os
 import re
+from collections import namedtuple
+
+import numpy as np
 from PIL import Image
 
-# Zargon palette
-def ega_palette_to_rgb(value):
-    """Convert EGA 6-bit palette value to RGB."""
-    r_low = (value >> 2) & 1
-    g_low = (value >> 1) & 1
-    b_low = value & 1
-    r_hi = (value >> 5) & 1
-    g_hi = (value >> 4) & 1
-    b_hi = (value >> 3) & 1
-    r = (r_hi * 2 + r_low) * 85
-    g = (g_hi * 2 + g_low) * 85
-    b = (b_hi * 2 + b_low) * 85
-    return (r, g, b)
-
-ZARGON_PALETTE_VALUES = [0, 4, 48, 2, 6, 54, 10, 38, 46, 5, 25, 7, 57, 63, 9, 59]
-ZARGON_PALETTE = [ega_palette_to_rgb(v) for v in ZARGON_PALETTE_VALUES]
-
-# Sprite definitions from readjunk subroutine in ZARGON.BAS
-# Format: (name, width, height, start_line)
-SPRITES = [
-    ("joe", 18, 30, 262),        # Player character (biggy joe)
-    ("bat", 17, 15, 294),        # Bat monster (drake)
-    ("slime", 17, 15, 316),      # Slime monster
-    ("ghost", 27, 26, 333),      # Ghost monster
-    ("joeattax", 21, 30, 361),   # Player attacking
-    ("flame", 80, 4, 393),       # Flame effect
-    ("beleth", 39, 32, 400),     # Beleth demon
-    ("babble", 27, 10, 434),     # Babble monster (slime2)
-    ("spook", 25, 26, 446),      # Spook ghost
-]
+from asset_manifest import AssetManifest, record_digest
+from ega_palette import DATA_RGBA, TRANSPARENT, ZARGON_PALETTE, rgba_image
+from indexed_png import PngWriter, density_outputs, parse_densities, save_variants, scale_indices
+from sprite_masks import MASK_FILE, sprite_mask, write_mask_index
+from stage_profile import NULL_PROFILER, add_profile_arguments, finish_profile, profiler_from_args
+
+# Fast lookup for the DATA tokens sprites actually use
+DATA_TOKENS = {str(i): i for i in range(16)}
+DATA_TOKENS.update({'x': TRANSPARENT, 'X': TRANSPARENT})
+
+DataBlock = namedtuple('DataBlock', ['line', 'label', 'offset', 'count'])
+DataBlock.__doc__ = """A run of consecutive DATA lines: first source line, the label or
+comment above it, and its position in the module's DATA stream."""
+
+ReadSprite = namedtuple('ReadSprite', ['name', 'width', 'height', 'reads', 'line'])
+ReadSprite.__doc__ = """A GET captured by a reader SUB after READing `reads` DATA values."""
+
+DataSprite = namedtuple('DataSprite', ['name', 'width', 'height', 'values', 'line'])
+DataSprite.__doc__ = """A decoded DATA sprite; values holds width*height color indices,
+row-major, with TRANSPARENT for "x"."""
+
+LABEL_RE = re.compile(r'^([A-Za-z][\w.]*):$')
+SUB_RE = re.compile(r'^(?:SUB|FUNCTION)\s+([A-Za-z][\w.]*[!$%&#]?)', re.IGNORECASE)
+END_SUB_RE = re.compile(r'^END\s+(?:SUB|FUNCTION)\b', re.IGNORECASE)
+FOR_RE = re.compile(r'^FOR\s+\w+\s*=\s*(-?\d+)\s+TO\s+(-?\d+)\s*$', re.IGNORECASE)
+GET_RE = re.compile(r'^GET\s*\(\s*(\d+)\s*,\s*(\d+)\s*\)\s*-\s*\(\s*(\d+)\s*,\s*(\d+)\s*\)\s*,\s*([A-Za-z][\w.]*)',
+                    re.IGNORECASE)
+DIM_ARRAY_RE = re.compile(r'([A-Za-z][\w.]*)\s*\(')
+STRING_RE = re.compile(r'"[^"]*"')
+WORD_RE = re.compile(r'[a-z][\w.]*')
+# Only lines mentioning one of these need to be split into statements
+KEYWORD_RE = re.compile(r'\b(?:SUB|FUNCTION|FOR|NEXT|READ|GET|DIM)\b', re.IGNORECASE)
 
 def parse_data_line(line):
     """Parse a DATA line and return list of values."""
@@ -59,66 +67,323 @@ def parse_data_line(line):
                 values.append(None)
     return values
 
-def extract_sprite_from_bas(bas_path, sprite_name, width, height, start_line):
-    """Extract a sprite from QBASIC DATA statements."""
-    with open(bas_path, 'r') as f:
-        lines = f.readlines()
-
-    pixels = []
-    current_line = start_line - 1  # 0-indexed
-
-    # Read enough data for width x height pixels
-    total_pixels_needed = width * height
-    all_values = []
-
-    while len(all_values) < total_pixels_needed and current_line < len(lines):
-        line = lines[current_line].strip()
-        if line.upper().startswith('DATA'):
-            values = parse_data_line(line)
-            all_values.extend(values)
-        elif line and not line.startswith("'"):
-            # Non-DATA non-comment line, probably end of sprite
-            if all_values:  # Only break if we've started reading data
-                break
-        current_line += 1
-
-    # Convert to 2D array
-    for y in range(height):
-        row = []
-        for x in range(width):
-            idx = y * width + x
-            if idx < len(all_values):
-                row.append(all_values[idx])
-            else:
-                row.append(None)
-        pixels.append(row)
+def split_statements(line):
+    """Strip the comment from a QBASIC line and split it on ':' outside strings."""
+    if '"' not in line and "'" not in line:
+        return [st for st in (part.strip() for part in line.split(':'))
+                if st and not st.upper().startswith('REM ')]
 
-    return pixels
+    statements = []
+    current = []
+    in_string = False
+    for ch in line:
+        if ch == '"':
+            in_string = not in_string
+        elif not in_string and ch == "'":
+            break
+        elif not in_string and ch == ':':
+            statements.append(''.join(current).strip())
+            current = []
+            continue
+        current.append(ch)
+    statements.append(''.join(current).strip())
+    return [st for st in statements if st and not st.upper().startswith('REM ')]
 
-def save_sprite(pixels, output_path, scale=1):
-    """Save sprite pixels as PNG."""
-    height = len(pixels)
-    width = len(pixels[0]) if pixels else 0
+class BasIndex:
+    """
+    Single-pass index of the DATA statements and sprite readers in a
+    QBASIC source file.
 
-    img = Image.new('RGBA', (width, height))
-    img_pixels = img.load()
+    Scanning the file once records:
+    - the module's DATA stream (every DATA value in file order) and the
+      blocks of consecutive DATA lines it is made of
+    - every reader SUB: a SUB that READs DATA inside FOR loops and then
+      GETs the drawn rectangle into an array, with the GET dimensions and
+      how many values each sprite consumed
+    - the order in which SUBs are first called from the main module, which
+      is the order the readers consume the DATA stream
+    - the arrays declared with DIM
 
-    for y in range(height):
-        for x in range(width):
-            val = pixels[y][x]
-            if val is None:
-                # Transparent
-                img_pixels[x, y] = (0, 0, 0, 0)
-            else:
-                color_idx = val % 16
-                r, g, b = ZARGON_PALETTE[color_idx]
-                img_pixels[x, y] = (r, g, b, 255)
+    Sprite dimensions, names and positions in the DATA stream therefore
+    come from the BAS source itself rather than hard-coded line numbers.
+    """
+
+    def __init__(self, bas_path):
+        self.path = bas_path
+        self.values = bytearray()
+        self.blocks = []
+        self.readers = {}
+        self.arrays = set()
+        self.sub_names = {}
+        self._code = {None: []}
+        self._scan(bas_path)
+
+    def _scan(self, bas_path):
+        sub = None
+        last_tag = None
+        block = None
+        loops = []
+        reads = 0
+
+        with open(bas_path, 'r', errors='replace') as f:
+            for line_no, raw in enumerate(f, 1):
+                line = raw.strip()
+
+                if line.upper().startswith('DATA'):
+                    values = [DATA_TOKENS.get(tok.strip(), -1) for tok in line[4:].split(',')]
+                    if -1 in values:
+                        values = [TRANSPARENT if v is None else v % 16 for v in parse_data_line(line)]
+                    if block is None:
+                        block = [line_no, last_tag, len(self.values), 0]
+                    block[3] += len(values)
+                    self.values += bytes(values)
+                    continue
+                if block is not None:
+                    self.blocks.append(DataBlock(*block))
+                    block = None
+                    last_tag = None
+
+                if not line:
+                    continue
+                if line.startswith("'"):
+                    # The first comment above a block names it
+                    if last_tag is None:
+                        last_tag = line.lstrip("'").strip()
+                    continue
+                label = LABEL_RE.match(line)
+                if label:
+                    last_tag = label.group(1)
+                    continue
+
+                if not KEYWORD_RE.search(line):
+                    if not line.upper().startswith('DECLARE '):
+                        self._code[sub and sub.lower()].append(line)
+                    continue
+
+                statements = split_statements(line)
+                if not statements:
+                    continue
+                first = statements[0]
+
+                match = SUB_RE.match(first)
+                if match and sub is None:
+                    sub = match.group(1).rstrip('!$%&#')
+                    self.sub_names[sub.lower()] = sub
+                    self._code[sub.lower()] = []
+                    loops, reads = [], 0
+                    continue
+                if END_SUB_RE.match(first):
+                    sub = None
+                    continue
+                if not first.upper().startswith('DECLARE '):
+                    self._code[sub and sub.lower()].append(line)
+
+                for st in statements:
+                    upper = st.upper()
+                    if upper.startswith('DIM '):
+                        self.arrays.update(n.lower() for n in DIM_ARRAY_RE.findall(st[4:]))
+                    elif upper.startswith('FOR '):
+                        bounds = FOR_RE.match(st)
+                        loops.append(int(bounds.group(2)) - int(bounds.group(1)) + 1 if bounds else None)
+                    elif upper == 'NEXT' or upper.startswith('NEXT '):
+                        names = st[4:].split(',') if st[4:].strip() else ['']
+                        del loops[max(0, len(loops) - len(names)):]
+                    elif upper.startswith('READ ') and sub is not None:
+                        trips = 1
+                        for count in loops:
+                            trips = None if (trips is None or count is None) else trips * count
+                        variables = len(st[5:].split(','))
+                        reads = None if (reads is None or trips is None) else reads + trips * variables
+                    elif upper.startswith('GET') and sub is not None and reads:
+                        get = GET_RE.match(st)
+                        if get:
+                            x1, y1, x2, y2 = (int(v) for v in get.groups()[:4])
+                            self.readers.setdefault(sub.lower(), []).append(
+                                ReadSprite(get.group(5), x2 - x1 + 1, y2 - y1 + 1, reads, line_no))
+                            reads = 0
+
+        if block is not None:
+            self.blocks.append(DataBlock(*block))
+
+    def call_order(self):
+        """Return SUB names in the order they are first called from the main module."""
+        order = []
+        seen = set()
+
+        def visit(key):
+            text = STRING_RE.sub('', '\n'.join(self._code[key])).lower()
+            for callee in WORD_RE.findall(text):
+                if callee in self.sub_names and callee not in seen:
+                    seen.add(callee)
+                    order.append(callee)
+                    visit(callee)
+
+        visit(None)
+        return order
+
+    def layout(self):
+        """
+        Position every reader's sprites in the DATA stream.
+
+        Returns:
+            List of (reader SUB name, ReadSprite, stream offset) in read order
+        """
+        called = self.call_order()
+        # Readers that are never called still get laid out, after the rest
+        order = [r for r in called if r in self.readers]
+        order += [r for r in self.readers if r not in called]
+
+        placed = []
+        offset = 0
+        for reader in order:
+            for read in self.readers[reader]:
+                if read.reads is None:
+                    raise ValueError(f"{self.path}:{read.line}: cannot count READs for '{read.name}'")
+                placed.append((self.sub_names[reader], read, offset))
+                offset += read.reads
+
+        if offset != len(self.values):
+            print(f"Warning: readers consume {offset} DATA values, file has {len(self.values)}")
+        return placed
+
+    def sprites(self, reader='readjunk'):
+        """
+        Decode the sprites captured by one reader SUB.
+
+        Args:
+            reader: Name of the reader SUB (case-insensitive)
+
+        Returns:
+            List of DataSprite records in read order
+        """
+        sprites = []
+        for sub, read, offset in self.layout():
+            if sub.lower() != reader.lower():
+                continue
+            if read.name.lower() not in self.arrays:
+                print(f"Warning: GET target '{read.name}' at line {read.line} is not DIMmed")
+            size = read.width * read.height
+            if read.reads != size:
+                print(f"Warning: '{read.name}' reads {read.reads} values for a "
+                      f"{read.width}x{read.height} GET")
+            values = bytes(self.values[offset:offset + min(read.reads, size)])
+            values += bytes([TRANSPARENT]) * (size - len(values))
+            sprites.append(DataSprite(read.name, read.width, read.height, values,
+                                      self.line_of(offset)))
+        return sprites
+
+    def line_of(self, offset):
+        """Return the source line of the DATA block containing a stream offset."""
+        for block in self.blocks:
+            if block.offset <= offset < block.offset + block.count:
+                return block.line
+        return None
 
-    if scale > 1:
-        img = img.resize((width * scale, height * scale), Image.NEAREST)
+def sprite_values(sprite):
+    """View a DataSprite's values as a (height, width) array."""
+    return np.frombuffer(sprite.values, dtype=np.uint8).reshape(sprite.height, sprite.width)
 
-    img.save(output_path, 'PNG')
-    return img
+def data_masks(sprites):
+    """SpriteMasks of DataSprites (TRANSPARENT pixels are transparent)."""
+    return [sprite_mask(s.name, s.width, s.height, s.values, TRANSPARENT) for s in sprites]
+
+def sprite_image(sprite, scale=1):
+    """Convert a DataSprite into an RGBA image, optionally scaled."""
+    return rgba_image(scale_indices(sprite_values(sprite), scale), DATA_RGBA)
+
+def sprite_palette_indices(sprite):
+    """
+    Map a DataSprite onto a palette that can carry its transparency.
+
+    PNG transparency is per palette entry, so the TRANSPARENT sentinel is
+    moved to a color index the sprite does not use, whose entry becomes
+    transparent black. No DATA sprite uses all 16 colors; if one ever does,
+    a 17th entry is appended and the PNG falls back to 8 bits per pixel.
+
+    Returns:
+        (indices, palette, transparent) where indices is a (height, width)
+        array and transparent is the palette index for "x" or None
+    """
+    values = sprite_values(sprite)
+    used = set(np.unique(values).tolist())
+    if TRANSPARENT not in used:
+        return values, ZARGON_PALETTE, None
+
+    free = [i for i in range(16) if i not in used]
+    slot = free[0] if free else 16
+    palette = list(ZARGON_PALETTE) + [(0, 0, 0)] * (slot + 1 - len(ZARGON_PALETTE))
+    palette[slot] = (0, 0, 0)
+    return np.where(values == TRANSPARENT, slot, values).astype(np.uint8), palette, slot
+
+def save_sprite(sprite, output_path, scale=1, indexed=False, profiler=None, writer=None):
+    """
+    Save a DataSprite as PNG.
+
+    Returns:
+        The RGBA image, or None for a palette-indexed PNG
+    """
+    images = save_sprite_variants(sprite, [(scale, output_path)], indexed, profiler, writer)
+    return None if indexed else images[0]
+
+def save_sprite_variants(sprite, outputs, indexed=False, profiler=None, writer=None):
+    """
+    Save a DataSprite at several scales from a single decode.
+
+    Args:
+        sprite: DataSprite record
+        outputs: List of (scale, output_path), e.g. from density_outputs
+        indexed: Save palette-indexed PNGs instead of RGBA
+        profiler: Optional StageProfiler timing the decode, scale, encode
+            and write stages
+        writer: Optional PngWriter to encode and write in the background
+
+    Returns:
+        List of the saved images, parallel to outputs
+    """
+    profiler = profiler or NULL_PROFILER
+    with profiler.stage('decode', sprite.name):
+        if indexed:
+            indices, palette, transparent = sprite_palette_indices(sprite)
+        else:
+            indices, palette, transparent = sprite_values(sprite), None, None
+    return save_variants(indices, outputs, DATA_RGBA, palette, transparent,
+                         profiler=profiler, record=sprite.name, writer=writer)
+
+def create_monster_sheet(sprites, output_path, tiles_per_row=4, scale=1, images=None):
+    """
+    Create a sprite sheet from DATA sprites.
+
+    Args:
+        sprites: List of DataSprite records
+        output_path: Path for output sprite sheet
+        tiles_per_row: Number of sprites per row in the sheet
+        scale: Scale factor
+        images: Optional list of already rendered images, parallel to
+            sprites; None entries are rendered here
+    """
+    if images is None:
+        images = [None] * len(sprites)
+    images = [(sprite.name, img if img is not None else sprite_image(sprite, scale))
+              for sprite, img in zip(sprites, images)]
+
+    max_width = max(img.width for _, img in images)
+    max_height = max(img.height for _, img in images)
+
+    num_rows = (len(images) + tiles_per_row - 1) // tiles_per_row
+    sheet_width = tiles_per_row * (max_width + 2) + 2
+    sheet_height = num_rows * (max_height + 2) + 2
+
+    sheet = Image.new('RGBA', (sheet_width, sheet_height), (64, 64, 64, 255))
+
+    for i, (name, img) in enumerate(images):
+        row = i // tiles_per_row
+        col = i % tiles_per_row
+        x = col * (max_width + 2) + 2
+        y = row * (max_height + 2) + 2
+        sheet.paste(img, (x, y))
+
+    sheet.save(output_path, 'PNG')
+    print(f"\nCreated sprite sheet: {output_path}")
 
 def main():
     import argparse
@@ -128,45 +393,122 @@ def main():
     parser.add_argument('-o', '--output', default='extracted_monsters', help='Output directory')
     parser.add_argument('-s', '--scale', type=int, default=1, help='Scale factor')
     parser.add_argument('--sheet', action='store_true', help='Create sprite sheet')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Only rebuild sprites whose DATA range or parameters changed')
+    parser.add_argument('--reader', default='readjunk',
+                        help='Reader SUB whose sprites are extracted (default: readjunk)')
+    parser.add_argument('--list', action='store_true',
+                        help='List DATA blocks and reader sprites without extracting')
+    parser.add_argument('--indexed', action='store_true',
+                        help='Save 4-bit palette-indexed PNGs instead of RGBA')
+    parser.add_argument('--densities', metavar='LIST',
+                        help='Write drawable-<density>/ folders under the output directory, '
+                             'e.g. "mdpi,xhdpi" or "all"')
+    parser.add_argument('--writers', type=int, default=4,
+                        help='Threads compressing and writing PNGs (default: 4, 1 = synchronous)')
+    parser.add_argument('--masks', action='store_true',
+                        help=f'Also write bounding boxes, collision masks and row spans to {MASK_FILE}')
+    add_profile_arguments(parser)
 
     args = parser.parse_args()
+    try:
+        densities = parse_densities(args.densities) if args.densities else None
+    except ValueError as e:
+        parser.error(str(e))
+    if args.writers < 1:
+        parser.error('--writers must be at least 1')
+
+    profiler = profiler_from_args('monsters', args)
+
+    with profiler.stage('parse'):
+        index = BasIndex(args.bas_file)
+    profiler.read(os.path.getsize(args.bas_file))
+
+    if args.list:
+        print(f"{len(index.values)} DATA values in {len(index.blocks)} blocks")
+        for block in index.blocks:
+            print(f"  line {block.line:5d}: {block.count:5d} values  {block.label or ''}")
+        print("Reader sprites in DATA stream order:")
+        for sub, read, offset in index.layout():
+            print(f"  {sub}: {read.name} {read.width}x{read.height} at value {offset} "
+                  f"(line {index.line_of(offset)})")
+        return
+
+    with profiler.stage('parse'):
+        sprites = index.sprites(args.reader)
 
     os.makedirs(args.output, exist_ok=True)
+    manifest = AssetManifest(args.output, 'monsters') if args.incremental else None
 
     images = []
-    for name, width, height, start_line in SPRITES:
-        print(f"Extracting '{name}' ({width}x{height}) from line {start_line}...")
-        pixels = extract_sprite_from_bas(args.bas_file, name, width, height, start_line)
-
-        output_path = os.path.join(args.output, f'{name}.png')
-        img = save_sprite(pixels, output_path, args.scale)
-        images.append((name, img))
-        print(f"  Saved: {output_path}")
-
-    if args.sheet:
-        # Create sprite sheet
-        max_width = max(img.width for _, img in images)
-        max_height = max(img.height for _, img in images)
-        tiles_per_row = 4
-
-        num_rows = (len(images) + tiles_per_row - 1) // tiles_per_row
-        sheet_width = tiles_per_row * (max_width + 2) + 2
-        sheet_height = num_rows * (max_height + 2) + 2
-
-        sheet = Image.new('RGBA', (sheet_width, sheet_height), (64, 64, 64, 255))
-
-        for i, (name, img) in enumerate(images):
-            row = i // tiles_per_row
-            col = i % tiles_per_row
-            x = col * (max_width + 2) + 2
-            y = row * (max_height + 2) + 2
-            sheet.paste(img, (x, y))
+    digests = []
+    with PngWriter(args.writers, profiler=profiler) as writer:
+        for sprite in sprites:
+            filename = f'{sprite.name}.png'
+            if densities:
+                outputs = density_outputs(filename, densities, args.scale)
+            else:
+                outputs = [(args.scale, filename)]
+
+            if manifest is not None:
+                with profiler.stage('digest', sprite.name):
+                    sprite_digests = {
+                        rel_path: record_digest(sprite.values, width=sprite.width, height=sprite.height,
+                                                scale=out_scale, palette=ZARGON_PALETTE,
+                                                transparency='x', png='indexed' if args.indexed else 'rgba')
+                        for out_scale, rel_path in outputs}
+                    # The sheet is always RGBA at --scale
+                    digests.append(record_digest(sprite.values, width=sprite.width, height=sprite.height,
+                                                 scale=args.scale, palette=ZARGON_PALETTE,
+                                                 transparency='x', png='rgba'))
+                outputs = [(out_scale, rel_path) for out_scale, rel_path in outputs
+                           if not manifest.is_fresh(rel_path, sprite_digests[rel_path])]
+                if not outputs:
+                    images.append((sprite.name, None))
+                    continue
+
+            print(f"Extracting '{sprite.name}' ({sprite.width}x{sprite.height}) from line {sprite.line}...")
+            if densities:
+                save_sprite_variants(sprite, [(out_scale, os.path.join(args.output, rel_path))
+                                              for out_scale, rel_path in outputs],
+                                     args.indexed, profiler, writer)
+                img = None
+            else:
+                img = save_sprite(sprite, os.path.join(args.output, filename), args.scale, args.indexed,
+                                  profiler, writer)
+            images.append((sprite.name, img))
+            for _, rel_path in outputs:
+                print(f"  Saved: {os.path.join(args.output, rel_path)}")
+                if manifest is not None:
+                    manifest.update(rel_path, sprite_digests[rel_path])
 
+    sheet_digest = None
+    if args.sheet and manifest is not None:
+        sheet_digest = record_digest('\n'.join(digests), tiles_per_row=4)
+        if manifest.is_fresh('monster_sheet.png', sheet_digest):
+            args.sheet = False
+
+    if args.sheet and sprites:
+        # Up-to-date sprites were skipped and are rendered by the sheet builder
         sheet_path = os.path.join(args.output, 'monster_sheet.png')
-        sheet.save(sheet_path, 'PNG')
-        print(f"\nCreated sprite sheet: {sheet_path}")
+        with profiler.stage('sheet', output=sheet_path):
+            create_monster_sheet(sprites, sheet_path, scale=args.scale,
+                                 images=[img for _, img in images])
+        if manifest is not None:
+            manifest.update('monster_sheet.png', sheet_digest)
+
+    if args.masks and sprites:
+        mask_path = os.path.join(args.output, MASK_FILE)
+        with profiler.stage('masks', output=mask_path):
+            size = write_mask_index(data_masks(sprites), mask_path)
+        print(f"Saved masks of {len(sprites)} sprites: {mask_path} ({size} bytes)")
+
+    print(f"\nExtracted {len(sprites)} sprites to {args.output}")
 
-    print(f"\nExtracted {len(SPRITES)} sprites to {args.output}")
+    if manifest is not None:
+        manifest.save()
+        print(manifest.summary())
+    finish_profile(profiler, args)
 
 if __name__ == '__main__':
     main()
@@ -12,172 +12,221 @@ Format:
 
 import os
 import re
-from PIL import Image
-
-# Zargon palette from ZARGON.BAS (same as used in tiles.wad)
-def ega_palette_to_rgb(value):
-    """
-    Convert EGA 6-bit palette value to RGB.
+import time
+import tracemalloc
+from collections import namedtuple
 
-    EGA bit order is rgbRGB (from ModdingWiki):
-    - bit 5 = r (red low intensity 1/3)
-    - bit 4 = g (green low intensity 1/3)
-    - bit 3 = b (blue low intensity 1/3)
-    - bit 2 = R (red high intensity 2/3)
-    - bit 1 = G (green high intensity 2/3)
-    - bit 0 = B (blue high intensity 2/3)
+import numpy as np
+from PIL import Image
 
-    Formula from https://moddingwiki.shikadi.net/wiki/EGA_Palette
+from asset_manifest import AssetManifest, record_digest
+from ega_palette import SHT_RGBA, ZARGON_PALETTE, rgba_image
+from indexed_png import PngWriter, density_outputs, parse_densities, save_variants, scale_indices
+from sprite_masks import MASK_FILE, sprite_mask, write_mask_index
+from stage_profile import NULL_PROFILER, add_profile_arguments, finish_profile, profiler_from_args
+
+ShtSprite = namedtuple('ShtSprite', ['name', 'width', 'height', 'indices'])
+ShtSprite.__doc__ = """One sprite from a .sht file; indices holds width*height color
+indices (0-15), row-major, as a bytes object."""
+
+def parse_sht_row(row_line, width):
+    """Parse one row of space-separated color indices into width bytes."""
+    tokens = row_line.split()
+    try:
+        values = [int(val) % 16 for val in tokens]
+    except ValueError:
+        values = []
+        for val in tokens:
+            try:
+                values.append(int(val) % 16)
+            except ValueError:
+                values.append(0)
+
+    row = bytes(values[:width])
+    if len(row) < width:
+        row += bytes(width - len(row))
+    return row
+
+def iter_sht_sprites(sht_path):
     """
-    r = 85 * (((value >> 1) & 2) | ((value >> 5) & 1))
-    g = 85 * ((value & 2) | ((value >> 4) & 1))
-    b = 85 * (((value << 1) & 2) | ((value >> 3) & 1))
-    return (r, g, b)
+    Stream sprite records from a .sht file one at a time.
 
-ZARGON_PALETTE_VALUES = [0, 4, 48, 2, 6, 54, 10, 38, 46, 5, 25, 7, 57, 63, 9, 59]
-ZARGON_PALETTE = [ega_palette_to_rgb(v) for v in ZARGON_PALETTE_VALUES]
-
-def extract_sht_sprites(sht_path, output_dir, scale=1):
-    """
-    Extract all sprites from a .sht file.
+    Lines are read lazily, so only the sprite being parsed is held in
+    memory. Malformed headers are skipped a line at a time, short rows
+    are padded with color 0 and long rows are trimmed.
 
     Args:
         sht_path: Path to .sht file
-        output_dir: Directory to save extracted PNGs
-        scale: Scale factor for output images
-    """
-    os.makedirs(output_dir, exist_ok=True)
 
+    Yields:
+        ShtSprite records in file order
+    """
     with open(sht_path, 'r') as f:
-        content = f.read()
-
-    # Split into lines
-    lines = content.strip().split('\n')
-
-    sprites = []
-    i = 0
-
-    while i < len(lines):
-        # Try to parse a sprite
-        try:
-            # Read width
-            width = int(lines[i].strip())
-            i += 1
-
-            # Read height
-            height = int(lines[i].strip())
-            i += 1
+        lines = enumerate(f, 1)
+        for line_no, line in lines:
+            # Try to parse a sprite header
+            try:
+                width = int(line.strip())
+                line_no, line = next(lines)
+                height = int(line.strip())
+                line_no, line = next(lines)
+            except (ValueError, StopIteration):
+                # Not a valid sprite header, skip line
+                continue
 
             # Read name (in quotes)
-            name_line = lines[i].strip()
+            name_line = line.strip()
             name_match = re.match(r'"([^"]+)"', name_line)
             if not name_match:
-                print(f"Warning: Expected sprite name at line {i+1}, got: {name_line}")
-                i += 1
+                print(f"Warning: Expected sprite name at line {line_no}, got: {name_line}")
                 continue
             name = name_match.group(1)
-            i += 1
 
-            # Read pixel data
-            pixels = []
-            for y in range(height):
-                if i >= len(lines):
+            # Read pixel data, padding with color 0 if the file ends early
+            buf = bytearray()
+            for _ in range(height):
+                row = next(lines, None)
+                if row is None:
                     break
-                row_line = lines[i].strip()
-                i += 1
-
-                # Parse space-separated color indices
-                row = []
-                for val in row_line.split():
-                    try:
-                        row.append(int(val))
-                    except ValueError:
-                        row.append(0)
-
-                # Pad row if needed
-                while len(row) < width:
-                    row.append(0)
-                row = row[:width]  # Trim if too long
-                pixels.append(row)
-
-            # Pad if not enough rows
-            while len(pixels) < height:
-                pixels.append([0] * width)
-
-            sprites.append((name, width, height, pixels))
-            print(f"Found sprite: '{name}' ({width}x{height})")
-
-        except ValueError as e:
-            # Not a valid sprite header, skip line
-            i += 1
-            continue
+                buf += parse_sht_row(row[1], width)
+            buf += bytes(width * height - len(buf))
 
-    print(f"\nExtracted {len(sprites)} sprites")
+            yield ShtSprite(name, width, height, bytes(buf))
 
-    # Save each sprite as PNG
-    for name, width, height, pixels in sprites:
-        img = Image.new('RGBA', (width, height))
-        img_pixels = img.load()
+def sprite_indices(sprite):
+    """View an ShtSprite's color indices as a (height, width) array."""
+    return np.frombuffer(sprite.indices, dtype=np.uint8).reshape(sprite.height, sprite.width)
 
-        for y in range(height):
-            for x in range(width):
-                color_idx = pixels[y][x] % 16
-                r, g, b = ZARGON_PALETTE[color_idx]
+def sprite_image(sprite, scale=1):
+    """Convert an ShtSprite into an RGBA image, optionally scaled."""
+    return rgba_image(scale_indices(sprite_indices(sprite), scale), SHT_RGBA)
 
-                # Color 0 (black) could be transparent background
-                # For most sprites, black (0) is background
-                alpha = 255 if color_idx != 0 else 0
+def safe_name(name):
+    """Drawable name of a sprite (lowercase, '-' and ' ' replaced by '_')."""
+    return name.lower().replace('-', '_').replace(' ', '_')
 
-                img_pixels[x, y] = (r, g, b, alpha)
+def sht_masks(sprites):
+    """SpriteMasks of ShtSprites under their drawable names (color 0 is transparent)."""
+    return [sprite_mask(safe_name(s.name), s.width, s.height, s.indices, 0) for s in sprites]
 
-        # Scale if requested
-        if scale > 1:
-            img = img.resize((width * scale, height * scale), Image.NEAREST)
+def sprite_digest(sprite, scale, indexed=False):
+    """Content hash of a sprite's color indices plus its decode parameters."""
+    return record_digest(sprite.indices, name=sprite.name, width=sprite.width,
+                         height=sprite.height, scale=scale,
+                         palette=ZARGON_PALETTE, transparency='index0',
+                         png='indexed' if indexed else 'rgba')
 
-        # Save
-        safe_name = name.lower().replace('-', '_').replace(' ', '_')
-        output_path = os.path.join(output_dir, f'{safe_name}.png')
-        img.save(output_path, 'PNG')
-        print(f"  Saved: {output_path}")
-
-    return sprites
+def extract_sht_sprites(sht_path, output_dir, scale=1, manifest=None, images=None,
+                        indexed=False, densities=None, profiler=None, writers=1):
+    """
+    Extract all sprites from a .sht file.
 
-def create_sprite_sheet(sprites, output_path, tiles_per_row=8, scale=1):
-    """Create a sprite sheet from extracted sprites."""
-    if not sprites:
-        return
+    Args:
+        sht_path: Path to .sht file
+        output_dir: Directory to save extracted PNGs
+        scale: Scale factor for output images
+        manifest: Optional AssetManifest; sprites whose color indices and
+            parameters are unchanged since the last run are not rewritten
+        images: Optional dict filled with name -> rendered image, so the
+            sprite sheet can reuse them instead of rendering again
+        indexed: Save 4-bit palette PNGs (color 0 marked transparent in
+            tRNS) instead of 32-bit RGBA; images is not filled in this mode
+        densities: Optional density names (see indexed_png.DENSITY_SCALES);
+            each sprite is written to output_dir/drawable-<density>/ at
+            every density scale and images is not filled
+        profiler: Optional StageProfiler timing the parse, digest, decode,
+            scale, encode and write stages per sprite
+        writers: Threads compressing and writing PNGs while the next sprite
+            is parsed (1 = write each sprite before parsing the next)
+
+    Returns:
+        List of ShtSprite records
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    profiler = profiler or NULL_PROFILER
+    profiler.read(os.path.getsize(sht_path))
 
-    # Process sprites into images
-    images = []
-    max_width = 0
-    max_height = 0
+    sprites = []
+    with PngWriter(writers, profiler=profiler) as writer:
+        for sprite in profiler.iterate('parse', iter_sht_sprites(sht_path)):
+            sprites.append(sprite)
+            print(f"Found sprite: '{sprite.name}' ({sprite.width}x{sprite.height})")
+
+            filename = f'{safe_name(sprite.name)}.png'
+            if densities:
+                outputs = density_outputs(filename, densities, scale)
+            else:
+                outputs = [(scale, filename)]
+
+            digests = {}
+            if manifest is not None:
+                with profiler.stage('digest', sprite.name):
+                    for out_scale, rel_path in outputs:
+                        digests[rel_path] = sprite_digest(sprite, out_scale, indexed)
+                outputs = [(out_scale, rel_path) for out_scale, rel_path in outputs
+                           if not manifest.is_fresh(rel_path, digests[rel_path])]
+                if not outputs:
+                    continue
+
+            # Save
+            with profiler.stage('decode', sprite.name):
+                indices = sprite_indices(sprite)
+            saved = save_variants(indices,
+                                  [(out_scale, os.path.join(output_dir, rel_path))
+                                   for out_scale, rel_path in outputs],
+                                  SHT_RGBA, ZARGON_PALETTE if indexed else None, transparent=0,
+                                  profiler=profiler, record=sprite.name, writer=writer)
+            if images is not None and not (indexed or densities):
+                images[sprite.name] = saved[0]
+            for _, rel_path in outputs:
+                print(f"  Saved: {os.path.join(output_dir, rel_path)}")
+                if manifest is not None:
+                    manifest.update(rel_path, digests[rel_path])
 
-    for name, width, height, pixels in sprites:
-        img = Image.new('RGBA', (width, height))
-        img_pixels = img.load()
+    print(f"\nExtracted {len(sprites)} sprites")
+    return sprites
 
-        for y in range(height):
-            for x in range(width):
-                color_idx = pixels[y][x] % 16
-                r, g, b = ZARGON_PALETTE[color_idx]
-                alpha = 255 if color_idx != 0 else 0
-                img_pixels[x, y] = (r, g, b, alpha)
+def create_sprite_sheet(sprites, output_path, tiles_per_row=8, scale=1, manifest=None, images=None):
+    """
+    Create a sprite sheet from extracted sprites.
 
-        if scale > 1:
-            img = img.resize((width * scale, height * scale), Image.NEAREST)
+    Args:
+        sprites: List of ShtSprite records
+        output_path: Path for output sprite sheet
+        tiles_per_row: Number of sprites per row in the sheet
+        scale: Scale factor
+        manifest: Optional AssetManifest for the sheet's directory
+        images: Optional name -> image dict from extract_sht_sprites;
+            sprites missing from it are rendered here
+    """
+    if not sprites:
+        return
 
-        images.append((name, img))
-        max_width = max(max_width, img.width)
-        max_height = max(max_height, img.height)
+    if manifest is not None:
+        filename = os.path.basename(output_path)
+        digest = record_digest('\n'.join(sprite_digest(s, scale) for s in sprites),
+                               tiles_per_row=tiles_per_row)
+        if manifest.is_fresh(filename, digest):
+            return
+
+    images = images or {}
+    sheet_images = []
+    for sprite in sprites:
+        img = images.get(sprite.name)
+        if img is None:
+            img = sprite_image(sprite, scale)
+        sheet_images.append((sprite.name, img))
+    max_width = max(img.width for _, img in sheet_images)
+    max_height = max(img.height for _, img in sheet_images)
 
     # Create sheet
-    num_rows = (len(images) + tiles_per_row - 1) // tiles_per_row
+    num_rows = (len(sheet_images) + tiles_per_row - 1) // tiles_per_row
     sheet_width = tiles_per_row * (max_width + 2) + 2
     sheet_height = num_rows * (max_height + 2) + 2
 
     sheet = Image.new('RGBA', (sheet_width, sheet_height), (64, 64, 64, 255))
 
-    for i, (name, img) in enumerate(images):
+    for i, (name, img) in enumerate(sheet_images):
         row = i // tiles_per_row
         col = i % tiles_per_row
         x = col * (max_width + 2) + 2
@@ -186,6 +235,21 @@ def create_sprite_sheet(sprites, output_path, tiles_per_row=8, scale=1):
 
     sheet.save(output_path, 'PNG')
     print(f"Created sprite sheet: {output_path} ({sheet_width}x{sheet_height})")
+    if manifest is not None:
+        manifest.update(filename, digest)
+
+def parse_stats(sht_path):
+    """Parse a .sht file once and report parse time and peak Python memory."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    count = sum(1 for _ in iter_sht_sprites(sht_path))
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    size = os.path.getsize(sht_path)
+    print(f"Parsed {count} sprites from {sht_path} ({size} bytes) in "
+          f"{elapsed * 1000:.1f} ms, peak memory {peak / 1024:.1f} KB")
 
 def main():
     import argparse
@@ -196,14 +260,57 @@ def main():
     parser.add_argument('-s', '--scale', type=int, default=1, help='Scale factor (default: 1)')
     parser.add_argument('--sheet', action='store_true', help='Also create a sprite sheet')
     parser.add_argument('--opaque', action='store_true', help='Keep black pixels opaque (no transparency)')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Only rebuild sprites whose color indices or parameters changed')
+    parser.add_argument('--stats', action='store_true', help='Report parse time and peak memory')
+    parser.add_argument('--indexed', action='store_true',
+                        help='Save 4-bit palette-indexed PNGs instead of RGBA')
+    parser.add_argument('--densities', metavar='LIST',
+                        help='Write drawable-<density>/ folders under the output directory, '
+                             'e.g. "mdpi,xhdpi" or "all"')
+    parser.add_argument('--writers', type=int, default=4,
+                        help='Threads compressing and writing PNGs (default: 4, 1 = synchronous)')
+    parser.add_argument('--masks', action='store_true',
+                        help=f'Also write bounding boxes, collision masks and row spans to {MASK_FILE}')
+    add_profile_arguments(parser)
 
     args = parser.parse_args()
+    try:
+        densities = parse_densities(args.densities) if args.densities else None
+    except ValueError as e:
+        parser.error(str(e))
+    if args.writers < 1:
+        parser.error('--writers must be at least 1')
+
+    manifest = AssetManifest(args.output, 'sprites') if args.incremental else None
+
+    if args.stats:
+        parse_stats(args.sht_file)
+        print()
+
+    profiler = profiler_from_args('sprites', args)
 
-    sprites = extract_sht_sprites(args.sht_file, args.output, args.scale)
+    images = {}
+    sprites = extract_sht_sprites(args.sht_file, args.output, args.scale,
+                                  manifest=manifest, images=images, indexed=args.indexed,
+                                  densities=densities, profiler=profiler, writers=args.writers)
 
     if args.sheet and sprites:
         sheet_path = os.path.join(args.output, 'sprite_sheet.png')
-        create_sprite_sheet(sprites, sheet_path, scale=args.scale)
+        with profiler.stage('sheet', output=sheet_path):
+            create_sprite_sheet(sprites, sheet_path, scale=args.scale,
+                                manifest=manifest, images=images)
+
+    if args.masks and sprites:
+        mask_path = os.path.join(args.output, MASK_FILE)
+        with profiler.stage('masks', output=mask_path):
+            size = write_mask_index(sht_masks(sprites), mask_path)
+        print(f"Saved masks of {len(sprites)} sprites: {mask_path} ({size} bytes)")
+
+    if manifest is not None:
+        manifest.save()
+        print(manifest.summary())
+    finish_profile(profiler, args)
 
 if __name__ == '__main__':
     main()
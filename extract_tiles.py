@@ -23,58 +23,63 @@ Data format notes:
 - Each plane's row is padded to integer (2-byte) boundary
 """
 
+import mmap
 import struct
 import os
+from contextlib import nullcontext
+import numpy as np
 from PIL import Image
 
-# EGA palette from ZARGON.BAS displayTile/pall subroutine:
-# PALETTE 0, 0: PALETTE 1, 4: PALETTE 2, 48: PALETTE 3, 2
-# PALETTE 4, 6: PALETTE 5, 54: PALETTE 6, 10: PALETTE 7, 38
-# PALETTE 8, 46: PALETTE 9, 5: PALETTE 10, 25: PALETTE 11, 7
-# PALETTE 12, 57: PALETTE 13, 63: PALETTE 14, 9: PALETTE 15, 59
+from asset_manifest import AssetManifest, record_digest
+from ega_palette import TILE_RGBA, ZARGON_PALETTE, print_palette, rgba_image
+from indexed_png import PngWriter, density_outputs, parse_densities, save_variants, scale_indices
+from stage_profile import NULL_PROFILER, add_profile_arguments, finish_profile, profiler_from_args
 
-def ega_palette_to_rgb(value):
+def decode_ega_indices(data, width, height):
     """
-    Convert EGA 6-bit palette value to RGB.
-
-    EGA bit order is rgbRGB (from ModdingWiki):
-    - bit 5 = r (red low intensity 1/3)
-    - bit 4 = g (green low intensity 1/3)
-    - bit 3 = b (blue low intensity 1/3)
-    - bit 2 = R (red high intensity 2/3)
-    - bit 1 = G (green high intensity 2/3)
-    - bit 0 = B (blue high intensity 2/3)
-
-    Formula from https://moddingwiki.shikadi.net/wiki/EGA_Palette:
-    red = 85 * (((ega >> 1) & 2) | (ega >> 5) & 1)
-    green = 85 * ((ega & 2) | (ega >> 4) & 1)
-    blue = 85 * (((ega << 1) & 2) | (ega >> 3) & 1)
+    Decode QBASIC GET/PUT EGA format image data into palette indices.
+
+    QBASIC SCREEN 9 uses 4 bit planes (EGA mode).
+    The data is stored as 16-bit integers with:
+    - First 2 integers (4 bytes): width and height (redundant, skip them)
+    - For each row: all 4 bit planes stored sequentially
+    - Each plane's row data is padded to 16-bit integer boundary
+
+    The planes are unpacked in bulk with numpy instead of bit by bit.
+    Missing trailing data decodes as color 0, and a dangling odd byte
+    is ignored, matching QBASIC's integer-array view of the record.
+
+    Args:
+        data: Raw byte data from WAD file
+        width: Width in pixels
+        height: Height in pixels
+
+    Returns:
+        numpy uint8 array of shape (height, width) with values 0-15
     """
-    r = 85 * (((value >> 1) & 2) | ((value >> 5) & 1))
-    g = 85 * ((value & 2) | ((value >> 4) & 1))
-    b = 85 * (((value << 1) & 2) | ((value >> 3) & 1))
-    return (r, g, b)
+    bytes_per_row = (width + 7) // 8
+    plane_stride = (bytes_per_row + 1) // 2 * 2
+    row_stride = plane_stride * 4
 
-# Build palette from ZARGON.BAS values
-ZARGON_PALETTE_VALUES = [0, 4, 48, 2, 6, 54, 10, 38, 46, 5, 25, 7, 57, 63, 9, 59]
-ZARGON_PALETTE = [ega_palette_to_rgb(v) for v in ZARGON_PALETTE_VALUES]
+    # Only whole 16-bit integers are visible to QBASIC; skip the 4-byte header
+    usable = len(data) // 2 * 2
+    raw = np.frombuffer(data, dtype=np.uint8, count=usable)[4:]
 
-# Let's verify and print the palette
-def print_palette():
-    """Print the palette colors for debugging."""
-    for i, (r, g, b) in enumerate(ZARGON_PALETTE):
-        print(f"Color {i:2d}: palette value {ZARGON_PALETTE_VALUES[i]:2d} -> RGB({r:3d}, {g:3d}, {b:3d})")
+    needed = height * row_stride
+    if raw.size < needed:
+        raw = np.concatenate([raw, np.zeros(needed - raw.size, dtype=np.uint8)])
+
+    planes = raw[:needed].reshape(height, 4, plane_stride)[:, :, :bytes_per_row]
+    bits = np.unpackbits(planes, axis=2)[:, :, :width]
+
+    # Plane n contributes bit n of the color index
+    weights = np.array([1, 2, 4, 8], dtype=np.uint8).reshape(1, 4, 1)
+    return (bits * weights).sum(axis=1, dtype=np.uint8)
 
 def decode_ega_image(data, width, height):
     """
     Decode QBASIC GET/PUT EGA format image data.
 
-    QBASIC SCREEN 9 uses 4 bit planes (EGA mode).
-    The data is stored as 16-bit integers with:
-    - First 2 integers (4 bytes): width and height (redundant, skip them)
-    - For each row: all 4 bit planes stored sequentially
-    - Each plane's row data is padded to 16-bit integer boundary
-
     Args:
         data: Raw byte data from WAD file
         width: Width in pixels
@@ -83,172 +88,239 @@ def decode_ega_image(data, width, height):
     Returns:
         PIL Image
     """
-    # Parse data as 16-bit little-endian integers (QBASIC's internal format)
-    int_array = []
-    for i in range(0, len(data) - 1, 2):
-        low = data[i]
-        high = data[i + 1]
-        int_array.append(low | (high << 8))
+    indices = decode_ega_indices(data, width, height)
+    return rgba_image(indices, TILE_RGBA)
 
-    bytes_per_row = (width + 7) // 8
+class WadArchive:
+    """
+    Read-only, memory-mapped view of a tiles.wad file.
+
+    The record directory is parsed once into a name -> (offset, width,
+    height, length) index. Pixel data is exposed as zero-copy memoryview
+    slices of the mapping and decoded on first use, so callers that walk
+    the archive more than once (per-tile export and the tile sheet) share
+    a single decode.
+
+    Usage:
+        with WadArchive('zargon/tiles.wad') as wad:
+            for name in wad.names:
+                img = wad.image(name)
+    """
 
-    # Create image
-    img = Image.new('RGBA', (width, height))
-    pixels = img.load()
-
-    # Skip header (first 2 integers are width and height embedded in data)
-    data_idx = 2
-
-    # Decode each scan line
-    for y in range(height):
-        # Read 4 bit planes for this row
-        plane_data = [bytearray(bytes_per_row) for _ in range(4)]
-
-        for plane in range(4):
-            # Read bytes for this plane's scan line from integer array
-            for byte_idx in range(bytes_per_row):
-                if data_idx < len(int_array):
-                    if byte_idx % 2 == 0:
-                        # Low byte of current integer
-                        plane_data[plane][byte_idx] = int_array[data_idx] & 0xFF
-                    else:
-                        # High byte of current integer
-                        plane_data[plane][byte_idx] = (int_array[data_idx] >> 8) & 0xFF
-                        data_idx += 1
-
-            # If odd number of bytes per row, advance to next integer
-            if bytes_per_row % 2 == 1:
-                data_idx += 1
-
-        # Convert planar data to pixels for this row
-        for x in range(width):
-            byte_idx = x // 8
-            bit_idx = 7 - (x % 8)
-
-            # Combine bits from all 4 planes to get color index
-            color_index = 0
-            for plane in range(4):
-                if byte_idx < len(plane_data[plane]):
-                    bit = (plane_data[plane][byte_idx] >> bit_idx) & 1
-                    color_index |= (bit << plane)
-
-            # Look up color in palette
-            r, g, b = ZARGON_PALETTE[color_index % 16]
-            pixels[x, y] = (r, g, b, 255)
-
-    return img
-
-def extract_tiles(wad_path, output_dir, scale=1):
+    DIRECTORY_ENTRY = struct.Struct('<15sI')
+    RECORD_HEADER = struct.Struct('<HHH')
+
+    def __init__(self, wad_path):
+        self.path = wad_path
+        self._file = open(wad_path, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files cannot be mapped
+            self._file.close()
+            raise ValueError(f"{wad_path}: empty WAD file")
+        self._indices = {}
+        self._images = {}
+
+        num_records = struct.unpack_from('<I', self._map, 0)[0]
+        dir_end = 4 + num_records * self.DIRECTORY_ENTRY.size
+        if dir_end > len(self._map):
+            self.close()
+            raise ValueError(f"{wad_path}: directory of {num_records} records is truncated")
+
+        self.names = []
+        self.index = {}
+        for name_bytes, file_loc in self.DIRECTORY_ENTRY.iter_unpack(self._map[4:dir_end]):
+            name = name_bytes.decode('ascii', errors='ignore').strip()
+            width, height, length = self.RECORD_HEADER.unpack_from(self._map, file_loc)
+            self.names.append(name)
+            self.index[name] = (file_loc, width, height, length)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return len(self.names)
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def close(self):
+        """Release decoded tiles and unmap the file."""
+        self._indices.clear()
+        self._images.clear()
+        if not self._map.closed:
+            self._map.close()
+        self._file.close()
+
+    def data(self, name):
+        """Return the raw GET/PUT bytes of a record as a zero-copy memoryview."""
+        file_loc, _, _, length = self.index[name]
+        start = file_loc + self.RECORD_HEADER.size
+        return memoryview(self._map)[start:start + length]
+
+    def indices(self, name):
+        """Return the decoded (height, width) palette index array, memoized."""
+        indices = self._indices.get(name)
+        if indices is None:
+            _, width, height, _ = self.index[name]
+            with self.data(name) as buf:
+                indices = decode_ega_indices(buf, width, height)
+            indices.setflags(write=False)
+            self._indices[name] = indices
+        return indices
+
+    def image(self, name, scale=1):
+        """Return the tile as an RGBA image at the given scale, memoized."""
+        key = (name, scale)
+        img = self._images.get(key)
+        if img is None:
+            # Scale the index array before palette expansion
+            img = rgba_image(scale_indices(self.indices(name), scale), TILE_RGBA)
+            self._images[key] = img
+        return img
+
+def open_wad(wad):
+    """Return (archive, owned) for a WadArchive or a path to tiles.wad."""
+    if isinstance(wad, WadArchive):
+        return wad, False
+    return WadArchive(wad), True
+
+def tile_digest(wad, name, scale, indexed=False):
+    """Content hash of a WAD record plus the parameters used to decode it."""
+    _, width, height, _ = wad.index[name]
+    with wad.data(name) as buf:
+        return record_digest(buf, width=width, height=height, scale=scale,
+                             palette=ZARGON_PALETTE, transparency='opaque',
+                             png='indexed' if indexed else 'rgba')
+
+def extract_tiles(wad_path, output_dir, scale=1, manifest=None, indexed=False, densities=None,
+                  profiler=None, writers=1):
     """
     Extract all tiles from a WAD file.
 
     Args:
-        wad_path: Path to tiles.wad
+        wad_path: Path to tiles.wad, or an open WadArchive
         output_dir: Directory to save extracted PNGs
         scale: Scale factor for output images (default 1)
+        manifest: Optional AssetManifest; tiles whose source record and
+            parameters are unchanged since the last run are skipped
+        indexed: Save 4-bit palette PNGs instead of 32-bit RGBA
+        densities: Optional density names (see indexed_png.DENSITY_SCALES);
+            each tile is decoded once and written to
+            output_dir/drawable-<density>/ at every density scale
+        profiler: Optional StageProfiler timing the parse, digest, decode,
+            scale, encode and write stages per tile
+        writers: Threads compressing and writing PNGs while the next tile
+            is decoded (1 = write each tile before decoding the next)
     """
     os.makedirs(output_dir, exist_ok=True)
+    profiler = profiler or NULL_PROFILER
 
-    with open(wad_path, 'rb') as f:
-        # Read number of records
-        num_records = struct.unpack('<I', f.read(4))[0]
-        print(f"Number of tile records: {num_records}")
+    # An archive passed in was opened, and its parse timed, by the caller
+    with nullcontext() if isinstance(wad_path, WadArchive) else profiler.stage('parse'):
+        wad, owned = open_wad(wad_path)
+    profiler.read(os.path.getsize(wad.path))
+    try:
+        print(f"Number of tile records: {len(wad)}")
 
-        # Read all record headers
         tiles = []
-        for i in range(num_records):
-            name_bytes = f.read(15)
-            name = name_bytes.decode('ascii', errors='ignore').strip()
-            file_loc = struct.unpack('<I', f.read(4))[0]
+        for i, name in enumerate(wad.names):
+            file_loc = wad.index[name][0]
             tiles.append((name, file_loc))
             print(f"  Tile {i}: '{name}' at offset {file_loc}")
 
-        # Extract each tile
-        for name, file_loc in tiles:
-            f.seek(file_loc)
-
-            # Read image header
-            img_width = struct.unpack('<H', f.read(2))[0]
-            img_height = struct.unpack('<H', f.read(2))[0]
-            data_length = struct.unpack('<H', f.read(2))[0]
-
-            print(f"\nExtracting '{name}': {img_width}x{img_height}, {data_length} bytes")
-
-            # Read pixel data
-            pixel_data = f.read(data_length)
-
-            # Decode the image
-            img = decode_ega_image(pixel_data, img_width, img_height)
-
-            # Scale if requested
-            if scale > 1:
-                img = img.resize((img.width * scale, img.height * scale), Image.NEAREST)
-
-            # Save as PNG
-            safe_name = name.lower().replace('-', '_').replace(' ', '_')
-            output_path = os.path.join(output_dir, f'{safe_name}.png')
-            img.save(output_path, 'PNG')
-            print(f"  Saved: {output_path}")
+        with PngWriter(writers, profiler=profiler) as writer:
+            # Extract each tile
+            for name in wad.names:
+                safe_name = name.lower().replace('-', '_').replace(' ', '_')
+                filename = f'{safe_name}.png'
+                if densities:
+                    outputs = density_outputs(filename, densities, scale)
+                else:
+                    outputs = [(scale, filename)]
+
+                digests = {}
+                if manifest is not None:
+                    with profiler.stage('digest', name):
+                        for out_scale, rel_path in outputs:
+                            digests[rel_path] = tile_digest(wad, name, out_scale, indexed)
+                    outputs = [(out_scale, rel_path) for out_scale, rel_path in outputs
+                               if not manifest.is_fresh(rel_path, digests[rel_path])]
+                    if not outputs:
+                        continue
+
+                _, img_width, img_height, data_length = wad.index[name]
+                print(f"\nExtracting '{name}': {img_width}x{img_height}, {data_length} bytes")
+
+                # Decode once, save as PNG at every requested scale
+                with profiler.stage('decode', name):
+                    indices = wad.indices(name)
+                save_variants(indices,
+                              [(out_scale, os.path.join(output_dir, rel_path))
+                               for out_scale, rel_path in outputs],
+                              TILE_RGBA, ZARGON_PALETTE if indexed else None,
+                              profiler=profiler, record=name, writer=writer)
+                for _, rel_path in outputs:
+                    print(f"  Saved: {os.path.join(output_dir, rel_path)}")
+                    if manifest is not None:
+                        manifest.update(rel_path, digests[rel_path])
+    finally:
+        if owned:
+            wad.close()
 
     print(f"\nExtracted {len(tiles)} tiles to {output_dir}")
     return tiles
 
-def create_tile_sheet(wad_path, output_path, tiles_per_row=8, scale=1):
+def create_tile_sheet(wad_path, output_path, tiles_per_row=8, scale=1, manifest=None):
     """
     Create a sprite sheet containing all tiles.
 
     Args:
-        wad_path: Path to tiles.wad
+        wad_path: Path to tiles.wad, or an open WadArchive
         output_path: Path for output sprite sheet
         tiles_per_row: Number of tiles per row in the sheet
         scale: Scale factor
+        manifest: Optional AssetManifest for the sheet's directory; the
+            sheet is skipped when no tile or layout parameter changed
     """
-    with open(wad_path, 'rb') as f:
-        num_records = struct.unpack('<I', f.read(4))[0]
-
-        # Read headers
-        tiles = []
-        for _ in range(num_records):
-            name = f.read(15).decode('ascii', errors='ignore').strip()
-            file_loc = struct.unpack('<I', f.read(4))[0]
-            tiles.append((name, file_loc))
-
-        # Extract all tile images
-        images = []
-        max_width = 0
-        max_height = 0
-
-        for name, file_loc in tiles:
-            f.seek(file_loc)
-            img_width = struct.unpack('<H', f.read(2))[0]
-            img_height = struct.unpack('<H', f.read(2))[0]
-            data_length = struct.unpack('<H', f.read(2))[0]
-            pixel_data = f.read(data_length)
-
-            img = decode_ega_image(pixel_data, img_width, img_height)
-            if scale > 1:
-                img = img.resize((img.width * scale, img.height * scale), Image.NEAREST)
-
-            images.append((name, img))
-            max_width = max(max_width, img.width)
-            max_height = max(max_height, img.height)
-
-        # Create sprite sheet
-        num_rows = (len(images) + tiles_per_row - 1) // tiles_per_row
-        sheet_width = tiles_per_row * (max_width + 2) + 2
-        sheet_height = num_rows * (max_height + 2) + 2
-
-        sheet = Image.new('RGBA', (sheet_width, sheet_height), (64, 64, 64, 255))
-
-        for i, (name, img) in enumerate(images):
-            row = i // tiles_per_row
-            col = i % tiles_per_row
-            x = col * (max_width + 2) + 2
-            y = row * (max_height + 2) + 2
-            sheet.paste(img, (x, y))
-
-        sheet.save(output_path, 'PNG')
-        print(f"Created tile sheet: {output_path} ({sheet_width}x{sheet_height})")
+    wad, owned = open_wad(wad_path)
+    try:
+        if manifest is not None:
+            filename = os.path.basename(output_path)
+            parts = [tile_digest(wad, name, scale) for name in wad.names]
+            digest = record_digest('\n'.join(wad.names + parts), tiles_per_row=tiles_per_row)
+            if manifest.is_fresh(filename, digest):
+                return
+        images = [(name, wad.image(name, scale)) for name in wad.names]
+    finally:
+        if owned:
+            wad.close()
+
+    max_width = max((img.width for _, img in images), default=0)
+    max_height = max((img.height for _, img in images), default=0)
+
+    # Create sprite sheet
+    num_rows = (len(images) + tiles_per_row - 1) // tiles_per_row
+    sheet_width = tiles_per_row * (max_width + 2) + 2
+    sheet_height = num_rows * (max_height + 2) + 2
+
+    sheet = Image.new('RGBA', (sheet_width, sheet_height), (64, 64, 64, 255))
+
+    for i, (name, img) in enumerate(images):
+        row = i // tiles_per_row
+        col = i % tiles_per_row
+        x = col * (max_width + 2) + 2
+        y = row * (max_height + 2) + 2
+        sheet.paste(img, (x, y))
+
+    sheet.save(output_path, 'PNG')
+    print(f"Created tile sheet: {output_path} ({sheet_width}x{sheet_height})")
+    if manifest is not None:
+        manifest.update(filename, digest)
 
 def main():
     import argparse
@@ -259,19 +331,49 @@ def main():
     parser.add_argument('-s', '--scale', type=int, default=1, help='Scale factor (default: 1)')
     parser.add_argument('--sheet', action='store_true', help='Also create a tile sheet')
     parser.add_argument('--palette', action='store_true', help='Print palette colors')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Only rebuild tiles whose source record or parameters changed')
+    parser.add_argument('--indexed', action='store_true',
+                        help='Save 4-bit palette-indexed PNGs instead of RGBA')
+    parser.add_argument('--densities', metavar='LIST',
+                        help='Write drawable-<density>/ folders under the output directory, '
+                             'e.g. "mdpi,xhdpi" or "all"')
+    parser.add_argument('--writers', type=int, default=4,
+                        help='Threads compressing and writing PNGs (default: 4, 1 = synchronous)')
+    add_profile_arguments(parser)
 
     args = parser.parse_args()
+    try:
+        densities = parse_densities(args.densities) if args.densities else None
+    except ValueError as e:
+        parser.error(str(e))
+    if args.writers < 1:
+        parser.error('--writers must be at least 1')
 
     if args.palette:
         print("Zargon color palette:")
         print_palette()
         print()
 
-    tiles = extract_tiles(args.wad_file, args.output, args.scale)
-
-    if args.sheet:
-        sheet_path = os.path.join(args.output, 'tile_sheet.png')
-        create_tile_sheet(args.wad_file, sheet_path, scale=args.scale)
+    manifest = AssetManifest(args.output, 'tiles') if args.incremental else None
+    profiler = profiler_from_args('tiles', args)
+
+    with profiler.stage('parse'):
+        wad = WadArchive(args.wad_file)
+    with wad:
+        tiles = extract_tiles(wad, args.output, args.scale, manifest=manifest,
+                              indexed=args.indexed, densities=densities, profiler=profiler,
+                              writers=args.writers)
+
+        if args.sheet:
+            sheet_path = os.path.join(args.output, 'tile_sheet.png')
+            with profiler.stage('sheet', output=sheet_path):
+                create_tile_sheet(wad, sheet_path, scale=args.scale, manifest=manifest)
+
+    if manifest is not None:
+        manifest.save()
+        print(manifest.summary())
+    finish_profile(profiler, args)
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+PNG output shared by the Zargon extractors.
+
+Every extracted pixel is one of the 16 ZARGON_PALETTE colors, so instead of
+32-bit RGBA the extractors can write palette-mode PNGs at 4 bits per pixel.
+Transparency is expressed with a tRNS chunk that marks a single palette
+index as fully transparent, and the zlib stream is written at maximum
+compression. Android decodes these into the same ARGB bitmaps.
+
+For Android density buckets a sprite is decoded once at native size and
+the index array is scaled for each drawable-<density> directory before
+palette expansion, which is cheaper than resizing RGBA images.
+"""
+
+import io
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+from ega_palette import rgba_image
+from stage_profile import NULL_PROFILER
+
+# Android density buckets, scale relative to the native (mdpi) sprite size
+DENSITY_SCALES = {
+    'mdpi': 1,
+    'hdpi': 1.5,
+    'xhdpi': 2,
+    'xxhdpi': 3,
+    'xxxhdpi': 4,
+}
+
+def parse_densities(spec):
+    """
+    Parse a comma-separated density list such as "mdpi,xhdpi" or "all".
+
+    Returns:
+        List of density names in DENSITY_SCALES order
+    """
+    if spec == 'all':
+        return list(DENSITY_SCALES)
+    names = [name.strip() for name in spec.split(',') if name.strip()]
+    unknown = [name for name in names if name not in DENSITY_SCALES]
+    if unknown:
+        raise ValueError(f"Unknown density {', '.join(unknown)} "
+                         f"(expected {', '.join(DENSITY_SCALES)} or all)")
+    return [name for name in DENSITY_SCALES if name in names]
+
+def density_outputs(filename, densities, scale=1):
+    """
+    Plan one output per density bucket for a drawable.
+
+    Args:
+        filename: Drawable file name, e.g. grass.png
+        densities: Density names from DENSITY_SCALES
+        scale: Base scale applied on top of each density scale
+
+    Returns:
+        List of (scale, relative_path) such as (2, 'drawable-xhdpi/grass.png')
+    """
+    return [(DENSITY_SCALES[d] * scale, os.path.join(f'drawable-{d}', filename))
+            for d in densities]
+
+def scale_indices(indices, scale):
+    """
+    Nearest-neighbour upscale of a 2D index array.
+
+    Whole scales repeat rows and columns; fractional scales (hdpi is 1.5)
+    pick the source pixel under each output pixel.
+    """
+    if scale == 1:
+        return indices
+    if scale == int(scale):
+        scale = int(scale)
+        return indices.repeat(scale, axis=0).repeat(scale, axis=1)
+    height, width = indices.shape
+    # Round half up so odd sizes grow consistently (15 -> 23 at 1.5x)
+    rows = (np.arange(int(height * scale + 0.5)) / scale).astype(np.intp)
+    cols = (np.arange(int(width * scale + 0.5)) / scale).astype(np.intp)
+    return indices[rows[:, None], cols]
+
+def indexed_image(indices, palette):
+    """
+    Build a palette-mode image from an index array.
+
+    Args:
+        indices: 2D uint8 array of palette indices
+        palette: List of (r, g, b) tuples, at most 16 for 4-bit output
+
+    Returns:
+        PIL Image in mode 'P'
+    """
+    img = Image.fromarray(np.ascontiguousarray(indices, dtype=np.uint8), 'P')
+    img.putpalette([c for rgb in palette for c in rgb])
+    return img
+
+def png_options(palette, transparent=None):
+    """PIL save options for a palette-mode PNG with an optional tRNS entry."""
+    options = {'optimize': True, 'bits': 4 if len(palette) <= 16 else 8}
+    if transparent is not None:
+        options['transparency'] = transparent
+    return options
+
+def save_indexed_png(indices, output_path, palette, transparent=None, scale=1):
+    """
+    Save an index array as a palette-mode PNG.
+
+    Args:
+        indices: 2D uint8 array of palette indices
+        output_path: Destination PNG path
+        palette: List of (r, g, b) tuples; 16 entries or fewer give 4 bits per pixel
+        transparent: Optional palette index written to tRNS as fully transparent
+        scale: Nearest-neighbour scale factor applied to the indices
+
+    Returns:
+        The saved PIL Image
+    """
+    img = indexed_image(scale_indices(indices, scale), palette)
+    img.save(output_path, 'PNG', **png_options(palette, transparent))
+    return img
+
+class PngWriteError(Exception):
+    """A PNG could not be encoded or written; names the record it came from."""
+
+    def __init__(self, record, output_path, error):
+        super().__init__(f"{record or output_path}: cannot write {output_path}: {error}")
+        self.record = record
+        self.output_path = output_path
+
+class PngWriter:
+    """
+    Bounded writer stage: PNG compression and file writes on a thread pool.
+
+    The caller decodes and builds images on the main thread and hands each
+    finished image to save(). PIL releases the GIL while zlib compresses, so
+    encoding and disk I/O overlap with decoding the next record. At most
+    max_pending images are queued or in flight; save() blocks beyond that,
+    which caps memory. The first failure is raised as PngWriteError from the
+    next save() or from close().
+
+    With workers=1 images are encoded and written synchronously.
+
+    Usage:
+        with PngWriter(workers=4) as writer:
+            writer.save(img, 'grass.png', record='Grass')
+    """
+
+    def __init__(self, workers=4, max_pending=None, profiler=None):
+        if workers < 1:
+            raise ValueError(f"PngWriter needs at least 1 worker, got {workers}")
+        self.profiler = profiler or NULL_PROFILER
+        self._pool = ThreadPoolExecutor(max_workers=workers) if workers > 1 else None
+        self._slots = threading.BoundedSemaphore(max_pending or 2 * workers)
+        self._errors = []
+
+    def save(self, img, output_path, record=None, **options):
+        """Queue one image to be saved as PNG with PIL save options."""
+        if self._pool is None:
+            self._write(img, output_path, record, options)
+            return
+        self._raise_error()
+        self._slots.acquire()
+        future = self._pool.submit(self._write, img, output_path, record, options)
+        future.add_done_callback(self._done)
+
+    def _done(self, future):
+        self._slots.release()
+        # Futures cancelled by __exit__ have no result to inspect
+        if not future.cancelled() and future.exception() is not None:
+            self._errors.append(future.exception())
+
+    def _write(self, img, output_path, record, options):
+        try:
+            # Encode into memory first so compression and disk time are separate
+            with self.profiler.stage('encode', record):
+                buf = io.BytesIO()
+                img.save(buf, 'PNG', **options)
+            with self.profiler.stage('write', record):
+                with open(output_path, 'wb') as f:
+                    f.write(buf.getbuffer())
+        except Exception as e:
+            raise PngWriteError(record, output_path, e) from e
+        self.profiler.wrote(buf.tell())
+
+    def _raise_error(self):
+        if self._errors:
+            raise self._errors[0]
+
+    def close(self):
+        """Wait for every queued image and raise the first failure, if any."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+        self._raise_error()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is None:
+            self.close()
+        elif self._pool is not None:
+            # Already failing; drop queued work rather than mask the error
+            self._pool.shutdown(wait=True, cancel_futures=True)
+
+def save_variants(indices, outputs, lut, palette=None, transparent=None, profiler=None,
+                  record=None, writer=None):
+    """
+    Save one decoded index array at several scales.
+
+    Args:
+        indices: 2D uint8 array of palette indices at native size
+        outputs: List of (scale, output_path); missing directories are created
+        lut: Packed RGBA lookup table from ega_palette, used for RGBA output
+        palette: If given, save palette-indexed PNGs with this palette instead
+        transparent: Palette index marked transparent in indexed output
+        profiler: Optional StageProfiler; scaling and building the image,
+            PNG encoding and writing are timed as the scale, encode and
+            write stages
+        record: Record name the stages and write errors are attributed to
+        writer: Optional PngWriter that encodes and writes in the
+            background; by default each PNG is written before returning
+
+    Returns:
+        List of the saved images, parallel to outputs
+    """
+    profiler = profiler or NULL_PROFILER
+    sync_writer = writer is None
+    if sync_writer:
+        writer = PngWriter(workers=1, profiler=profiler)
+
+    images = []
+    for scale, output_path in outputs:
+        os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+        with profiler.stage('scale', record):
+            scaled = scale_indices(indices, scale)
+            if palette is None:
+                img = rgba_image(scaled, lut)
+                options = {}
+            else:
+                img = indexed_image(scaled, palette)
+                options = png_options(palette, transparent)
+        writer.save(img, output_path, record, **options)
+        images.append(img)
+    return images
@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""
+Pack the tiles, sprites and monster sprites into one texture atlas.
+
+The uniform-grid sheets from create_tile_sheet, create_sprite_sheet and
+create_monster_sheet size every cell to the largest sprite, so the 80x4
+flame or the 57x50 ZARGON blow up the sheet. This packer places every
+sprite from tiles.wad, bomb.sht and the ZARGON.BAS DATA statements with
+the MaxRects bin-packing algorithm (best short side fit) into the
+smallest power-of-two atlas that fits, and writes a compact binary index
+the app can use to cut sprites out of the single atlas bitmap.
+
+The app's drawables are partly hand-edited, so the atlas the app ships is
+packed from res/drawable-nodpi itself (--drawables, and build_assets.py
+after every build): TileBitmapCache then gets the same pixels from the
+atlas as from the drawable it replaces.
+
+Atlas index format (little-endian):
+- 4 bytes: Magic "ZATL"
+- 2 bytes: Version (1)
+- 2 bytes: Atlas width
+- 2 bytes: Atlas height
+- 2 bytes: Number of entries
+- For each entry:
+  - 1 byte: Name length N
+  - N bytes: Name (ASCII, drawable-style lowercase name)
+  - 2 bytes each: x, y, width, height
+
+Usage:
+    python3 pack_atlas.py zargon -o extracted_atlas
+    python3 pack_atlas.py --drawables app/app/src/main/res/drawable-nodpi -o app/app/src/main/assets
+"""
+
+import os
+import struct
+
+from PIL import Image
+
+from extract_data_sprites import BasIndex
+from extract_data_sprites import sprite_image as monster_image
+from extract_sheets import iter_sht_sprites
+from extract_sheets import sprite_image as sht_image
+from extract_tiles import WadArchive
+
+ATLAS_MAGIC = b'ZATL'
+ATLAS_VERSION = 1
+ATLAS_HEADER = struct.Struct('<4sHHHH')
+ATLAS_RECT = struct.Struct('<HHHH')
+
+def drawable_name(name):
+    """Android drawable-style name used by every extractor for its PNGs."""
+    return name.lower().replace('-', '_').replace(' ', '_')
+
+def collect_images(source_dir, scale=1):
+    """
+    Decode every sprite from the three game sources.
+
+    Sources are read in the same order as build_assets.py, so when two
+    sources share a name (water) the later one wins.
+
+    Args:
+        source_dir: Directory with tiles.wad, bomb.sht and ZARGON.BAS
+        scale: Scale factor
+
+    Returns:
+        Dict of drawable name -> RGBA image, in source order
+    """
+    images = {}
+
+    def add(name, img):
+        images.pop(name, None)
+        images[name] = img
+
+    wad_path = os.path.join(source_dir, 'tiles.wad')
+    if os.path.exists(wad_path):
+        with WadArchive(wad_path) as wad:
+            for name in wad.names:
+                add(drawable_name(name), wad.image(name, scale))
+
+    sht_path = os.path.join(source_dir, 'bomb.sht')
+    if os.path.exists(sht_path):
+        for sprite in iter_sht_sprites(sht_path):
+            add(drawable_name(sprite.name), sht_image(sprite, scale))
+
+    bas_path = os.path.join(source_dir, 'ZARGON.BAS')
+    if os.path.exists(bas_path):
+        for sprite in BasIndex(bas_path).sprites():
+            add(drawable_name(sprite.name), monster_image(sprite, scale))
+
+    return images
+
+def collect_drawables(drawable_dir):
+    """
+    Load every PNG drawable in a directory except the *_sheet previews.
+
+    Returns:
+        Dict of drawable name -> RGBA image, sorted by name
+    """
+    images = {}
+    for filename in sorted(os.listdir(drawable_dir)):
+        name, ext = os.path.splitext(filename)
+        if ext.lower() == '.png' and not name.endswith('_sheet'):
+            with Image.open(os.path.join(drawable_dir, filename)) as img:
+                images[name] = img.convert('RGBA')
+    return images
+
+class MaxRectsPacker:
+    """
+    MaxRects bin packer using the best short side fit heuristic.
+
+    The bin keeps a list of maximal free rectangles. Each placement picks
+    the free rectangle that leaves the smallest leftover on its shorter
+    side, then splits every free rectangle the placement overlaps and
+    drops free rectangles contained in others.
+    """
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.free = [(0, 0, width, height)]
+
+    def insert(self, width, height):
+        """Place a width x height rectangle; return (x, y) or None if it does not fit."""
+        best = None
+        for fx, fy, fw, fh in self.free:
+            if width <= fw and height <= fh:
+                leftover_w = fw - width
+                leftover_h = fh - height
+                score = (min(leftover_w, leftover_h), max(leftover_w, leftover_h), fy, fx)
+                if best is None or score < best[0]:
+                    best = (score, fx, fy)
+        if best is None:
+            return None
+
+        _, x, y = best
+        self._split(x, y, width, height)
+        return x, y
+
+    def _split(self, x, y, width, height):
+        new_free = []
+        for fx, fy, fw, fh in self.free:
+            if x >= fx + fw or x + width <= fx or y >= fy + fh or y + height <= fy:
+                new_free.append((fx, fy, fw, fh))
+                continue
+            # Keep the parts of the free rectangle around the placed one
+            if x > fx:
+                new_free.append((fx, fy, x - fx, fh))
+            if x + width < fx + fw:
+                new_free.append((x + width, fy, fx + fw - x - width, fh))
+            if y > fy:
+                new_free.append((fx, fy, fw, y - fy))
+            if y + height < fy + fh:
+                new_free.append((fx, y + height, fw, fy + fh - y - height))
+
+        # Prune free rectangles contained in another one
+        self.free = [
+            a for i, a in enumerate(new_free)
+            if not any(j != i and a[0] >= b[0] and a[1] >= b[1]
+                       and a[0] + a[2] <= b[0] + b[2] and a[1] + a[3] <= b[1] + b[3]
+                       and (a != b or j < i)
+                       for j, b in enumerate(new_free))
+        ]
+
+def pack_rects(sizes, padding=1, max_size=4096):
+    """
+    Pack named rectangles into the smallest power-of-two atlas.
+
+    Args:
+        sizes: Dict of name -> (width, height)
+        padding: Empty pixels kept between neighbouring sprites
+        max_size: Largest allowed atlas side
+
+    Returns:
+        (atlas_width, atlas_height, {name: (x, y, width, height)})
+    """
+    # Largest side first; ties broken by area then name so packing is deterministic
+    order = sorted(sizes, key=lambda n: (-max(sizes[n]), -sizes[n][0] * sizes[n][1], n))
+    area = sum(w * h for w, h in sizes.values())
+    min_w = max((w for w, _ in sizes.values()), default=1)
+    min_h = max((h for _, h in sizes.values()), default=1)
+
+    powers = [1 << p for p in range(4, max_size.bit_length()) if 1 << p <= max_size]
+    candidates = sorted(((w, h) for w in powers for h in powers
+                         if w * h >= area and w >= min_w and h >= min_h),
+                        key=lambda wh: (wh[0] * wh[1], abs(wh[0] - wh[1]), -wh[0]))
+
+    for atlas_w, atlas_h in candidates:
+        # Padding only goes to the right/bottom, so let it hang past the edge
+        packer = MaxRectsPacker(atlas_w + padding, atlas_h + padding)
+        rects = {}
+        for name in order:
+            w, h = sizes[name]
+            pos = packer.insert(w + padding, h + padding)
+            if pos is None:
+                break
+            rects[name] = (pos[0], pos[1], w, h)
+        else:
+            return atlas_w, atlas_h, {name: rects[name] for name in sizes}
+
+    raise ValueError(f"{len(sizes)} sprites do not fit in a {max_size}x{max_size} atlas")
+
+def write_atlas_index(index_path, atlas_width, atlas_height, rects):
+    """Write the binary name -> rect index."""
+    with open(index_path, 'wb') as f:
+        f.write(ATLAS_HEADER.pack(ATLAS_MAGIC, ATLAS_VERSION, atlas_width, atlas_height, len(rects)))
+        for name, rect in rects.items():
+            name_bytes = name.encode('ascii')
+            f.write(struct.pack('<B', len(name_bytes)))
+            f.write(name_bytes)
+            f.write(ATLAS_RECT.pack(*rect))
+
+def read_atlas_index(index_path):
+    """
+    Read an atlas index written by write_atlas_index.
+
+    Returns:
+        (atlas_width, atlas_height, {name: (x, y, width, height)})
+    """
+    with open(index_path, 'rb') as f:
+        data = f.read()
+
+    magic, version, atlas_w, atlas_h, count = ATLAS_HEADER.unpack_from(data, 0)
+    if magic != ATLAS_MAGIC or version != ATLAS_VERSION:
+        raise ValueError(f"{index_path}: not a version {ATLAS_VERSION} atlas index")
+
+    rects = {}
+    pos = ATLAS_HEADER.size
+    for _ in range(count):
+        name_len = data[pos]
+        name = data[pos + 1:pos + 1 + name_len].decode('ascii')
+        pos += 1 + name_len
+        rects[name] = ATLAS_RECT.unpack_from(data, pos)
+        pos += ATLAS_RECT.size
+    return atlas_w, atlas_h, rects
+
+def grid_sheet_area(sizes, tiles_per_row=8):
+    """Area the uniform-grid sheet builders would use for the same sprites."""
+    max_w = max(w for w, _ in sizes.values())
+    max_h = max(h for _, h in sizes.values())
+    rows = (len(sizes) + tiles_per_row - 1) // tiles_per_row
+    return (tiles_per_row * (max_w + 2) + 2) * (rows * (max_h + 2) + 2)
+
+def build_atlas(images, atlas_path, index_path, padding=1):
+    """
+    Pack images into one atlas PNG plus its index and report efficiency.
+
+    Args:
+        images: Dict of name -> RGBA image
+        atlas_path: Output path for the atlas PNG
+        index_path: Output path for the binary index
+        padding: Empty pixels between sprites
+
+    Returns:
+        Packing efficiency (sprite pixels / atlas pixels)
+    """
+    sizes = {name: img.size for name, img in images.items()}
+    atlas_w, atlas_h, rects = pack_rects(sizes, padding)
+
+    atlas = Image.new('RGBA', (atlas_w, atlas_h), (0, 0, 0, 0))
+    for name, (x, y, _, _) in rects.items():
+        atlas.paste(images[name], (x, y))
+
+    atlas.save(atlas_path, 'PNG')
+    write_atlas_index(index_path, atlas_w, atlas_h, rects)
+
+    used = sum(w * h for w, h in sizes.values())
+    efficiency = used / (atlas_w * atlas_h)
+    grid = grid_sheet_area(sizes)
+    print(f"Packed {len(rects)} sprites into {atlas_path} ({atlas_w}x{atlas_h})")
+    print(f"  Index: {index_path} ({os.path.getsize(index_path)} bytes)")
+    print(f"  Efficiency: {efficiency:.1%} of {atlas_w * atlas_h} pixels "
+          f"(uniform grid would need {grid} pixels, {used / grid:.1%} efficient)")
+    return efficiency
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Pack all Zargon sprites into one texture atlas')
+    parser.add_argument('source_dir', nargs='?', default='zargon',
+                        help='Directory with tiles.wad, bomb.sht and ZARGON.BAS')
+    parser.add_argument('-o', '--output', default='extracted_atlas', help='Output directory')
+    parser.add_argument('-s', '--scale', type=int, default=1, help='Scale factor (default: 1)')
+    parser.add_argument('-p', '--padding', type=int, default=1,
+                        help='Empty pixels between sprites (default: 1)')
+    parser.add_argument('--extra', metavar='DIR',
+                        help='Directory of PNGs added to the atlas, replacing same-named sprites '
+                             '(e.g. hand-edited drawables)')
+    parser.add_argument('--drawables', metavar='DIR',
+                        help='Pack only the PNG drawables in DIR instead of the game sources '
+                             '(the atlas the app ships)')
+
+    args = parser.parse_args()
+
+    os.makedirs(args.output, exist_ok=True)
+    if args.drawables:
+        images = collect_drawables(args.drawables)
+    else:
+        images = collect_images(args.source_dir, args.scale)
+
+    if args.extra:
+        for name, img in collect_drawables(args.extra).items():
+            images.pop(name, None)
+            images[name] = img
+
+    build_atlas(images, os.path.join(args.output, 'atlas.png'),
+                os.path.join(args.output, 'atlas.idx'), args.padding)
+
+if __name__ == '__main__':
+    main()
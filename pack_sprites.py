@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""
+Pack bomb.sht sprites into a binary sprite bundle.
+
+bomb.sht stores every pixel as space-separated decimal text, so loading
+any sprite means tokenizing the whole file. The bundle keeps the same
+sprites as 4-bit color indices behind a fixed-size name index, so a
+reader maps the file, looks a name up and decodes only that sprite.
+
+Each sprite is stored in whichever encoding is smaller:
+- 4bpp: each row packed two pixels per byte, high nibble first, rows
+  padded to a whole byte
+- RLE: rows as runs, one byte per run: (run length - 1) << 4 | color,
+  runs at most 16 pixels long and never crossing a row end
+
+Bundle format (little-endian):
+- 4 bytes: Magic "ZSPB"
+- 2 bytes: Version (1)
+- 2 bytes: Sprite count
+- Per sprite, in bomb.sht order:
+  - 16 bytes: Name (ASCII, NUL padded)
+  - 2 bytes each: Width, height
+  - 1 byte: Encoding (0 = 4bpp, 1 = RLE)
+  - 4 bytes each: Data offset from the start of the file, data length
+- Pixel data of every sprite
+
+The converter checks that every sprite decodes back to exactly the color
+indices extract_sheets.py parses from the text, and reports the size and
+load time of both formats.
+
+Usage:
+    python3 pack_sprites.py zargon/bomb.sht -o bomb.spb
+"""
+
+import mmap
+import os
+import struct
+import time
+
+import numpy as np
+
+from extract_sheets import ShtSprite, iter_sht_sprites, sprite_indices
+
+BUNDLE_MAGIC = b'ZSPB'
+BUNDLE_VERSION = 1
+BUNDLE_HEADER = struct.Struct('<4sHH')
+INDEX_ENTRY = struct.Struct('<16sHHBII')
+NAME_LENGTH = 16
+
+ENCODING_4BPP = 0
+ENCODING_RLE = 1
+ENCODING_NAMES = {ENCODING_4BPP: '4bpp', ENCODING_RLE: 'rle'}
+
+MAX_RUN = 16
+
+def pack_4bpp(indices):
+    """Pack a (height, width) index array two pixels per byte, rows padded to a byte."""
+    height, width = indices.shape
+    padded = np.zeros((height, width + width % 2), dtype=np.uint8)
+    padded[:, :width] = indices
+    return ((padded[:, 0::2] << 4) | padded[:, 1::2]).tobytes()
+
+def unpack_4bpp(data, width, height):
+    """Inverse of pack_4bpp."""
+    packed = np.frombuffer(data, dtype=np.uint8).reshape(height, (width + 1) // 2)
+    indices = np.empty((height, packed.shape[1] * 2), dtype=np.uint8)
+    indices[:, 0::2] = packed >> 4
+    indices[:, 1::2] = packed & 0x0F
+    return indices[:, :width]
+
+def pack_rle(indices):
+    """
+    Run-length encode a (height, width) index array, one byte per run.
+
+    A run starts at every row start, every color change and every
+    MAX_RUN pixels into a longer run.
+    """
+    height, width = indices.shape
+    flat = indices.ravel()
+    starts = np.ones(flat.size, dtype=bool)
+    starts[1:] = flat[1:] != flat[:-1]
+    starts[::width] = True
+    # Split runs longer than MAX_RUN: offset of each pixel in its run
+    positions = np.arange(flat.size)
+    run_start = np.maximum.accumulate(np.where(starts, positions, 0))
+    starts |= (positions - run_start) % MAX_RUN == 0
+
+    first = np.flatnonzero(starts)
+    lengths = np.diff(np.append(first, flat.size))
+    return (((lengths - 1) << 4) | flat[first]).astype(np.uint8).tobytes()
+
+def unpack_rle(data, width, height):
+    """
+    Inverse of pack_rle.
+
+    Raises:
+        ValueError: If the runs do not add up to width * height pixels
+    """
+    runs = np.frombuffer(data, dtype=np.uint8)
+    indices = np.repeat(runs & 0x0F, (runs >> 4).astype(np.intp) + 1)
+    if indices.size != width * height:
+        raise ValueError(f"RLE data holds {indices.size} pixels, expected {width * height}")
+    return indices.reshape(height, width)
+
+def encode_sprite(indices):
+    """Return (encoding, data) for the smaller of the 4bpp and RLE forms."""
+    packed = pack_4bpp(indices)
+    rle = pack_rle(indices)
+    if len(rle) < len(packed):
+        return ENCODING_RLE, rle
+    return ENCODING_4BPP, packed
+
+def build_bundle(sprites):
+    """
+    Pack sprites into bundle bytes.
+
+    Args:
+        sprites: ShtSprite records, e.g. from extract_sheets.iter_sht_sprites
+
+    Returns:
+        Bundle bytes
+
+    Raises:
+        ValueError: If a name is longer than NAME_LENGTH bytes
+    """
+    encoded = []
+    for sprite in sprites:
+        name = sprite.name.encode('ascii')
+        if len(name) > NAME_LENGTH:
+            raise ValueError(f"sprite name {sprite.name!r} is longer than {NAME_LENGTH} bytes")
+        # parse_sht_row already wraps values into 0-15, as the original renderer did
+        encoded.append((name, sprite.width, sprite.height, *encode_sprite(sprite_indices(sprite))))
+
+    offset = BUNDLE_HEADER.size + INDEX_ENTRY.size * len(encoded)
+    index = []
+    for name, width, height, encoding, data in encoded:
+        index.append(INDEX_ENTRY.pack(name, width, height, encoding, offset, len(data)))
+        offset += len(data)
+    header = BUNDLE_HEADER.pack(BUNDLE_MAGIC, BUNDLE_VERSION, len(encoded))
+    return b''.join([header] + index + [data for *_, data in encoded])
+
+def write_bundle(sht_path, bundle_path):
+    """Convert a .sht file into a bundle; returns the bundle size in bytes."""
+    data = build_bundle(iter_sht_sprites(sht_path))
+    with open(bundle_path, 'wb') as f:
+        f.write(data)
+    return len(data)
+
+class SpriteBundle:
+    """
+    Read-only, memory-mapped view of a sprite bundle.
+
+    Only the header and index are read on open; each sprite's pixels are
+    decoded when asked for.
+
+    Usage:
+        with SpriteBundle('bomb.spb') as bundle:
+            indices = bundle.indices('huts')
+    """
+
+    def __init__(self, bundle_path):
+        self.path = bundle_path
+        self._file = open(bundle_path, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files cannot be mapped
+            self._file.close()
+            raise ValueError(f"{bundle_path}: empty bundle file")
+
+        try:
+            self._read_index()
+        except (ValueError, struct.error) as e:
+            self.close()
+            raise ValueError(f"{bundle_path}: {e}") from None
+
+    def _read_index(self):
+        magic, version, count = BUNDLE_HEADER.unpack_from(self._map, 0)
+        if magic != BUNDLE_MAGIC or version != BUNDLE_VERSION:
+            raise ValueError(f"not a version {BUNDLE_VERSION} sprite bundle")
+        self.names = []
+        self.index = {}
+        index_end = BUNDLE_HEADER.size + INDEX_ENTRY.size * count
+        if index_end > len(self._map):
+            raise ValueError(f"index of {count} sprites is truncated")
+        for entry in INDEX_ENTRY.iter_unpack(self._map[BUNDLE_HEADER.size:index_end]):
+            name_bytes, width, height, encoding, offset, length = entry
+            name = name_bytes.rstrip(b'\0').decode('ascii')
+            if encoding not in ENCODING_NAMES or offset + length > len(self._map):
+                raise ValueError(f"bad index entry for {name!r}")
+            self.names.append(name)
+            self.index[name] = (width, height, encoding, offset, length)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return len(self.names)
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def close(self):
+        """Unmap the file."""
+        if not self._map.closed:
+            self._map.close()
+        self._file.close()
+
+    def indices(self, name):
+        """Decode one sprite into a (height, width) color index array."""
+        width, height, encoding, offset, length = self.index[name]
+        data = self._map[offset:offset + length]
+        if encoding == ENCODING_RLE:
+            return unpack_rle(data, width, height)
+        return unpack_4bpp(data, width, height)
+
+    def sprite(self, name):
+        """Decode one sprite as an ShtSprite, like extract_sheets.iter_sht_sprites yields."""
+        width, height = self.index[name][:2]
+        return ShtSprite(name, width, height, np.ascontiguousarray(self.indices(name)).tobytes())
+
+    def sprites(self):
+        """Yield every sprite as an ShtSprite in bundle order."""
+        for name in self.names:
+            yield self.sprite(name)
+
+def check_bundle(sht_path, bundle_path):
+    """
+    Verify that a bundle holds exactly the sprites parsed from a .sht file,
+    in the same order.
+
+    Returns:
+        List of mismatch descriptions (empty on success)
+    """
+    failures = []
+    expected = list(iter_sht_sprites(sht_path))
+    with SpriteBundle(bundle_path) as bundle:
+        if bundle.names != [sprite.name for sprite in expected]:
+            failures.append("sprite names or order differ")
+        for sprite in expected:
+            if sprite.name in bundle.index and bundle.sprite(sprite.name) != sprite:
+                failures.append(f"{sprite.name}: pixels or size differ")
+    return failures
+
+def time_loads(sht_path, bundle_path, repeat=5):
+    """
+    Time loading every sprite from the text and from the bundle, and one
+    sprite from each (best of repeat runs).
+
+    Returns:
+        Dict of 'sht_all', 'bundle_all', 'sht_one', 'bundle_one' -> seconds
+    """
+    def best(func):
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            times.append(time.perf_counter() - start)
+        return min(times)
+
+    def bundle_all():
+        with SpriteBundle(bundle_path) as bundle:
+            for name in bundle:
+                bundle.indices(name)
+
+    last = list(iter_sht_sprites(sht_path))[-1].name
+
+    def sht_one():
+        # The text has no index: find the sprite by parsing up to it
+        for sprite in iter_sht_sprites(sht_path):
+            if sprite.name == last:
+                return sprite_indices(sprite)
+
+    def bundle_one():
+        with SpriteBundle(bundle_path) as bundle:
+            return bundle.indices(last)
+
+    return {
+        'sht_all': best(lambda: [sprite_indices(s) for s in iter_sht_sprites(sht_path)]),
+        'bundle_all': best(bundle_all),
+        'sht_one': best(sht_one),
+        'bundle_one': best(bundle_one),
+    }
+
+def main():
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description='Pack bomb.sht sprites into a binary sprite bundle')
+    parser.add_argument('sht_file', nargs='?', default=os.path.join('zargon', 'bomb.sht'),
+                        help='Path to .sht file')
+    parser.add_argument('-o', '--output', default='bomb.spb', help='Output bundle file')
+    parser.add_argument('--no-check', action='store_true',
+                        help='Skip decoding the bundle back and comparing it with the text')
+
+    args = parser.parse_args()
+
+    size = write_bundle(args.sht_file, args.output)
+    sht_size = os.path.getsize(args.sht_file)
+    with SpriteBundle(args.output) as bundle:
+        for name in bundle:
+            width, height, encoding, _, length = bundle.index[name]
+            print(f"  {name:16s} {width:3d}x{height:<3d} {ENCODING_NAMES[encoding]:4s} {length:5d} bytes")
+        count = len(bundle)
+    print(f"Packed {count} sprites from {args.sht_file} ({sht_size} bytes) into {args.output} "
+          f"({size} bytes, {sht_size / size:.1f}x smaller)")
+
+    if not args.no_check:
+        failures = check_bundle(args.sht_file, args.output)
+        if failures:
+            print(f"Lossless check FAILED: {'; '.join(failures)}")
+            sys.exit(1)
+        print(f"Lossless check OK: all {count} sprites match the .sht color indices")
+
+    times = time_loads(args.sht_file, args.output)
+    print(f"Load all sprites: {times['sht_all'] * 1000:.2f} ms from text, "
+          f"{times['bundle_all'] * 1000:.2f} ms from bundle "
+          f"({times['sht_all'] / times['bundle_all']:.0f}x faster)")
+    print(f"Load one sprite:  {times['sht_one'] * 1000:.2f} ms from text, "
+          f"{times['bundle_one'] * 1000:.2f} ms from bundle "
+          f"({times['sht_one'] / times['bundle_one']:.0f}x faster)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Generate palette-swapped sprite variants for challenge and prestige modes.
+
+A variant is a declarative remap of Zargon palette indices (VARIANT_REMAPS,
+or a JSON file of the same shape), turned into a 256-entry lookup table.
+Sprites are decoded once from tiles.wad, bomb.sht and the ZARGON.BAS DATA
+statements into color index buffers with TRANSPARENT for clear pixels,
+laid out once with pack_atlas.pack_rects, and every variant is then one
+gather of the whole base layout through its table. The variants are
+stacked top to bottom into a single atlas (variant k at k times the base
+height) with a pack_atlas index naming each rect <sprite>_<variant>.
+
+Usage:
+    python3 palette_variants.py zargon -o extracted_variants
+    python3 palette_variants.py zargon --sprites all --variants enraged,gilded
+    python3 palette_variants.py zargon --remaps my_remaps.json
+"""
+
+import json
+import os
+import time
+
+import numpy as np
+
+from ega_palette import DATA_RGBA, TRANSPARENT
+from extract_data_sprites import BasIndex, sprite_values
+from extract_sheets import iter_sht_sprites, sprite_indices
+from extract_tiles import WadArchive
+from indexed_png import save_variants
+from pack_atlas import drawable_name, pack_rects, write_atlas_index
+
+# Sprites drawn for the app's MonsterType entries
+MONSTER_SPRITES = ('slime', 'bat', 'babble', 'spook', 'beleth', 'snake', 'necro', 'kraken', 'zargon')
+
+# Variant name -> {palette index: replacement index}; unlisted indices keep their color.
+# Zargon palette: 0 black, 1 dark red, 2 olive, 3 green, 4 dark yellow, 5 yellow,
+# 6 sea green, 7 orange, 8 peach, 9 purple, 10 azure, 11 gray, 12 light blue,
+# 13 white, 14 blue, 15 cyan
+VARIANT_REMAPS = {
+    # Challenge.STRONG_ENEMIES / IMPOSSIBLE_MISSION: greens and blues turn to reds
+    'enraged': {2: 1, 3: 1, 4: 7, 6: 1, 9: 1, 10: 1, 12: 7, 14: 1, 15: 8},
+    # Challenge.STRONGER_ENEMIES / WARRIOR_MODE: dark purples
+    'dread': {1: 9, 2: 0, 3: 9, 4: 9, 5: 12, 6: 9, 7: 9, 8: 12, 10: 9, 14: 9, 15: 12},
+    # Prestige: gold
+    'gilded': {1: 7, 2: 4, 3: 4, 6: 4, 8: 5, 9: 7, 10: 7, 11: 5, 12: 5, 14: 4, 15: 5},
+    'frost': {1: 14, 2: 10, 3: 12, 4: 12, 5: 15, 6: 10, 7: 12, 8: 15, 9: 14, 11: 15},
+    'ashen': {1: 0, 2: 11, 3: 11, 4: 11, 5: 13, 6: 11, 7: 11, 8: 13, 9: 0, 10: 11, 12: 11,
+              14: 0, 15: 13},
+}
+
+def remap_lut(remap):
+    """
+    Build a 256-entry index lookup table from a {index: index} remap.
+
+    TRANSPARENT and every unlisted index map to themselves.
+
+    Raises:
+        ValueError: If an index is outside the 16-color palette
+    """
+    lut = np.arange(256, dtype=np.uint8)
+    for source, target in remap.items():
+        source, target = int(source), int(target)
+        if not (0 <= source < 16 and 0 <= target < 16):
+            raise ValueError(f"remap {source} -> {target} is outside the 16-color palette")
+        lut[source] = target
+    return lut
+
+def load_remaps(json_path):
+    """Read variant remaps from JSON: {"name": {"index": index, ...}, ...}."""
+    with open(json_path) as f:
+        remaps = json.load(f)
+    return {name: {int(k): v for k, v in remap.items()} for name, remap in remaps.items()}
+
+def collect_indices(source_dir, names=None):
+    """
+    Decode sprites from the three game sources into index buffers.
+
+    Sources are read in the same order as pack_atlas.collect_images, so
+    when two share a name (water) the later one wins. bomb.sht color 0
+    becomes TRANSPARENT; tiles are fully opaque.
+
+    Args:
+        source_dir: Directory with tiles.wad, bomb.sht and ZARGON.BAS
+        names: Drawable names to keep (default: every sprite)
+
+    Returns:
+        Dict of drawable name -> (height, width) uint8 array, in source order
+    """
+    buffers = {}
+
+    def add(name, indices):
+        name = drawable_name(name)
+        if names is None or name in names:
+            buffers.pop(name, None)
+            buffers[name] = indices
+
+    wad_path = os.path.join(source_dir, 'tiles.wad')
+    if os.path.exists(wad_path):
+        with WadArchive(wad_path) as wad:
+            for name in wad.names:
+                add(name, wad.indices(name))
+
+    sht_path = os.path.join(source_dir, 'bomb.sht')
+    if os.path.exists(sht_path):
+        for sprite in iter_sht_sprites(sht_path):
+            indices = sprite_indices(sprite)
+            add(sprite.name, np.where(indices == 0, TRANSPARENT, indices).astype(np.uint8))
+
+    bas_path = os.path.join(source_dir, 'ZARGON.BAS')
+    if os.path.exists(bas_path):
+        for sprite in BasIndex(bas_path).sprites():
+            add(sprite.name, sprite_values(sprite))
+
+    return buffers
+
+def build_variants(buffers, remaps, padding=1):
+    """
+    Lay sprites out once and remap the whole layout for every variant.
+
+    Args:
+        buffers: Dict of name -> index array from collect_indices
+        remaps: Dict of variant name -> {index: index}
+        padding: Empty pixels between sprites
+
+    Returns:
+        (atlas, rects): (variants * base height, base width) index array
+        with TRANSPARENT background, and {<sprite>_<variant>: (x, y, w, h)}
+    """
+    sizes = {name: (indices.shape[1], indices.shape[0]) for name, indices in buffers.items()}
+    base_w, base_h, base_rects = pack_rects(sizes, padding)
+    base = np.full((base_h, base_w), TRANSPARENT, dtype=np.uint8)
+    for name, (x, y, w, h) in base_rects.items():
+        base[y:y + h, x:x + w] = buffers[name]
+
+    luts = np.stack([remap_lut(remap) for remap in remaps.values()])
+    # One gather per variant over the whole layout: (variants, height, width)
+    atlas = luts[:, base].reshape(len(remaps) * base_h, base_w)
+
+    rects = {}
+    for k, variant in enumerate(remaps):
+        for name, (x, y, w, h) in base_rects.items():
+            rects[f'{name}_{variant}'] = (x, k * base_h + y, w, h)
+    return atlas, rects
+
+def check_variants(buffers, remaps, atlas, rects):
+    """
+    Verify every variant rect against a remap of its source sprite alone.
+
+    Returns:
+        List of mismatch descriptions (empty on success)
+    """
+    failures = []
+    for variant, remap in remaps.items():
+        lut = remap_lut(remap)
+        for name, indices in buffers.items():
+            x, y, w, h = rects[f'{name}_{variant}']
+            if not np.array_equal(atlas[y:y + h, x:x + w], lut[indices]):
+                failures.append(f"{name}_{variant}")
+    return failures
+
+def main():
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description='Generate palette-swapped sprite variants into one atlas')
+    parser.add_argument('source_dir', nargs='?', default='zargon',
+                        help='Directory with tiles.wad, bomb.sht and ZARGON.BAS')
+    parser.add_argument('-o', '--output', default='extracted_variants', help='Output directory')
+    parser.add_argument('-s', '--scale', type=int, default=1, help='Scale factor (default: 1)')
+    parser.add_argument('--sprites', default=','.join(MONSTER_SPRITES),
+                        help='Comma-separated drawable names, or "all" (default: the monster sprites)')
+    parser.add_argument('--variants',
+                        help=f'Comma-separated variant names (default: all of {", ".join(VARIANT_REMAPS)})')
+    parser.add_argument('--remaps', metavar='JSON',
+                        help='Extra or replacement remaps: {"name": {"index": index, ...}}')
+    parser.add_argument('--padding', type=int, default=1, help='Pixels between sprites (default: 1)')
+    parser.add_argument('--no-check', action='store_true',
+                        help='Skip comparing each variant with a per-sprite remap')
+
+    args = parser.parse_args()
+
+    remaps = dict(VARIANT_REMAPS)
+    if args.remaps:
+        remaps.update(load_remaps(args.remaps))
+    if args.variants:
+        unknown = [v for v in args.variants.split(',') if v not in remaps]
+        if unknown:
+            parser.error(f"unknown variants: {', '.join(unknown)}")
+        remaps = {v: remaps[v] for v in args.variants.split(',')}
+    names = None if args.sprites == 'all' else set(args.sprites.split(','))
+
+    start = time.perf_counter()
+    buffers = collect_indices(args.source_dir, names)
+    decode_seconds = time.perf_counter() - start
+    if names is not None and names - set(buffers):
+        print(f"Sprites not found: {', '.join(sorted(names - set(buffers)))}")
+        sys.exit(1)
+
+    start = time.perf_counter()
+    try:
+        atlas, rects = build_variants(buffers, remaps, args.padding)
+    except ValueError as e:
+        print(f"Cannot build variants: {e}")
+        sys.exit(1)
+    remap_seconds = time.perf_counter() - start
+
+    os.makedirs(args.output, exist_ok=True)
+    atlas_path = os.path.join(args.output, 'variant_atlas.png')
+    index_path = os.path.join(args.output, 'variant_atlas.idx')
+    save_variants(atlas, [(args.scale, atlas_path)], DATA_RGBA)
+    height, width = atlas.shape
+    write_atlas_index(index_path, width * args.scale, height * args.scale,
+                      {name: tuple(v * args.scale for v in rect) for name, rect in rects.items()})
+
+    print(f"Decoded {len(buffers)} sprites from {args.source_dir} in {decode_seconds * 1000:.1f} ms")
+    print(f"Generated {len(rects)} variants ({len(remaps)} remaps: {', '.join(remaps)}) "
+          f"in {remap_seconds * 1000:.2f} ms")
+    print(f"  Saved: {atlas_path} ({width * args.scale}x{height * args.scale})")
+    print(f"  Index: {index_path} ({os.path.getsize(index_path)} bytes)")
+
+    if not args.no_check:
+        failures = check_variants(buffers, remaps, atlas, rects)
+        if failures:
+            print(f"Variant check FAILED: {', '.join(failures)}")
+            sys.exit(1)
+        print(f"Variant check OK: all {len(rects)} variants match a per-sprite remap")
+
+if __name__ == '__main__':
+    main()
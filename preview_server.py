@@ -0,0 +1,391 @@
+#!/usr/bin/env python3
+"""
+Local HTTP preview server for Zargon's graphics.
+
+Serves any tiles.wad tile, bomb.sht sprite, ZARGON.BAS DATA sprite or
+map*.lvl map as a PNG, decoded on demand from the source files, so one
+edited tile can be looked at without rerunning an extraction:
+    /                                  index page listing every asset
+    /tile/Grass.png                    tiles.wad record
+    /sprite/huts.png                   bomb.sht sprite
+    /monster/slime.png                 DATA sprite
+    /map/map11.png                     20x10 map drawn with its tiles
+    /map/world.png                     all 16 maps stitched 4x4
+Maps are drawn by render_maps.MapRenderer with huts and search spots
+outlined.
+
+Every image takes ?scale=N (any scale indexed_png.scale_indices accepts,
+default 1, up to MAX_SCALE and at most MAX_PIXELS output pixels, so
+world.png stops at scale 2) and ?palette=zargon|ega|v0,v1,...,v15, where ega is the
+default EGA palette and a list gives the 6-bit value PALETTE sets for
+each color index. The index page passes its own ?scale and ?palette on
+to the images it lists.
+
+Source files are re-read when their modification time changes. Encoded
+PNGs are kept in an LRU cache bounded by total size and keyed on a hash
+of the source record plus the scale and palette; the same hash is sent
+as the ETag, so a browser revalidating with If-None-Match gets a 304
+until the record itself is edited.
+
+The server binds to 127.0.0.1 and the index page uses no external
+resources, so it runs entirely offline.
+
+Usage:
+    python3 preview_server.py zargon --port 8000
+"""
+
+import html
+import io
+import os
+import threading
+from collections import OrderedDict
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, quote, unquote, urlsplit
+
+from asset_manifest import record_digest
+from compile_maps import MAPS_ACROSS, MAPS_DOWN, format_lvl, load_maps, map_name
+from ega_palette import (DEFAULT_EGA_VALUES, TRANSPARENT, ZARGON_PALETTE_VALUES, ega_lut,
+                         rgba_image)
+from extract_data_sprites import BasIndex, sprite_values
+from extract_sheets import iter_sht_sprites, sprite_indices
+from extract_tiles import WadArchive, decode_ega_indices
+from indexed_png import scale_indices
+from render_maps import MAP_TILE_SOURCES, MapRenderer, tile_stack
+
+MAX_SCALE = 16
+# Largest image rendered per request: 64 MB of RGBA
+MAX_PIXELS = 4096 * 4096
+DEFAULT_CACHE_MB = 64
+
+PALETTES = {
+    'zargon': ZARGON_PALETTE_VALUES,
+    'ega': DEFAULT_EGA_VALUES,
+}
+
+# Transparency rules per asset kind, as (lookup table size, transparent indices)
+KIND_TRANSPARENCY = {
+    'tile': (16, []),
+    'sprite': (16, [0]),
+    'monster': (256, [TRANSPARENT]),
+    'map': (16, []),
+}
+
+KIND_TITLES = [
+    ('tile', 'tiles.wad'),
+    ('sprite', 'bomb.sht'),
+    ('monster', 'ZARGON.BAS DATA'),
+    ('map', 'Maps'),
+]
+
+def parse_palette(text):
+    """
+    Parse a ?palette= value.
+
+    Returns:
+        List of 16 EGA palette values
+
+    Raises:
+        ValueError: If the palette is unknown or malformed
+    """
+    if text in PALETTES:
+        return PALETTES[text]
+    try:
+        values = [int(v) for v in text.split(',')]
+    except ValueError:
+        raise ValueError(f"unknown palette {text!r}") from None
+    if len(values) != 16 or any(not 0 <= v < 64 for v in values):
+        raise ValueError("palette needs 16 EGA values from 0 to 63")
+    return values
+
+def parse_scale(text):
+    """Parse a ?scale= value (0 < scale <= MAX_SCALE)."""
+    try:
+        scale = float(text)
+    except ValueError:
+        raise ValueError(f"bad scale {text!r}") from None
+    if not 0 < scale <= MAX_SCALE:
+        raise ValueError(f"scale must be above 0 and at most {MAX_SCALE}")
+    return int(scale) if scale == int(scale) else scale
+
+class PngCache:
+    """
+    Thread-safe LRU cache of encoded PNGs, bounded by their total size.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the cached PNG for key (marking it recently used), or None."""
+        with self._lock:
+            png = self._entries.get(key)
+            if png is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return png
+
+    def put(self, key, png):
+        """Store a PNG, evicting the least recently used ones over the limit."""
+        if len(png) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size -= len(old)
+            self._entries[key] = png
+            self.size += len(png)
+            while self.size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def __len__(self):
+        return len(self._entries)
+
+class AssetSource:
+    """
+    Records of every asset kind, re-read when a source file changes.
+
+    Each kind maps record names to (source, decode) where source is the
+    raw record bytes used for hashing and decode() returns the record's
+    (height, width) color index array.
+    """
+
+    def __init__(self, source_dir):
+        self.source_dir = source_dir
+        self._loaded = {}
+        # Maps load the tile and sprite records while holding the lock
+        self._lock = threading.RLock()
+
+    def _path(self, filename):
+        return os.path.join(self.source_dir, filename)
+
+    def _load(self, key, paths, loader):
+        """Return loader()'s result, reloading if any of paths changed."""
+        stamp = tuple(os.stat(p).st_mtime_ns if os.path.exists(p) else None for p in paths)
+        with self._lock:
+            cached = self._loaded.get(key)
+            if cached is not None and cached[0] == stamp:
+                return cached[1]
+            records = loader()
+            self._loaded[key] = (stamp, records)
+            return records
+
+    def _tiles(self):
+        records = {}
+        with WadArchive(self._path('tiles.wad')) as wad:
+            for name in wad.names:
+                _, width, height, _ = wad.index[name]
+                with wad.data(name) as buf:
+                    data = bytes(buf)
+                records[name] = (data, lambda data=data, w=width, h=height:
+                                 decode_ega_indices(data, w, h))
+        return records
+
+    def _sprites(self):
+        return {s.name: (s.indices, lambda s=s: sprite_indices(s))
+                for s in iter_sht_sprites(self._path('bomb.sht'))}
+
+    def _monsters(self):
+        return {s.name: (s.values, lambda s=s: sprite_values(s))
+                for s in BasIndex(self._path('ZARGON.BAS')).sprites()}
+
+    def _maps(self):
+        tiles = self.records('tile')
+        sprites = self.records('sprite')
+        sources = {'tile': tiles, 'sprite': sprites}
+        # Map images depend on the tile graphics as well as the .lvl file
+        used = sorted(set(MAP_TILE_SOURCES.values()))
+        if any(name not in sources[kind] for kind, name in used):
+            return {}
+        graphics = b''.join(bytes(sources[kind][name][0]) for kind, name in used)
+        renderer = MapRenderer(tile_stack(lambda kind, name: sources[kind][name][1]()))
+        # The renderer reuses its canvases, so render and copy one at a time
+        render_lock = threading.Lock()
+
+        def render(draw):
+            with render_lock:
+                return draw().copy()
+
+        maps = load_maps(self.source_dir)
+        records = {level.name: (format_lvl(level) + graphics,
+                                lambda level=level: render(lambda: renderer.render_map(level)))
+                   for level in maps.values()}
+        records['world'] = (b''.join(format_lvl(level) for level in maps.values()) + graphics,
+                            lambda: render(lambda: renderer.render_world(maps)))
+        return records
+
+    def records(self, kind):
+        """
+        Return the name -> (source, decode) dict for an asset kind.
+
+        Missing source files give an empty dict.
+        """
+        files = {
+            'tile': ['tiles.wad'],
+            'sprite': ['bomb.sht'],
+            'monster': ['ZARGON.BAS'],
+            'map': [f'{map_name(x, y)}.lvl' for y in range(1, MAPS_DOWN + 1)
+                    for x in range(1, MAPS_ACROSS + 1)]
+                   + ['tiles.wad', 'bomb.sht'],
+        }[kind]
+        paths = [self._path(f) for f in files]
+        if not os.path.exists(paths[0]):
+            return {}
+        loader = {'tile': self._tiles, 'sprite': self._sprites,
+                  'monster': self._monsters, 'map': self._maps}[kind]
+        return self._load(kind, paths, loader)
+
+class ImageTooLarge(ValueError):
+    """A requested image is larger than MAX_PIXELS."""
+
+class PreviewServer(ThreadingHTTPServer):
+    """ThreadingHTTPServer holding the asset source and PNG cache."""
+
+    daemon_threads = True
+
+    def __init__(self, address, source_dir, cache_bytes):
+        super().__init__(address, PreviewHandler)
+        self.assets = AssetSource(source_dir)
+        self.cache = PngCache(cache_bytes)
+
+    def render(self, kind, name, scale, palette):
+        """
+        Return (etag, png) for one asset, from the cache when possible.
+
+        Raises:
+            KeyError: If the kind or record does not exist
+            ImageTooLarge: If the scaled image would exceed MAX_PIXELS
+        """
+        source, decode = self.assets.records(kind)[name]
+        etag = record_digest(source, kind=kind, name=name, scale=scale, palette=palette)
+        png = self.cache.get(etag)
+        if png is None:
+            size, transparent = KIND_TRANSPARENCY[kind]
+            indices = decode()
+            height, width = indices.shape
+            pixels = int(width * scale + 0.5) * int(height * scale + 0.5)
+            if pixels > MAX_PIXELS:
+                raise ImageTooLarge(f"{kind} {name!r} at scale {scale:g} would be "
+                                    f"{pixels} pixels, more than {MAX_PIXELS}")
+            img = rgba_image(scale_indices(indices, scale), ega_lut(palette, size, transparent))
+            buf = io.BytesIO()
+            img.save(buf, 'PNG')
+            png = buf.getvalue()
+            self.cache.put(etag, png)
+        return etag, png
+
+class PreviewHandler(BaseHTTPRequestHandler):
+    server_version = 'ZargonPreview/1.0'
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        try:
+            scale = parse_scale(query.get('scale', '1'))
+            palette = parse_palette(query.get('palette', 'zargon'))
+        except ValueError as e:
+            self.send_error(HTTPStatus.BAD_REQUEST, str(e))
+            return
+
+        if url.path in ('/', '/index.html'):
+            self.send_body(self.index_page(query), 'text/html; charset=utf-8')
+            return
+
+        parts = url.path.strip('/').split('/', 1)
+        if len(parts) != 2 or parts[0] not in KIND_TRANSPARENCY or not parts[1].endswith('.png'):
+            self.send_error(HTTPStatus.NOT_FOUND)
+            return
+        kind, name = parts[0], unquote(parts[1][:-len('.png')])
+        try:
+            etag, png = self.server.render(kind, name, scale, palette)
+        except KeyError:
+            self.send_error(HTTPStatus.NOT_FOUND, f"no {kind} named {name!r}")
+            return
+        except ImageTooLarge as e:
+            self.send_error(HTTPStatus.BAD_REQUEST, str(e))
+            return
+        except ValueError as e:
+            # A source file that does not parse, e.g. mid-edit
+            self.send_error(HTTPStatus.INTERNAL_SERVER_ERROR, str(e))
+            return
+
+        quoted = f'"{etag}"'
+        if quoted in [t.strip() for t in self.headers.get('If-None-Match', '').split(',')]:
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self.send_header('ETag', quoted)
+            self.end_headers()
+            return
+        self.send_body(png, 'image/png', etag=quoted)
+
+    def send_body(self, body, content_type, etag=None):
+        self.send_response(HTTPStatus.OK)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        # Always revalidate so edits to the sources show up on reload
+        self.send_header('Cache-Control', 'no-cache')
+        if etag is not None:
+            self.send_header('ETag', etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def index_page(self, query):
+        """HTML listing every asset, passing ?scale and ?palette through."""
+        suffix = ''.join(f'&{k}={quote(query[k])}' for k in ('scale', 'palette') if k in query)
+        suffix = '?' + suffix[1:] if suffix else ''
+        cache = self.server.cache
+        sections = []
+        for kind, title in KIND_TITLES:
+            items = []
+            for name in self.server.assets.records(kind):
+                url = f'/{kind}/{quote(name)}.png{suffix}'
+                items.append(f'<a href="{url}"><figure><img src="{url}" alt="">'
+                             f'<figcaption>{html.escape(name)}</figcaption></figure></a>')
+            sections.append(f'<h2>{title} ({len(items)})</h2>\n' + '\n'.join(items))
+        return f"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Zargon preview</title>
+<style>
+body {{ background: #404040; color: #eee; font-family: sans-serif; }}
+figure {{ display: inline-block; margin: 6px; text-align: center; }}
+img {{ image-rendering: pixelated; border: 1px solid #666; }}
+a {{ color: #eee; text-decoration: none; }}
+</style></head><body>
+<h1>Zargon preview: {html.escape(self.server.assets.source_dir)}</h1>
+<p>?scale=N, ?palette=zargon|ega|16 EGA values &mdash;
+cache: {len(cache)} PNGs, {cache.size // 1024} KB, {cache.hits} hits, {cache.misses} misses</p>
+{chr(10).join(sections)}
+</body></html>
+""".encode('utf-8')
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Serve Zargon tiles, sprites and maps as PNGs')
+    parser.add_argument('source_dir', nargs='?', default='zargon',
+                        help='Directory with tiles.wad, bomb.sht, ZARGON.BAS and the maps')
+    parser.add_argument('--port', type=int, default=8000, help='Port (default: 8000)')
+    parser.add_argument('--bind', default='127.0.0.1',
+                        help='Address to listen on (default: 127.0.0.1)')
+    parser.add_argument('--cache-mb', type=float, default=DEFAULT_CACHE_MB,
+                        help=f'Size limit of the PNG cache in MB (default: {DEFAULT_CACHE_MB})')
+
+    args = parser.parse_args()
+
+    server = PreviewServer((args.bind, args.port), args.source_dir, int(args.cache_mb * 1024 * 1024))
+    print(f"Serving {args.source_dir} at http://{args.bind}:{server.server_port}/ (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == '__main__':
+    main()
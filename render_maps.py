@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+Render Zargon's maps with the real tile graphics.
+
+Each of the 16 map*.lvl files is a 20x10 grid of tile codes (see
+compile_maps.py); the world is those maps stitched 4x4 into 80x40 tiles.
+Every tile code is drawn with the graphic the app uses for it
+(MAP_TILE_SOURCES, from tiles.wad or bomb.sht).
+
+Rendering works in color index space:
+- each tile graphic is decoded once into a (16, tile height, tile width)
+  stack indexed by 4-bit tile value (compile_maps.TILE_VALUES)
+- a map or the whole world becomes an array of tile values, and the
+  canvas is filled by one fancy-indexed gather from the stack, written
+  through a (rows, tile height, cols, tile width) view of a preallocated
+  buffer
+- overlays outline the hut cell (hutspotx/hutspoty) in white and the
+  search spot where an item is found (s.spotx/s.spoty) in yellow
+
+A MapRenderer keeps its canvases, so re-rendering a map takes well under
+a millisecond and the world about one; with --incremental only maps
+whose .lvl file or tile graphics changed are written again.
+
+Usage:
+    python3 render_maps.py zargon -o map_renders --world
+    python3 render_maps.py zargon -o map_renders --maps map11,map24 -s 2
+"""
+
+import os
+import time
+
+import numpy as np
+
+from asset_manifest import AssetManifest, record_digest
+from compile_maps import (MAPS_ACROSS, MAPS_DOWN, MAP_HEIGHT, MAP_WIDTH, TILE_CODES, format_lvl,
+                          load_maps)
+from ega_palette import TILE_RGBA, ZARGON_PALETTE
+from extract_sheets import iter_sht_sprites, sprite_indices
+from extract_tiles import WadArchive
+from indexed_png import save_variants
+
+# Source of each map tile code, following the app's TileBitmapCache:
+# (kind, record name) with kind 'tile' for tiles.wad, 'sprite' for bomb.sht
+MAP_TILE_SOURCES = {
+    '1': ('tile', 'Grass'),
+    '2': ('tile', 'Sand'),
+    'R': ('tile', 'Rock-1'),
+    'r': ('tile', 'Rock-2'),
+    'T': ('tile', 'Trees1'),
+    't': ('tile', 'Trees2'),
+    'w': ('tile', 'Water'),
+    '4': ('tile', 'Water'),
+    'a': ('tile', 'Water'),
+    'G': ('tile', 'Gravestone'),
+    '0': ('sprite', 'flor'),
+    'D': ('sprite', 'florwd'),
+    'h': ('sprite', 'huts'),
+    'W': ('sprite', 'huts'),
+    'H': ('sprite', 'huts'),
+    'C': ('sprite', 'cast'),
+}
+
+# Overlay colors (Zargon palette indices) and outline width in pixels
+HUT_COLOR = 13     # white
+SPOT_COLOR = 5     # bright yellow
+OVERLAY_WIDTH = 2
+
+# Tile code -> 4-bit tile value, as a bytes.translate table
+_VALUE_TABLE = bytes(TILE_CODES.index(chr(c)) if chr(c) in TILE_CODES else 0 for c in range(256))
+
+def tile_stack(lookup):
+    """
+    Stack the graphic of every tile value for blitting.
+
+    Args:
+        lookup: Function (kind, name) -> (height, width) index array
+
+    Returns:
+        (16, tile height, tile width) uint8 array indexed by tile value;
+        graphics of another size are cropped or padded to the first one's
+    """
+    graphics = {}
+    for code in TILE_CODES:
+        source = MAP_TILE_SOURCES[code]
+        if source not in graphics:
+            graphics[source] = lookup(*source)
+    tile_h, tile_w = graphics[MAP_TILE_SOURCES[TILE_CODES[0]]].shape
+    stack = np.zeros((len(TILE_CODES), tile_h, tile_w), dtype=np.uint8)
+    for value, code in enumerate(TILE_CODES):
+        cell = graphics[MAP_TILE_SOURCES[code]][:tile_h, :tile_w]
+        stack[value, :cell.shape[0], :cell.shape[1]] = cell
+    return stack
+
+def load_tile_stack(source_dir):
+    """Decode each map tile graphic once from tiles.wad and bomb.sht."""
+    with WadArchive(os.path.join(source_dir, 'tiles.wad')) as wad:
+        tiles = {name: wad.indices(name) for name in wad.names}
+    sprites = {s.name: sprite_indices(s) for s in iter_sht_sprites(os.path.join(source_dir, 'bomb.sht'))}
+    sources = {'tile': tiles, 'sprite': sprites}
+    return tile_stack(lambda kind, name: sources[kind][name])
+
+def map_values(level):
+    """(MAP_HEIGHT, MAP_WIDTH) array of a LevelMap's tile values."""
+    codes = level.tiles.encode('ascii').translate(_VALUE_TABLE)
+    return np.frombuffer(codes, dtype=np.uint8).reshape(MAP_HEIGHT, MAP_WIDTH)
+
+def world_values(maps):
+    """(MAPS_DOWN * MAP_HEIGHT, MAPS_ACROSS * MAP_WIDTH) array of the stitched world's tile values."""
+    values = np.zeros((MAPS_DOWN * MAP_HEIGHT, MAPS_ACROSS * MAP_WIDTH), dtype=np.uint8)
+    for (x, y), level in maps.items():
+        values[(y - 1) * MAP_HEIGHT:y * MAP_HEIGHT, (x - 1) * MAP_WIDTH:x * MAP_WIDTH] = map_values(level)
+    return values
+
+class MapRenderer:
+    """
+    Renders maps and the stitched world from a tile stack.
+
+    Canvases are allocated once per size and reused: the arrays returned
+    by render_map and render_world are overwritten by the next call of
+    the same kind, so copy them to keep them.
+    """
+
+    def __init__(self, stack):
+        self.stack = stack
+        _, self.tile_h, self.tile_w = stack.shape
+        self._canvases = {}
+
+    def blit(self, values):
+        """
+        Draw a grid of tile values.
+
+        Returns:
+            (rows * tile height, cols * tile width) index array (reused)
+        """
+        rows, cols = values.shape
+        canvas = self._canvases.get((rows, cols))
+        if canvas is None:
+            canvas = np.empty((rows * self.tile_h, cols * self.tile_w), dtype=np.uint8)
+            self._canvases[(rows, cols)] = canvas
+        # Gather (rows, cols, tile_h, tile_w) and lay it out as (rows, tile_h, cols, tile_w)
+        canvas.reshape(rows, self.tile_h, cols, self.tile_w)[...] = self.stack[values].transpose(0, 2, 1, 3)
+        return canvas
+
+    def outline(self, canvas, col, row, color, inset=0):
+        """Draw an OVERLAY_WIDTH box around tile (col, row), 0-based, inset by inset pixels."""
+        y1 = row * self.tile_h + inset
+        x1 = col * self.tile_w + inset
+        y2 = (row + 1) * self.tile_h - inset
+        x2 = (col + 1) * self.tile_w - inset
+        w = OVERLAY_WIDTH
+        canvas[y1:y1 + w, x1:x2] = color
+        canvas[y2 - w:y2, x1:x2] = color
+        canvas[y1:y2, x1:x1 + w] = color
+        canvas[y1:y2, x2 - w:x2] = color
+
+    def overlay(self, canvas, level, col_offset=0, row_offset=0):
+        """
+        Mark a map's hut and search spot. Positions are in the game's cx, cy
+        terms: x is the 1-based column (0 when unused) and y the 0-based row.
+        """
+        hut_x, hut_y = level.hut
+        if hut_x:
+            self.outline(canvas, col_offset + hut_x - 1, row_offset + hut_y, HUT_COLOR)
+        spot_x, spot_y = level.spot
+        if spot_x:
+            self.outline(canvas, col_offset + spot_x - 1, row_offset + spot_y, SPOT_COLOR,
+                         inset=OVERLAY_WIDTH + 1)
+
+    def render_map(self, level, overlays=True):
+        """Render one LevelMap as a color index array (reused buffer)."""
+        canvas = self.blit(map_values(level))
+        if overlays:
+            self.overlay(canvas, level)
+        return canvas
+
+    def render_world(self, maps, overlays=True):
+        """
+        Render all maps stitched into the 4x4 world.
+
+        Args:
+            maps: Dict of (x, y) -> LevelMap from compile_maps.load_maps
+
+        Returns:
+            Color index array (reused buffer)
+        """
+        canvas = self.blit(world_values(maps))
+        if overlays:
+            for (x, y), level in maps.items():
+                self.overlay(canvas, level, (x - 1) * MAP_WIDTH, (y - 1) * MAP_HEIGHT)
+        return canvas
+
+def render_maps(source_dir, output_dir, scale=1, names=None, world=False, overlays=True,
+                indexed=False, manifest=None):
+    """
+    Render maps (and optionally the world) to PNG files.
+
+    Args:
+        source_dir: Directory with the map*.lvl files, tiles.wad and bomb.sht
+        output_dir: Directory for <map>.png and world.png
+        scale: Scale factor
+        names: Map names to render (default: all 16)
+        world: Also render world.png
+        overlays: Mark huts and search spots
+        indexed: Save 4-bit palette-indexed PNGs
+        manifest: Optional AssetManifest; outputs that are fresh are skipped
+
+    Returns:
+        (written, render_seconds): output file names written and the time
+        spent rendering them
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    maps = load_maps(source_dir)
+    stack = load_tile_stack(source_dir)
+    renderer = MapRenderer(stack)
+    tiles_digest = record_digest(stack.tobytes(), shape=list(stack.shape))
+    params = dict(tiles=tiles_digest, scale=scale, overlays=overlays,
+                  png='indexed' if indexed else 'rgba')
+
+    jobs = [(f'{level.name}.png', format_lvl(level), lambda level=level: renderer.render_map(level, overlays))
+            for level in maps.values() if names is None or level.name in names]
+    if world:
+        jobs.append(('world.png', b''.join(format_lvl(level) for level in maps.values()),
+                     lambda: renderer.render_world(maps, overlays)))
+
+    written = []
+    render_seconds = 0.0
+    for filename, source, render in jobs:
+        digest = record_digest(source, **params)
+        if manifest is not None and manifest.is_fresh(filename, digest):
+            continue
+        start = time.perf_counter()
+        canvas = render()
+        render_seconds += time.perf_counter() - start
+        save_variants(canvas, [(scale, os.path.join(output_dir, filename))], TILE_RGBA,
+                      ZARGON_PALETTE if indexed else None)
+        written.append(filename)
+        if manifest is not None:
+            manifest.update(filename, digest)
+    return written, render_seconds
+
+def main():
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description='Render Zargon maps with the tile graphics')
+    parser.add_argument('source_dir', nargs='?', default='zargon',
+                        help='Directory with map*.lvl, tiles.wad and bomb.sht')
+    parser.add_argument('-o', '--output', default='map_renders', help='Output directory')
+    parser.add_argument('-s', '--scale', type=int, default=1, help='Scale factor (default: 1)')
+    parser.add_argument('--maps', help='Comma-separated map names (default: all)')
+    parser.add_argument('--world', action='store_true', help='Also render the stitched 4x4 world')
+    parser.add_argument('--no-overlays', action='store_true', help='Do not mark huts and search spots')
+    parser.add_argument('--indexed', action='store_true',
+                        help='Save 4-bit palette-indexed PNGs instead of RGBA')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Only render maps whose .lvl file or tile graphics changed')
+
+    args = parser.parse_args()
+
+    names = set(args.maps.split(',')) if args.maps else None
+    manifest = AssetManifest(args.output, 'maps') if args.incremental else None
+    start = time.perf_counter()
+    try:
+        written, render_seconds = render_maps(args.source_dir, args.output, args.scale, names,
+                                              args.world, not args.no_overlays, args.indexed, manifest)
+    except ValueError as e:
+        print(f"Cannot render maps: {e}")
+        sys.exit(1)
+    if manifest is not None:
+        manifest.save()
+        print(manifest.summary())
+    for filename in written:
+        print(f"  Saved: {os.path.join(args.output, filename)}")
+    print(f"Rendered {len(written)} images in {render_seconds * 1000:.1f} ms "
+          f"({(time.perf_counter() - start) * 1000:.1f} ms with decoding and PNG writes)")
+
+if __name__ == '__main__':
+    main()
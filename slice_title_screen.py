@@ -1,10 +1,59 @@
 #!/usr/bin/env python3
 """
 Slice the title screen mockup into individual image assets for the Zargon Android app.
+
+The default mode crops fixed, approximate rectangles from a title screen
+mockup (slice_title_screen). Automatic mode (--auto, slice_auto) works on
+any mockup instead:
+- the background color is taken from the image border (or the spec) and
+  every pixel within --tolerance of it is masked out, along with pixels
+  that are already transparent
+- the remaining foreground is split into 8-connected regions; regions
+  closer than --merge pixels are joined (a torch and its flame) and
+  regions smaller than --min-area pixels are dropped as noise
+- each region is cropped to its alpha bounding box and saved with the
+  background replaced by transparency
+
+A JSON spec file overrides the automatic settings and names regions:
+{
+  "background": [0, 0, 0],
+  "tolerance": 24, "min_area": 64, "merge": 2,
+  "regions": {
+    "demon_head": {"box": [-300, 0, -100, 120]},
+    "stone_wall_bg": {"box": [100, 700, 300, 900], "keep_background": true}
+  },
+  "ignore": [[0, 0, 640, 20]],
+  "mockups": {"battlefoes": {"ignore": [[0, 0, 640, 16]]}}
+}
+Every key is optional; "background" defaults to "auto" (the most common
+border color). Boxes are [x1, y1, x2, y2], with negative values counting
+from the right or bottom edge, and "ignore" boxes are never detected.
+A named region is trimmed to the foreground inside its box (or cropped
+as is with keep_background); its pixels are then left out of the
+automatic regions, which are named <mockup>_01, <mockup>_02, ... in
+reading order. "mockups" holds per-image settings, by file stem, merged
+over the top-level ones.
+
+Given a directory, every PNG in it is sliced into <output>/<stem>/, one
+process per mockup.
+
+Usage:
+    python3 slice_title_screen.py title_screen_mockup.png assets/
+    python3 slice_title_screen.py pics/ sliced/ --auto --spec slices.json -j 4
 """
 
-from PIL import Image
+import json
 import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+from connected_regions import NEIGHBOURS, label_regions, shift
+
+DEFAULT_TOLERANCE = 24
+DEFAULT_MIN_AREA = 64
+DEFAULT_MERGE = 2
 
 def slice_title_screen(input_path, output_dir):
     """
@@ -77,21 +126,237 @@ def slice_title_screen(input_path, output_dir):
     print("  - Remove backgrounds from transparent elements")
     print("  - Fine-tune the torch flames for animation")
     print("  - Adjust the demon head if edges are cut off")
+    print("Or run with --auto to find, trim and clear the background of each region automatically.")
 
-if __name__ == '__main__':
+def load_spec(spec_path):
+    """Read a JSON slicing spec (see the module docstring)."""
+    with open(spec_path, 'r') as f:
+        return json.load(f)
+
+def mockup_settings(spec, stem, overrides=None):
+    """
+    Resolve the settings for one mockup.
+
+    Args:
+        spec: Spec dict, or None
+        stem: Mockup file name without extension
+        overrides: Dict of settings given on the command line
+
+    Returns:
+        Dict with background, tolerance, min_area, merge, regions and ignore
+    """
+    settings = {'background': 'auto', 'tolerance': DEFAULT_TOLERANCE,
+                'min_area': DEFAULT_MIN_AREA, 'merge': DEFAULT_MERGE, 'regions': {}, 'ignore': []}
+    spec = spec or {}
+    for layer in (spec, spec.get('mockups', {}).get(stem, {}), overrides or {}):
+        for key, value in layer.items():
+            if key in ('regions', 'ignore'):
+                settings[key] = ({**settings[key], **value} if key == 'regions'
+                                 else settings[key] + list(value))
+            elif key != 'mockups' and value is not None:
+                settings[key] = value
+    return settings
+
+def resolve_box(box, width, height):
+    """Clamp an [x1, y1, x2, y2] box to the image; negative values count from the far edge."""
+    x1, y1, x2, y2 = (v + size if v < 0 else v
+                      for v, size in zip(box, (width, height, width, height)))
+    return max(0, x1), max(0, y1), min(width, x2), min(height, y2)
+
+def border_color(rgba):
+    """Most common color on the image border, as (r, g, b)."""
+    border = np.concatenate([rgba[0], rgba[-1], rgba[:, 0], rgba[:, -1]])
+    keys = ((border[:, 0].astype(np.uint32) << 16) | (border[:, 1].astype(np.uint32) << 8)
+            | border[:, 2])
+    values, counts = np.unique(keys, return_counts=True)
+    key = int(values[counts.argmax()])
+    return (key >> 16, (key >> 8) & 0xFF, key & 0xFF)
+
+def foreground_mask(rgba, background, tolerance):
+    """Pixels that are not transparent and differ from background by more than tolerance."""
+    diff = np.abs(rgba[..., :3].astype(np.int16) - np.array(background, dtype=np.int16)).max(axis=2)
+    return (diff > tolerance) & (rgba[..., 3] > 0)
+
+def dilate(mask, radius):
+    """Grow a boolean mask by radius pixels in every direction."""
+    for _ in range(radius):
+        grown = mask.copy()
+        for dy, dx in NEIGHBOURS:
+            grown |= shift(mask, dy, dx, False)
+        mask = grown
+    return mask
+
+def region_boxes(labels, mask, count):
+    """
+    Area and bounding box of each labelled region, counting mask pixels only.
+
+    Returns:
+        (area, x1, y1, x2, y2) arrays indexed by label, boxes exclusive at x2/y2
+    """
+    ys, xs = np.nonzero(mask)
+    lab = labels[ys, xs]
+    area = np.bincount(lab, minlength=count + 1)
+    height, width = mask.shape
+    x1 = np.full(count + 1, width)
+    y1 = np.full(count + 1, height)
+    x2 = np.zeros(count + 1, dtype=np.intp)
+    y2 = np.zeros(count + 1, dtype=np.intp)
+    np.minimum.at(x1, lab, xs)
+    np.minimum.at(y1, lab, ys)
+    np.maximum.at(x2, lab, xs + 1)
+    np.maximum.at(y2, lab, ys + 1)
+    return area, x1, y1, x2, y2
+
+def cut_out(rgba, keep, box):
+    """Crop rgba to box, making every pixel outside keep transparent."""
+    x1, y1, x2, y2 = box
+    crop = rgba[y1:y2, x1:x2].copy()
+    crop[..., 3] = np.where(keep[y1:y2, x1:x2], crop[..., 3], 0)
+    return Image.fromarray(crop, 'RGBA')
+
+def slice_auto(input_path, output_dir, spec=None, overrides=None):
+    """
+    Find the foreground regions of a mockup and save each as a trimmed PNG
+    with a transparent background.
+
+    Args:
+        input_path: Mockup image
+        output_dir: Directory to save the regions to
+        spec: Optional spec dict (see the module docstring)
+        overrides: Optional settings dict taking precedence over the spec
+
+    Returns:
+        List of (name, (x1, y1, x2, y2), status) in the order saved, status
+        being 'saved' or 'empty' for a named region with no foreground
+    """
+    stem = os.path.splitext(os.path.basename(input_path))[0]
+    settings = mockup_settings(spec, stem, overrides)
+    rgba = np.asarray(Image.open(input_path).convert('RGBA'))
+    height, width = rgba.shape[:2]
+    background = settings['background']
+    if background == 'auto':
+        background = border_color(rgba)
+    mask = foreground_mask(rgba, background, settings['tolerance'])
+    for box in settings['ignore']:
+        x1, y1, x2, y2 = resolve_box(box, width, height)
+        mask[y1:y2, x1:x2] = False
+
+    os.makedirs(output_dir, exist_ok=True)
+    results = []
+
+    def save(name, img, box):
+        img.save(os.path.join(output_dir, f'{name}.png'), 'PNG')
+        results.append((name, box, 'saved'))
+
+    # Named regions first; their boxes are then left out of detection
+    for name, region in settings['regions'].items():
+        x1, y1, x2, y2 = resolve_box(region['box'], width, height)
+        if region.get('keep_background'):
+            save(name, Image.fromarray(rgba[y1:y2, x1:x2]), (x1, y1, x2, y2))
+        else:
+            inside = np.zeros_like(mask)
+            inside[y1:y2, x1:x2] = mask[y1:y2, x1:x2]
+            ys, xs = np.nonzero(inside)
+            if len(ys) == 0:
+                results.append((name, (x1, y1, x2, y2), 'empty'))
+            else:
+                box = (int(xs.min()), int(ys.min()), int(xs.max()) + 1, int(ys.max()) + 1)
+                save(name, cut_out(rgba, inside, box), box)
+        mask[y1:y2, x1:x2] = False
+
+    labels, count = label_regions(dilate(mask, (settings['merge'] + 1) // 2))
+    area, x1, y1, x2, y2 = region_boxes(labels, mask, count)
+    number = 0
+    for label in range(1, count + 1):
+        if area[label] < settings['min_area']:
+            continue
+        number += 1
+        box = (int(x1[label]), int(y1[label]), int(x2[label]), int(y2[label]))
+        save(f'{stem}_{number:02d}', cut_out(rgba, mask & (labels == label), box), box)
+    return results
+
+def _slice_job(job):
+    """Process pool entry point: (input_path, output_dir, spec, overrides) -> results."""
+    return slice_auto(*job)
+
+def slice_batch(input_paths, output_dir, spec=None, overrides=None, jobs=None):
+    """
+    Slice several mockups in automatic mode, each into output_dir/<stem>/,
+    one process per mockup.
+
+    Args:
+        jobs: Worker processes (default: one per CPU)
+
+    Returns:
+        Dict of input path -> slice_auto results
+    """
+    work = [(path, os.path.join(output_dir, os.path.splitext(os.path.basename(path))[0]),
+             spec, overrides) for path in input_paths]
+    if jobs == 1 or len(work) <= 1:
+        return {job[0]: _slice_job(job) for job in work}
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        return dict(zip(input_paths, pool.map(_slice_job, work)))
+
+def print_results(input_path, output_dir, results):
+    """Report what slice_auto saved."""
+    print(f"{input_path} -> {output_dir}")
+    for name, (x1, y1, x2, y2), status in results:
+        if status == 'empty':
+            print(f"✗ {name}: no foreground in ({x1}, {y1}, {x2}, {y2})")
+        else:
+            print(f"✓ Saved {name}.png ({x2 - x1}x{y2 - y1} at {x1}, {y1})")
+
+def main():
+    import argparse
+    import glob
     import sys
+    import time
 
-    if len(sys.argv) < 2:
-        print("Usage: python slice_title_screen.py <input_image> [output_dir]")
-        print("\nExample:")
-        print("  python slice_title_screen.py title_screen_mockup.png assets/")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(description='Slice title screen mockups into image assets')
+    parser.add_argument('input', help='Mockup image, or a directory of PNG mockups (implies --auto)')
+    parser.add_argument('output_dir', nargs='?', default='sliced_assets',
+                        help='Output directory (default: sliced_assets)')
+    parser.add_argument('--auto', action='store_true',
+                        help='Detect regions automatically instead of using the fixed title screen crops')
+    parser.add_argument('--spec', help='JSON spec with named regions and detection settings')
+    parser.add_argument('--tolerance', type=int,
+                        help=f'Max per-channel difference from the background color '
+                             f'(default: {DEFAULT_TOLERANCE})')
+    parser.add_argument('--min-area', type=int,
+                        help=f'Drop regions with fewer pixels (default: {DEFAULT_MIN_AREA})')
+    parser.add_argument('--merge', type=int,
+                        help=f'Join regions up to this many pixels apart (default: {DEFAULT_MERGE})')
+    parser.add_argument('-j', '--jobs', type=int, help='Worker processes for a directory (default: CPUs)')
 
-    input_image = sys.argv[1]
-    output_directory = sys.argv[2] if len(sys.argv) > 2 else 'sliced_assets'
+    args = parser.parse_args()
 
-    if not os.path.exists(input_image):
-        print(f"Error: Input image '{input_image}' not found")
+    if not os.path.exists(args.input):
+        print(f"Error: Input '{args.input}' not found")
         sys.exit(1)
+    if os.path.isdir(args.input):
+        inputs = sorted(glob.glob(os.path.join(args.input, '*.png')))
+        if not inputs:
+            print(f"Error: no PNG files in '{args.input}'")
+            sys.exit(1)
+    elif not args.auto:
+        slice_title_screen(args.input, args.output_dir)
+        return
+    else:
+        inputs = [args.input]
+
+    spec = load_spec(args.spec) if args.spec else None
+    overrides = {'tolerance': args.tolerance, 'min_area': args.min_area, 'merge': args.merge}
+    start = time.perf_counter()
+    if os.path.isdir(args.input):
+        results = slice_batch(inputs, args.output_dir, spec, overrides, args.jobs)
+        for path, saved in results.items():
+            print_results(path, os.path.join(args.output_dir, os.path.splitext(os.path.basename(path))[0]),
+                          saved)
+    else:
+        results = {args.input: slice_auto(args.input, args.output_dir, spec, overrides)}
+        print_results(args.input, args.output_dir, results[args.input])
+    total = sum(status == 'saved' for saved in results.values() for _, _, status in saved)
+    print(f"\n✓ {total} regions from {len(results)} mockups in {time.perf_counter() - start:.2f}s")
 
-    slice_title_screen(input_image, output_directory)
+if __name__ == '__main__':
+    main()
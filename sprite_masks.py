@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+Collision masks, opaque bounding boxes and row spans for Zargon's sprites.
+
+Sprites mark transparency in their color indices: bomb.sht sprites with
+color 0, DATA sprites with TRANSPARENT (the "x" value). For each sprite
+this module records where the opaque pixels are:
+- bounds: the tight (x, y, width, height) box around every opaque pixel
+- mask: one bit per pixel, rows padded to a byte, leftmost pixel in the
+  high bit (np.packbits order)
+- spans: for each row, the [start, end) column runs of opaque pixels
+All three come from whole-array operations on the sprite's boolean mask.
+
+The extractors write them with --masks, and build_assets.py writes one
+index for every bomb.sht and DATA sprite to assets/sprite_masks.bin, so
+hit tests and draw bounds are table lookups at runtime. The app reads
+that file with SpriteMasks (domain/graphics/SpriteMasks.kt).
+
+Index format (little-endian):
+- 4 bytes: Magic "ZMSK"
+- 2 bytes: Version (1)
+- 2 bytes: Sprite count
+- Per sprite:
+  - 16 bytes: Drawable name (ASCII, NUL padded)
+  - 2 bytes each: Width, height
+  - 2 bytes each: Bounds x, y, width, height (all 0 if nothing is opaque)
+  - 4 bytes: Opaque pixel count
+  - 4 bytes each: Mask offset, spans offset, from the start of the file
+- At each mask offset: height * ceil(width / 8) bytes
+- At each spans offset: height + 1 2-byte span counts (row r's spans are
+  entries counts[r] to counts[r + 1]), then 2-byte start, end per span
+
+Usage:
+    python3 sprite_masks.py extracted_monsters/sprite_masks.bin --check
+    python3 sprite_masks.py app/app/src/main/assets/sprite_masks.bin --hit joe 9 15
+"""
+
+import struct
+from collections import namedtuple
+
+import numpy as np
+
+MASK_FILE = 'sprite_masks.bin'
+MASK_MAGIC = b'ZMSK'
+MASK_VERSION = 1
+MASK_HEADER = struct.Struct('<4sHH')
+MASK_ENTRY = struct.Struct('<16sHHHHHHIII')
+NAME_LENGTH = 16
+
+SpriteMask = namedtuple('SpriteMask', ['name', 'width', 'height', 'bounds', 'opaque',
+                                       'bits', 'counts', 'spans'])
+SpriteMask.__doc__ = """Opaque pixel tables of one sprite: bounds is (x, y, width, height),
+opaque the opaque pixel count, bits the packed mask bytes, counts the
+(height + 1) cumulative span counts per row and spans an (n, 2) array of
+[start, end) columns."""
+
+def compute_mask(name, mask):
+    """
+    Build a SpriteMask from a (height, width) boolean opaque mask.
+
+    Raises:
+        ValueError: If the sprite is too large for the index format
+    """
+    height, width = mask.shape
+    if width > 0xFFFF or height > 0xFFFF:
+        raise ValueError(f"sprite {name!r} is too large for a mask index ({width}x{height})")
+
+    rows = np.flatnonzero(mask.any(axis=1))
+    cols = np.flatnonzero(mask.any(axis=0))
+    if rows.size:
+        bounds = (int(cols[0]), int(rows[0]), int(cols[-1] - cols[0] + 1), int(rows[-1] - rows[0] + 1))
+    else:
+        bounds = (0, 0, 0, 0)
+
+    # Opaque runs start where a row steps from clear to opaque and end where it steps back
+    edges = np.diff(np.pad(mask, ((0, 0), (1, 1))).astype(np.int8), axis=1)
+    start_rows, starts = np.nonzero(edges == 1)
+    _, ends = np.nonzero(edges == -1)
+    counts = np.zeros(height + 1, dtype=np.int64)
+    counts[1:] = np.cumsum(np.bincount(start_rows, minlength=height))
+
+    return SpriteMask(name, width, height, bounds, int(np.count_nonzero(mask)),
+                      np.packbits(mask, axis=1).tobytes(), counts, np.stack([starts, ends], axis=1))
+
+def sprite_mask(name, width, height, pixels, transparent):
+    """
+    Build a SpriteMask from a sprite's row-major color index bytes.
+
+    Args:
+        name: Drawable name
+        width, height: Sprite size
+        pixels: width * height color indices (ShtSprite.indices or
+            DataSprite.values)
+        transparent: Index that marks transparent pixels (0 for bomb.sht,
+            TRANSPARENT for DATA sprites)
+    """
+    indices = np.frombuffer(pixels, dtype=np.uint8).reshape(height, width)
+    return compute_mask(name, indices != transparent)
+
+def build_mask_index(masks):
+    """
+    Pack SpriteMasks into index bytes; a later mask replaces an earlier
+    one with the same name.
+
+    Raises:
+        ValueError: If a name is longer than NAME_LENGTH bytes
+    """
+    masks = list({mask.name: mask for mask in masks}.values())
+    blobs = []
+    for mask in masks:
+        if len(mask.name.encode('ascii')) > NAME_LENGTH:
+            raise ValueError(f"sprite name {mask.name!r} is longer than {NAME_LENGTH} bytes")
+        spans = mask.counts.astype('<u2').tobytes() + mask.spans.astype('<u2').tobytes()
+        blobs.append((mask.bits, spans))
+
+    offset = MASK_HEADER.size + MASK_ENTRY.size * len(masks)
+    entries = []
+    for mask, (bits, spans) in zip(masks, blobs):
+        entries.append(MASK_ENTRY.pack(mask.name.encode('ascii'), mask.width, mask.height,
+                                       *mask.bounds, mask.opaque, offset, offset + len(bits)))
+        offset += len(bits) + len(spans)
+    header = MASK_HEADER.pack(MASK_MAGIC, MASK_VERSION, len(masks))
+    return b''.join([header] + entries + [part for blob in blobs for part in blob])
+
+def write_mask_index(masks, index_path):
+    """Write a mask index file; returns its size in bytes."""
+    data = build_mask_index(masks)
+    with open(index_path, 'wb') as f:
+        f.write(data)
+    return len(data)
+
+class MaskIndex:
+    """
+    Lookups into a mask index file.
+
+    The entry table is parsed once into a name -> entry dict, so bounds
+    and single-pixel hit tests are O(1).
+
+    Usage:
+        masks = MaskIndex('assets/sprite_masks.bin')
+        x, y, width, height = masks.bounds('joe')
+        if masks.hit('joe', 9, 15): ...
+    """
+
+    def __init__(self, index_path):
+        self.path = index_path
+        with open(index_path, 'rb') as f:
+            self._data = f.read()
+        try:
+            magic, version, count = MASK_HEADER.unpack_from(self._data, 0)
+        except struct.error:
+            raise ValueError(f"{index_path}: truncated header") from None
+        if magic != MASK_MAGIC or version != MASK_VERSION:
+            raise ValueError(f"{index_path}: not a version {MASK_VERSION} mask index")
+        table_end = MASK_HEADER.size + MASK_ENTRY.size * count
+        if table_end > len(self._data):
+            raise ValueError(f"{index_path}: entry table of {count} sprites is truncated")
+
+        self.names = []
+        self.entries = {}
+        for entry in MASK_ENTRY.iter_unpack(self._data[MASK_HEADER.size:table_end]):
+            name_bytes, width, height, x, y, box_w, box_h, opaque, mask_offset, spans_offset = entry
+            name = name_bytes.rstrip(b'\0').decode('ascii')
+            self.names.append(name)
+            self.entries[name] = (width, height, (x, y, box_w, box_h), opaque, mask_offset, spans_offset)
+
+    def __len__(self):
+        return len(self.names)
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def size(self, name):
+        """(width, height) of a sprite."""
+        return self.entries[name][:2]
+
+    def bounds(self, name):
+        """Tight (x, y, width, height) box around the opaque pixels."""
+        return self.entries[name][2]
+
+    def hit(self, name, x, y):
+        """Whether pixel (x, y) of a sprite is opaque; False outside the sprite."""
+        width, height, _, _, mask_offset, _ = self.entries[name]
+        if not (0 <= x < width and 0 <= y < height):
+            return False
+        byte = self._data[mask_offset + y * ((width + 7) // 8) + x // 8]
+        return bool(byte & (0x80 >> (x % 8)))
+
+    def mask(self, name):
+        """(height, width) boolean opaque mask."""
+        width, height, _, _, mask_offset, _ = self.entries[name]
+        row_bytes = (width + 7) // 8
+        bits = np.frombuffer(self._data, np.uint8, height * row_bytes, mask_offset)
+        return np.unpackbits(bits.reshape(height, row_bytes), axis=1, count=width).astype(bool)
+
+    def spans(self, name):
+        """
+        Opaque column runs per row.
+
+        Returns:
+            (counts, spans) as in SpriteMask: row r's [start, end) runs are
+            spans[counts[r]:counts[r + 1]]
+        """
+        height, spans_offset = self.entries[name][1], self.entries[name][5]
+        counts = np.frombuffer(self._data, '<u2', height + 1, spans_offset).astype(np.int64)
+        spans = np.frombuffer(self._data, '<u2', 2 * int(counts[-1]), spans_offset + 2 * (height + 1))
+        return counts, spans.reshape(-1, 2).astype(np.int64)
+
+def check_mask_index(index_path):
+    """
+    Recompute every sprite's bounds, opaque count and spans from its
+    stored mask and compare them with the stored tables.
+
+    Returns:
+        List of mismatch descriptions (empty on success)
+    """
+    failures = []
+    index = MaskIndex(index_path)
+    for name in index:
+        expected = compute_mask(name, index.mask(name))
+        _, _, bounds, opaque, _, _ = index.entries[name]
+        counts, spans = index.spans(name)
+        if bounds != expected.bounds:
+            failures.append(f"{name}: bounds {bounds} != {expected.bounds}")
+        if opaque != expected.opaque:
+            failures.append(f"{name}: opaque count {opaque} != {expected.opaque}")
+        if not (np.array_equal(counts, expected.counts) and np.array_equal(spans, expected.spans)):
+            failures.append(f"{name}: row spans differ from the mask")
+    return failures
+
+def print_masks(index):
+    """List each sprite's size, bounds and opaque coverage."""
+    for name in index:
+        width, height, (x, y, box_w, box_h), opaque, _, _ = index.entries[name]
+        spans = int(index.spans(name)[0][-1])
+        print(f"  {name:16s} {width:3d}x{height:<3d} bounds ({x:2d}, {y:2d}) {box_w:3d}x{box_h:<3d} "
+              f"{100 * opaque / (width * height):5.1f}% opaque, {spans} spans")
+
+def main():
+    import argparse
+    import os
+    import sys
+
+    parser = argparse.ArgumentParser(description='Inspect or check a sprite mask index')
+    parser.add_argument('index_file', help=f'Mask index file ({MASK_FILE})')
+    parser.add_argument('--check', action='store_true',
+                        help='Recompute bounds and spans from the stored masks and compare')
+    parser.add_argument('--hit', nargs=3, metavar=('NAME', 'X', 'Y'),
+                        help='Report whether pixel (X, Y) of a sprite is opaque')
+
+    args = parser.parse_args()
+
+    try:
+        index = MaskIndex(args.index_file)
+    except (OSError, ValueError) as e:
+        print(f"Cannot read mask index: {e}")
+        sys.exit(1)
+
+    print(f"{len(index)} sprites in {args.index_file} ({os.path.getsize(args.index_file)} bytes)")
+    print_masks(index)
+
+    if args.hit:
+        name, x, y = args.hit[0], int(args.hit[1]), int(args.hit[2])
+        if name not in index.entries:
+            print(f"No sprite named {name!r}")
+            sys.exit(1)
+        print(f"{name} ({x}, {y}): {'opaque' if index.hit(name, x, y) else 'transparent'}")
+
+    if args.check:
+        failures = check_mask_index(args.index_file)
+        for failure in failures:
+            print(f"Mask check FAILED: {failure}")
+        if failures:
+            sys.exit(1)
+        print(f"Mask check OK: bounds and spans of all {len(index)} sprites match their masks")
+
+if __name__ == '__main__':
+    main()
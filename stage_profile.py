@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Per-stage timing and profiling shared by the Zargon extractors.
+
+An extractor wraps each step of its pipeline in a named stage (parse,
+decode, scale, encode, write, sheet, ...) and optionally names the record
+being processed. StageProfiler accumulates wall and CPU time per stage and
+per record, counts bytes read and written, and writes a JSON report:
+{
+  "tool": "tiles",
+  "wall_ms": 41.2, "cpu_ms": 40.8,
+  "bytes_read": 7186, "bytes_written": 9120, "files_written": 15,
+  "peak_rss_bytes": 58720256,
+  "stages": {"decode": {"calls": 14, "wall_ms": 0.4, "cpu_ms": 0.4}, ...},
+  "records": {"grass": {"decode": {"wall_ms": 0.03, "cpu_ms": 0.03}, ...}, ...}
+}
+
+Stage CPU time is that of the thread running the stage. When PNGs are
+written on PngWriter threads, encode and write stages overlap, so stage
+totals can add up to more than the run's wall time.
+
+Peak memory is the process's peak resident set size (not available on
+Windows, where it is reported as null). With cprofile=True the run is
+also recorded with cProfile so the hottest functions can be dumped.
+
+Extractors take profiler=None and fall back to NULL_PROFILER, whose
+stages cost next to nothing.
+"""
+
+import contextlib
+import cProfile
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+def peak_rss_bytes():
+    """Peak resident set size of this process in bytes, or None if unknown."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+def file_state(path):
+    """(size, mtime_ns) of a file, or None if path is None or missing."""
+    if path is None:
+        return None
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+class StageProfiler:
+    """
+    Collects per-stage and per-record timings for one extractor run.
+
+    Usage:
+        profiler = StageProfiler('tiles')
+        profiler.start()
+        with profiler.stage('decode', 'grass'):
+            ...
+        profiler.finish()
+        profiler.save('profile.json')
+    """
+
+    def __init__(self, tool, cprofile=False):
+        self.tool = tool
+        self.stages = {}
+        self.records = {}
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.files_written = 0
+        self._profile = cProfile.Profile() if cprofile else None
+        # Stages may also run on PngWriter threads
+        self._lock = threading.Lock()
+        self._start = None
+        self._report = None
+
+    def start(self):
+        """Start the run clock (and cProfile, if enabled)."""
+        self._start = (time.perf_counter(), time.process_time())
+        if self._profile is not None:
+            self._profile.enable()
+
+    @contextlib.contextmanager
+    def stage(self, name, record=None, output=None):
+        """
+        Time the enclosed block as stage `name`.
+
+        Args:
+            name: Stage name
+            record: Optional record name the time is also attributed to
+            output: Optional path of a file the block may write; it is
+                counted as written if it changed during the block
+        """
+        before = file_state(output)
+        wall_start = time.perf_counter()
+        cpu_start = time.thread_time()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - wall_start
+            cpu = time.thread_time() - cpu_start
+            with self._lock:
+                totals = self.stages.setdefault(name, {'calls': 0, 'wall': 0.0, 'cpu': 0.0})
+                totals['calls'] += 1
+                totals['wall'] += wall
+                totals['cpu'] += cpu
+                if record is not None:
+                    per_record = self.records.setdefault(record, {}).setdefault(
+                        name, {'wall': 0.0, 'cpu': 0.0})
+                    per_record['wall'] += wall
+                    per_record['cpu'] += cpu
+            after = file_state(output)
+            if after is not None and after != before:
+                self.wrote(after[0])
+
+    def iterate(self, name, iterable):
+        """Yield from an iterable, timing each step as stage `name`."""
+        iterator = iter(iterable)
+        done = object()
+        while True:
+            with self.stage(name):
+                item = next(iterator, done)
+            if item is done:
+                return
+            yield item
+
+    def read(self, nbytes):
+        """Count source bytes read."""
+        self.bytes_read += nbytes
+
+    def wrote(self, nbytes):
+        """Count one output file of nbytes bytes."""
+        with self._lock:
+            self.bytes_written += nbytes
+            self.files_written += 1
+
+    def finish(self):
+        """Stop the run clock and cProfile, and return the report dict."""
+        if self._profile is not None:
+            self._profile.disable()
+        wall_start, cpu_start = self._start
+        ms = lambda seconds: round(seconds * 1000, 3)
+        self._report = {
+            'tool': self.tool,
+            'wall_ms': ms(time.perf_counter() - wall_start),
+            'cpu_ms': ms(time.process_time() - cpu_start),
+            'bytes_read': self.bytes_read,
+            'bytes_written': self.bytes_written,
+            'files_written': self.files_written,
+            'peak_rss_bytes': peak_rss_bytes(),
+            'stages': {name: {'calls': t['calls'], 'wall_ms': ms(t['wall']), 'cpu_ms': ms(t['cpu'])}
+                       for name, t in self.stages.items()},
+            'records': {record: {name: {'wall_ms': ms(t['wall']), 'cpu_ms': ms(t['cpu'])}
+                                 for name, t in stages.items()}
+                        for record, stages in self.records.items()},
+        }
+        return self._report
+
+    def save(self, report_path):
+        """Write the JSON report (call finish() first)."""
+        with open(report_path, 'w') as f:
+            json.dump(self._report, f, indent=2)
+            f.write('\n')
+
+    def summary(self):
+        """One line per stage, slowest first."""
+        lines = [f"Profile: {self._report['wall_ms']:.1f} ms wall, {self._report['cpu_ms']:.1f} ms CPU, "
+                 f"{self.bytes_read} bytes read, {self.bytes_written} bytes written"]
+        for name, t in sorted(self._report['stages'].items(), key=lambda item: -item[1]['wall_ms']):
+            lines.append(f"  {name:8s} {t['calls']:6d} calls {t['wall_ms']:10.1f} ms wall "
+                         f"{t['cpu_ms']:10.1f} ms CPU")
+        return '\n'.join(lines)
+
+    def dump_stats(self, stats_path, limit=20):
+        """
+        Save the cProfile data and print the hottest functions.
+
+        Args:
+            stats_path: Output file, readable with pstats or snakeviz
+            limit: Number of functions to print, by own (not cumulative) time
+        """
+        self._profile.dump_stats(stats_path)
+        print(f"cProfile stats saved to {stats_path}, top {limit} functions by own time:")
+        pstats.Stats(self._profile).sort_stats('tottime').print_stats(limit)
+
+class NullProfiler:
+    """Stand-in for StageProfiler when profiling is off."""
+
+    _null_stage = contextlib.nullcontext()
+
+    def stage(self, name, record=None, output=None):
+        return self._null_stage
+
+    def iterate(self, name, iterable):
+        return iterable
+
+    def read(self, nbytes):
+        pass
+
+    def wrote(self, nbytes):
+        pass
+
+NULL_PROFILER = NullProfiler()
+
+def profiler_from_args(tool, args):
+    """Build and start a StageProfiler for --profile/--cprofile, or return NULL_PROFILER."""
+    if not (args.profile or args.cprofile):
+        return NULL_PROFILER
+    profiler = StageProfiler(tool, cprofile=bool(args.cprofile))
+    profiler.start()
+    return profiler
+
+def add_profile_arguments(parser):
+    """Add the --profile and --cprofile options shared by the extractor CLIs."""
+    parser.add_argument('--profile', metavar='REPORT',
+                        help='Write a JSON report with per-stage and per-record timings, '
+                             'bytes read/written and peak memory')
+    parser.add_argument('--cprofile', metavar='STATS',
+                        help='Also record the run with cProfile, save the stats and print '
+                             'the hottest functions')
+
+def finish_profile(profiler, args):
+    """Stop a profiler from profiler_from_args and write what was requested."""
+    if profiler is NULL_PROFILER:
+        return
+    profiler.finish()
+    print(profiler.summary())
+    if args.profile:
+        profiler.save(args.profile)
+        print(f"Profile report saved to {args.profile}")
+    if args.cprofile:
+        profiler.dump_stats(args.cprofile)
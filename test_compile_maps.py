@@ -0,0 +1,59 @@
+"""
+Round-trip the 16 maps through compile_maps' world file.
+
+Run with:
+    python3 -m pytest -q
+"""
+
+import os
+
+import pytest
+
+from compile_maps import (MAPS_ACROSS, MAPS_DOWN, WorldReader, check_round_trip, compile_world,
+                          format_lvl, load_maps, map_name, parse_lvl)
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+APP_ASSETS = os.path.join(ROOT, 'app', 'app', 'src', 'main', 'assets')
+MAP_DIRS = [os.path.join(ROOT, 'zargon'), APP_ASSETS]
+
+def positions():
+    return [(x, y) for y in range(1, MAPS_DOWN + 1) for x in range(1, MAPS_ACROSS + 1)]
+
+@pytest.mark.parametrize('source_dir', MAP_DIRS)
+def test_lvl_format_round_trips(source_dir):
+    for x, y in positions():
+        lvl_path = os.path.join(source_dir, f'{map_name(x, y)}.lvl')
+        with open(lvl_path, 'rb') as f:
+            assert format_lvl(parse_lvl(lvl_path)) == f.read(), lvl_path
+
+@pytest.mark.parametrize('source_dir', MAP_DIRS)
+def test_world_file_round_trips(source_dir, tmp_path):
+    world_path = str(tmp_path / 'zargon.wld')
+    maps = load_maps(source_dir)
+    compile_world(maps, world_path)
+
+    with WorldReader(world_path) as world:
+        for x, y in positions():
+            assert world.read_map(x, y) == maps[(x, y)], map_name(x, y)
+    assert check_round_trip(source_dir, world_path) == []
+
+def test_shipped_world_matches_shipped_maps():
+    # MapParser prefers zargon.wld over the .lvl files, so a stale world
+    # file would hide map edits in the app
+    assert check_round_trip(APP_ASSETS, os.path.join(APP_ASSETS, 'zargon.wld')) == []
+
+def write_lvl(path, hut, spot):
+    lines = ['"1"'] * 200 + [str(v) for v in hut + spot]
+    path.write_bytes(('\r\n'.join(lines) + '\r\n').encode('ascii'))
+    return str(path)
+
+@pytest.mark.parametrize('hut,spot', [((20, 9), (1, 0)), ((0, 0), (5, 0))])
+def test_coordinates_in_game_range_are_accepted(hut, spot, tmp_path):
+    level = parse_lvl(write_lvl(tmp_path / 'map11.lvl', hut, spot))
+    assert (level.hut, level.spot) == (hut, spot)
+
+@pytest.mark.parametrize('hut,spot', [((5, 10), (0, 0)), ((0, 0), (21, 3)), ((0, 4), (0, 0))])
+def test_coordinates_off_the_grid_are_rejected(hut, spot, tmp_path):
+    # render_maps draws y as a 0-based row, so y = MAP_HEIGHT would be off the map
+    with pytest.raises(ValueError, match='outside'):
+        parse_lvl(write_lvl(tmp_path / 'map11.lvl', hut, spot))
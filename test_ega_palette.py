@@ -0,0 +1,70 @@
+"""
+Pin the EGA palette tables to the canonical EGA colors.
+
+Run with:
+    python3 -m pytest -q
+"""
+
+import numpy as np
+
+from ega_palette import (CANONICAL_EGA_COLORS, DATA_RGBA, EGA_RGBA, SHT_RGBA, TILE_RGBA, TRANSPARENT,
+                         ZARGON_PALETTE_VALUES, unpack_rgba)
+from extract_data_sprites import DataSprite, sprite_image as data_image
+from extract_sheets import ShtSprite, sprite_image as sht_image
+
+# The 16 Zargon colors, as PALETTE sets them in ZARGON.BAS
+ZARGON_RGB = [
+    (0, 0, 0), (170, 0, 0), (85, 85, 0), (0, 170, 0),
+    (170, 170, 0), (255, 255, 0), (0, 170, 85), (255, 170, 0),
+    (255, 170, 85), (170, 0, 170), (0, 85, 255), (170, 170, 170),
+    (85, 85, 255), (255, 255, 255), (0, 0, 255), (85, 255, 255),
+]
+
+def expected_rgb(value):
+    """Color of a 6-bit EGA value: the sum of the canonical colors of its set bits."""
+    channels = np.zeros(3, dtype=int)
+    for bit in (1, 2, 4, 8, 16, 32):
+        if value & bit:
+            channels += CANONICAL_EGA_COLORS[bit]
+    return tuple(int(c) for c in channels)
+
+def rgba_rows(lut, count):
+    return [tuple(int(c) for c in row) for row in unpack_rgba(lut)[:count]]
+
+def test_ega_table_matches_canonical_colors():
+    ega = rgba_rows(EGA_RGBA, 64)
+    for value, rgb in CANONICAL_EGA_COLORS.items():
+        assert ega[value] == rgb + (255,), value
+    for value in range(64):
+        assert ega[value] == expected_rgb(value) + (255,), value
+
+def test_zargon_palette_colors():
+    assert [expected_rgb(v) for v in ZARGON_PALETTE_VALUES] == ZARGON_RGB
+
+def test_tile_table_is_opaque_zargon_palette():
+    assert rgba_rows(TILE_RGBA, 16) == [rgb + (255,) for rgb in ZARGON_RGB]
+
+def test_sht_table_clears_color_zero():
+    rows = rgba_rows(SHT_RGBA, 16)
+    assert rows[0][3] == 0
+    assert rows[1:] == [rgb + (255,) for rgb in ZARGON_RGB[1:]]
+
+def test_data_table_matches_tiles_and_clears_sentinel():
+    rows = rgba_rows(DATA_RGBA, 256)
+    assert rows[:16] == [rgb + (255,) for rgb in ZARGON_RGB]
+    assert rows[TRANSPARENT][3] == 0
+
+def test_data_sprites_use_rgbRGB_bit_order():
+    # The DATA extractor used to swap the high- and low-intensity bits, so
+    # color 2 (EGA 48, low red + low green) came out (170, 170, 0)
+    values = bytes(range(16)) + bytes([TRANSPARENT])
+    pixels = np.array(data_image(DataSprite('test', 17, 1, values, 0)))[0]
+    assert [tuple(int(c) for c in p) for p in pixels[:16]] == [rgb + (255,) for rgb in ZARGON_RGB]
+    assert tuple(pixels[2][:3]) == (85, 85, 0)
+    assert pixels[16][3] == 0
+
+def test_sht_and_data_sprites_share_colors():
+    values = bytes(range(1, 16))
+    sht = np.array(sht_image(ShtSprite('test', 15, 1, values)))
+    data = np.array(data_image(DataSprite('test', 15, 1, values, 0)))
+    assert np.array_equal(sht, data)
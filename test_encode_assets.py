@@ -0,0 +1,53 @@
+"""
+Round-trip tiles.wad and bomb.sht through encode_assets.
+
+Run with:
+    python3 -m pytest -q
+"""
+
+import os
+
+import numpy as np
+import pytest
+
+from ega_palette import SHT_RGBA, TILE_RGBA
+from encode_assets import (build_sht, build_wad, check_round_trip, collect_records, sht_records,
+                           sht_row_styles, wad_records)
+from indexed_png import save_variants
+from pack_atlas import drawable_name
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+SOURCE_DIRS = [os.path.join(ROOT, 'zargon'), os.path.join(ROOT, 'app', 'app', 'src', 'main', 'assets')]
+
+def read_bytes(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+@pytest.mark.parametrize('source_dir', SOURCE_DIRS)
+def test_check_round_trip_passes(source_dir):
+    assert check_round_trip(source_dir) == []
+
+@pytest.mark.parametrize('source_dir', SOURCE_DIRS)
+def test_wad_re_encodes_byte_identical(source_dir):
+    wad_path = os.path.join(source_dir, 'tiles.wad')
+    assert build_wad(wad_records(wad_path)) == read_bytes(wad_path)
+
+@pytest.mark.parametrize('source_dir', SOURCE_DIRS)
+def test_sht_re_encodes_byte_identical(source_dir):
+    sht_path = os.path.join(source_dir, 'bomb.sht')
+    assert build_sht(sht_records(sht_path), sht_row_styles(sht_path)) == read_bytes(sht_path)
+
+@pytest.mark.parametrize('decode,lut,name', [(wad_records, TILE_RGBA, 'tiles.wad'),
+                                            (sht_records, SHT_RGBA, 'bomb.sht')])
+def test_edited_png_replaces_one_record(decode, lut, name, tmp_path):
+    records = decode(os.path.join(ROOT, 'zargon', name))
+    edited_name, indices = records[1]
+    edited = indices.copy()
+    edited[0, 0] = 5 if edited[0, 0] != 5 else 13
+    save_variants(edited, [(1, str(tmp_path / f'{drawable_name(edited_name)}.png'))], lut)
+
+    result, replaced = collect_records(str(tmp_path), records)
+    assert replaced == 1
+    assert [n for n, _ in result] == [n for n, _ in records]
+    assert np.array_equal(result[1][1], edited)
+    assert all(np.array_equal(a, b) for (_, a), (_, b) in zip(result[2:], records[2:]))